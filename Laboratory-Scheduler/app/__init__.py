@@ -1,7 +1,11 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from config import config
 
 # Initialize extensions
@@ -12,8 +16,17 @@ login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 login_manager.session_protection = "strong"
 
+def sqlite_pragma_hook(pragmas):
+    """Engine ``connect`` listener that applies ``pragmas`` to each new connection"""
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return apply_pragmas
+
 def create_app(config_name='default'):
-    app = Flask(__name__)
+    app = Flask(__name__, static_folder='../static')
     
     # Load configuration
     if config_name not in config:
@@ -21,11 +34,33 @@ def create_app(config_name='default'):
     
     app.config.from_object(config[config_name])
     
+    # Engine profile by URL scheme: pragmas for SQLite, a connection pool
+    # for server databases (see SQLITE_PRAGMAS / SERVER_DB_ENGINE_OPTIONS)
+    backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend != 'sqlite':
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **app.config.get('SERVER_DB_ENGINE_OPTIONS', {}),
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        }
+    
     # Initialize extensions with app
     db.init_app(app)
+    if backend == 'sqlite' and app.config.get('SQLITE_PRAGMAS'):
+        with app.app_context():
+            event.listen(db.engine, 'connect', sqlite_pragma_hook(app.config['SQLITE_PRAGMAS']))
     login_manager.init_app(app)
     csrf.init_app(app)
 
+    # Compiled templates shared on disk by all worker processes
+    if app.config.get('TEMPLATE_BYTECODE_CACHE'):
+        cache_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR') or \
+            os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    
+    from app.fragments import fragment_cache
+    fragment_cache.init_app(app)
+
     @app.context_processor
     def inject_csrf_token():
         from flask_wtf.csrf import generate_csrf
@@ -40,6 +75,40 @@ def create_app(config_name='default'):
     app.register_blueprint(main_bp)
     app.register_blueprint(reports_bp)
     
+    # Warm the in-memory conflict index
+    from app.conflicts import reservation_index
+    reservation_index.init_app(app)
+    
+    from app.notifications import notification_broker
+    notification_broker.init_app(app)
+    
+    # Session hooks that keep the report rollups in step with reservations
+    from app import rollups
+    
+    from app.cache import report_cache
+    report_cache.init_app(app)
+    
+    from app.dashboard import dashboard_cache
+    dashboard_cache.init_app(app)
+    
+    from app.identity import user_cache
+    user_cache.init_app(app)
+    
+    from app.passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    from app.metrics import request_metrics
+    request_metrics.init_app(app)
+    
+    from app.assets import asset_manifest
+    asset_manifest.init_app(app)
+    
+    from app.responses import response_compressor
+    response_compressor.init_app(app)
+    
+    from app.jobs import job_queue
+    job_queue.init_app(app)
+    
     return app
 
 # Import models after db initialization to avoid circular imports
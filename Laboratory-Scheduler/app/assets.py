@@ -0,0 +1,158 @@
+"""
+Fingerprinted static assets.
+
+``python manage.py build-assets`` minifies every stylesheet and script under
+``static/``, names each copy after a hash of its content
+(``dist/css/style.3f9c0a1b2d4e.css``) and writes ``.gz`` and ``.br``
+variants next to it. It also writes ``dist/manifest.json``, which maps
+source names to built names.
+
+When the manifest is present, ``url_for('static', filename='css/style.css')``
+points at the built file. The static view sends the smallest variant the
+client accepts, marked immutable for a year. A changed file gets a new name,
+so browsers never need to revalidate. Files missing from the manifest are
+served as before.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:   # .br variants are skipped without it
+    brotli = None
+try:
+    import rcssmin
+    import rjsmin
+    MINIFIERS = {'.css': rcssmin.cssmin, '.js': rjsmin.jsmin}
+except ImportError:   # assets are fingerprinted and compressed, not minified
+    MINIFIERS = {}
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.css', '.js')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def build_assets(static_folder):
+    """Build the fingerprinted assets and manifest; return the manifest.
+
+    Files referenced by the previous manifest are kept, so workers still on
+    the old manifest can serve pages until they are reloaded.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest_path = os.path.join(dist, MANIFEST_NAME)
+    previous = load_manifest(manifest_path)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder) and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for name in sorted(files):
+            stem, ext = os.path.splitext(name)
+            if ext not in ASSET_EXTENSIONS or stem.endswith('.min'):
+                continue
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, encoding='utf-8') as f:
+                text = f.read()
+            minify = MINIFIERS.get(ext)
+            data = (minify(text) if minify else text).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            built = f'{DIST_DIR}/{os.path.splitext(logical)[0]}.{digest}{ext}'
+            target = os.path.join(static_folder, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write(target, data)
+            # mtime=0 keeps the .gz bytes (and so its ETag) stable across builds
+            _write(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(target + '.br', brotli.compress(data, quality=11))
+            manifest[logical] = built
+
+    _write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _prune(static_folder, set(manifest.values()) | set(previous.values()))
+    return manifest
+
+
+def _write(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _prune(static_folder, keep):
+    dist = os.path.join(static_folder, DIST_DIR)
+    for root, dirs, files in os.walk(dist):
+        for name in files:
+            path = os.path.join(root, name)
+            built = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            for _, suffix in ENCODINGS:
+                if built.endswith(suffix):
+                    built = built[:-len(suffix)]
+            if name != MANIFEST_NAME and built not in keep:
+                os.unlink(path)
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class AssetManifest:
+    """Routes ``url_for('static')`` to built assets and serves their variants"""
+
+    def __init__(self):
+        self.manifest = {}
+        self.built = frozenset()
+        self.static_folder = None
+
+    def init_app(self, app):
+        app.extensions['asset_manifest'] = self
+        if not app.config.get('STATIC_ASSET_MANIFEST') or not app.static_folder:
+            return
+        self.static_folder = app.static_folder
+        self.manifest = load_manifest(os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME))
+        if not self.manifest:
+            app.logger.info('No static asset manifest; run "python manage.py build-assets"')
+            return
+        self.built = frozenset(self.manifest.values())
+        app.url_defaults(self._rewrite_static_url)
+        app.view_functions['static'] = self.send_static_file
+
+    def _rewrite_static_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest.get(values['filename'], values['filename'])
+
+    def send_static_file(self, filename):
+        if filename not in self.built:
+            return send_from_directory(self.static_folder, filename)
+
+        accepted = request.accept_encodings
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.exists(os.path.join(self.static_folder, filename + suffix)):
+                response = send_from_directory(self.static_folder, filename + suffix,
+                                               mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(self.static_folder, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+asset_manifest = AssetManifest()
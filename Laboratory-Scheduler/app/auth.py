@@ -1,15 +1,23 @@
+import time
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db, login_manager
 from app.models import User, Instructor, Student
+from app.identity import user_cache
+from app.passwords import password_hasher, HasherBusy
+from app.responses import conditional
+from app.jobs import job_queue
 # Remove Flask-WTF forms import and use manual form handling
 # from app.forms import LoginForm, ForgotPasswordForm, ResetPasswordForm
 
 auth_bp = Blueprint('auth', __name__)
 
+# Repeated reset requests within this many seconds send one email
+RESET_EMAIL_WINDOW = 600
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load(int(user_id))
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -17,6 +25,7 @@ def login():
         return redirect_user_by_type()
     
     # Use manual form handling instead of Flask-WTF
+    busy = False
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
         password = request.form.get('password', '')
@@ -28,10 +37,20 @@ def login():
         else:
             user = User.query.filter_by(username=username).first()
             
-            if user and user.check_password(password):
+            try:
+                valid = user is not None and user.check_password(password)
+            except HasherBusy:
+                busy = True
+                valid = False
+            
+            if valid:
+                if db.session.is_modified(user):
+                    db.session.commit()  # hash upgraded to the current method
                 login_user(user, remember=remember_me)
                 flash('Login successful!', 'success')
                 return redirect_user_by_type()
+            elif busy:
+                flash('The server is busy signing other users in. Please try again in a moment.', 'warning')
             else:
                 flash('Invalid username or password', 'danger')
     
@@ -44,8 +63,13 @@ def login():
             self.remember_me = type('Field', (), {'data': False})()
     
     form = SimpleForm()
+    if busy:
+        return render_template('login.html', form=form), 503, {
+            'Retry-After': str(password_hasher.retry_after)
+        }
     return render_template('login.html', form=form)
 
+
 def redirect_user_by_type():
     next_page = request.args.get('next')
     if next_page:
@@ -78,8 +102,11 @@ def forgot_password():
         else:
             user = User.query.filter_by(email=email).first()
             if user:
-                # In a real application, you would send an email with reset instructions
-                # For now, we'll just show a message
+                # The worker sends the instructions (see app.jobs)
+                window = int(time.time()) // RESET_EMAIL_WINDOW
+                job_queue.enqueue('password_reset', {'user_id': user.id, 'email': user.email},
+                                  key=f'password-reset:{user.id}:{window}')
+                db.session.commit()
                 flash('If that email exists in our system, we have sent password reset instructions.', 'info')
             else:
                 # Still show the same message for security
@@ -139,6 +166,7 @@ def check_auth():
 
 @auth_bp.route('/api/user-info')
 @login_required
+@conditional('users', per_user=True)
 def user_info():
     """API endpoint to get current user information"""
     user_data = {
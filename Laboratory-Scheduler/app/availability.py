@@ -0,0 +1,104 @@
+"""
+Free-slot finder across labs.
+
+Busy intervals (pending and approved reservations) of every matching lab are
+loaded with one query ordered by lab and start time, then a single sweep
+walks each lab's opening hours and busy intervals side by side and emits the
+gaps long enough for the requested duration.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import db
+from app.models import Reservation, Laboratory
+from app.conflicts import ACTIVE_STATUSES
+from app.timetable import LAB_HOURS
+
+
+def opening_windows(range_start, range_end):
+    """Sorted ``[start, end)`` opening-hour windows clipped to the range"""
+    windows = []
+    day = datetime.combine(range_start.date(), datetime.min.time())
+    while day < range_end:
+        hours = LAB_HOURS.get(day.weekday())
+        if hours:
+            start = max(day + timedelta(hours=hours[0]), range_start)
+            end = min(day + timedelta(hours=hours[1]), range_end)
+            if end > start:
+                windows.append((start, end))
+        day += timedelta(days=1)
+    return windows
+
+
+def free_gaps(windows, busy, duration):
+    """Sweep opening windows against sorted busy intervals.
+
+    ``busy`` is an iterable of ``(start, end)`` sorted by start; overlapping
+    intervals are fine. Yields every ``(start, end)`` gap of at least
+    ``duration`` inside the windows.
+    """
+    busy = iter(busy)
+    pending = next(busy, None)
+    reach = None    # latest end among intervals already swept
+    for window_start, window_end in windows:
+        cursor = window_start if reach is None else max(window_start, reach)
+        while pending is not None and pending[0] < window_end:
+            start, end = pending
+            if start - cursor >= duration:
+                yield cursor, start
+            cursor = max(cursor, end)
+            reach = end if reach is None else max(reach, end)
+            pending = next(busy, None)
+        if window_end - cursor >= duration:
+            yield cursor, window_end
+
+
+def find_free_slots(duration, range_start, range_end, min_capacity=0, lab_id=None, limit=20):
+    """Rank free slots of at least ``duration`` across every matching lab.
+
+    Slots are ordered by start time, then by the smallest lab that still
+    fits (keeping big labs for big classes), then by the shortest gap (so
+    long gaps stay available for long bookings). Labs with no capacity on
+    record rank as the smallest and are left out when ``min_capacity`` is set.
+    """
+    labs_query = Laboratory.query.filter(Laboratory.is_active == True)
+    if min_capacity:
+        labs_query = labs_query.filter(Laboratory.capacity >= min_capacity)
+    if lab_id:
+        labs_query = labs_query.filter(Laboratory.id == lab_id)
+    labs = {lab.id: lab for lab in labs_query}
+    if not labs:
+        return []
+
+    rows = db.session.execute(
+        select(Reservation.lab_id, Reservation.start_time, Reservation.end_time)
+        .where(
+            Reservation.lab_id.in_(list(labs)),
+            Reservation.status.in_(ACTIVE_STATUSES),
+            Reservation.start_time < range_end,
+            Reservation.end_time > range_start
+        ).order_by(Reservation.lab_id, Reservation.start_time)
+    )
+
+    windows = opening_windows(range_start, range_end)
+    busy_by_lab = {}
+    for lab, start, end in rows:
+        busy_by_lab.setdefault(lab, []).append((start, end))
+
+    ranked = heapq.nsmallest(limit, (
+        (start, labs[lab].capacity or 0, end - start, lab, end)
+        for lab in labs
+        for start, end in free_gaps(windows, busy_by_lab.get(lab, ()), duration)
+    ))
+
+    return [{
+        'lab_id': lab,
+        'lab': labs[lab].name,
+        'room_number': labs[lab].room_number,
+        'capacity': labs[lab].capacity,
+        'start': start.isoformat(),
+        'end': (start + duration).isoformat(),
+        'free_until': end.isoformat(),
+        'free_minutes': int(length.total_seconds() // 60)
+    } for start, _, length, lab, end in ranked]
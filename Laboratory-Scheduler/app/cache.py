@@ -0,0 +1,213 @@
+"""
+Report result cache with TTL, LRU eviction and cross-process invalidation.
+
+Cached entries are tagged with the current *data version*, a counter kept in
+the ``data_version`` table. A session hook bumps the counter in the same
+transaction that inserts a reservation or changes its status, time or lab,
+so every worker process sees the new version on its next lookup and stops
+serving entries computed before the change. Reading the version is a single
+primary-key lookup, which replaces the aggregation on a hit.
+
+The same hook keeps a ``schedule`` version, which also moves when a
+reservation's course, section or notes change, and ``labs`` and ``users``
+versions for ORM changes to laboratories and to users or their profiles;
+ETags (app.responses) combine them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app
+from sqlalchemy import event, inspect, select, update, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Reservation, DataVersion, Laboratory, User, Instructor, Student
+
+data_version_table = DataVersion.__table__
+
+# Reservation columns whose changes can alter a report
+REPORT_COLUMNS = ('status', 'start_time', 'end_time', 'lab_id', 'instructor_id')
+# Further columns shown by the schedule (/api/schedule) but by no report
+SCHEDULE_COLUMNS = ('course_name', 'section', 'notes')
+
+# Other models whose ORM changes move a data version, by scope
+SCOPED_MODELS = {'labs': (Laboratory,), 'users': (User, Instructor, Student)}
+
+
+def get_data_version(scope='reservations'):
+    version = db.session.execute(
+        select(data_version_table.c.version).where(data_version_table.c.name == scope)
+    ).scalar()
+    return version or 0
+
+
+def get_data_versions(scopes):
+    """Current versions of several scopes, in the order given, in one query"""
+    rows = dict(db.session.execute(
+        select(data_version_table.c.name, data_version_table.c.version)
+        .where(data_version_table.c.name.in_(scopes))
+    ).all())
+    return tuple(rows.get(scope, 0) for scope in scopes)
+
+
+def bump_data_version(conn, scope='reservations'):
+    result = conn.execute(
+        update(data_version_table)
+        .where(data_version_table.c.name == scope)
+        .values(version=data_version_table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(data_version_table).values(name=scope, version=1))
+    conn.info.setdefault('changed_scopes', set()).add(scope)
+
+
+def bump_reservation_versions(conn):
+    """Bump every scope a reservation write can change, for set-based
+    INSERTs and UPDATEs that skip the flush hook"""
+    for scope in ('reservations', 'schedule'):
+        bump_data_version(conn, scope)
+
+
+_change_callbacks = []
+
+
+def on_data_change(callback):
+    """Register ``callback(scopes)`` to run when a transaction that bumped
+    the versions of ``scopes`` commits on a connection of this process"""
+    _change_callbacks.append(callback)
+    return callback
+
+
+@event.listens_for(Engine, 'commit')
+def _announce_data_changes(conn):
+    scopes = conn.info.pop('changed_scopes', None)
+    if scopes:
+        for callback in _change_callbacks:
+            callback(scopes)
+
+
+@event.listens_for(Engine, 'rollback')
+def _forget_data_changes(conn):
+    conn.info.pop('changed_scopes', None)
+
+
+@event.listens_for(Session, 'before_flush')
+def _detect_versioned_changes(session, flush_context, instances):
+    scopes = set()
+    if any(isinstance(obj, Reservation) for obj in session.new) or \
+            any(isinstance(obj, Reservation) for obj in session.deleted):
+        scopes.update(('reservations', 'schedule'))
+    else:
+        for obj in session.dirty:
+            if isinstance(obj, Reservation):
+                state = inspect(obj)
+                if any(state.attrs[column].history.has_changes() for column in REPORT_COLUMNS):
+                    scopes.update(('reservations', 'schedule'))
+                    break
+                if any(state.attrs[column].history.has_changes() for column in SCHEDULE_COLUMNS):
+                    scopes.add('schedule')
+
+    for scope, models in SCOPED_MODELS.items():
+        if any(isinstance(obj, models) for obj in session.new) or \
+                any(isinstance(obj, models) for obj in session.deleted) or \
+                any(isinstance(obj, models) and session.is_modified(obj) for obj in session.dirty):
+            scopes.add(scope)
+    if scopes:
+        session.info.setdefault('bump_data_versions', set()).update(scopes)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_data_versions(session, flush_context):
+    for scope in sorted(session.info.pop('bump_data_versions', ())):
+        bump_data_version(session.connection(), scope)
+
+
+class ReportCache:
+    """Keyed cache of rendered report responses.
+
+    Entries expire after ``ttl`` seconds or as soon as the data version moves
+    on; the least recently used entry is evicted once ``max_entries`` is
+    reached. Counters are per worker process.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, version, value)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('REPORT_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('REPORT_CACHE_TTL', self.ttl)
+        app.extensions['report_cache'] = self
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_version, value = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def cached(self, view):
+        """Cache successful responses of a view keyed on its path and arguments"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if current_app.config.get('REPORT_CACHE_TTL', self.ttl) <= 0:
+                return view(*args, **kwargs)
+
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            version = get_data_version()
+            cached = self.get(key, version)
+            if cached is not None:
+                body, mimetype = cached
+                return current_app.response_class(body, mimetype=mimetype)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                self.set(key, version, (response.get_data(), response.mimetype))
+            return response
+        return wrapper
+
+
+report_cache = ReportCache()
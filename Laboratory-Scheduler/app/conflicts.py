@@ -0,0 +1,255 @@
+"""
+In-memory per-lab interval index used for reservation conflict detection.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import Reservation
+
+# Reservations in these states block a lab's time slot
+ACTIVE_STATUSES = ('pending', 'approved')
+
+# Rows whose change committed up to this long after it was stamped are still
+# picked up by catch_up, which looks back that far at most once per interval
+CATCH_UP_SLACK = timedelta(seconds=10)
+CATCH_UP_SWEEP_INTERVAL = 1.0  # seconds
+
+
+def span_class(start_time, end_time):
+    """Length class of a reservation: class ``c`` holds spans under 2**c minutes"""
+    minutes = int((end_time - start_time).total_seconds() // 60)
+    return max(minutes, 0).bit_length()
+
+
+class ReservationIndex:
+    """Sorted start times per lab and length class over pending and approved reservations.
+
+    Each lab keeps its reservations in buckets by length class (see
+    ``span_class``), each a list of ``(start_time, reservation_id)`` tuples
+    sorted by start time. A reservation of class ``c`` overlaps ``[start,
+    end)`` only if it starts before ``end`` and after ``start - 2**c``
+    minutes. A lookup is therefore two bisections per bucket plus a scan of
+    that window. The window depends only on the class, so one long
+    reservation never widens the scan of the short ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = {}      # lab_id -> {span class: sorted [(start_time, id)]}
+        self._entries = {}      # id -> (lab_id, span class, start_time, end_time)
+        self._synced_at = None  # newest Reservation.updated_at applied
+        self._settled_at = None  # older stamps have all been read
+        self._swept_at = None
+        self.warmed = False
+
+    def init_app(self, app):
+        """Warm the index from the database when the app starts."""
+        app.extensions['reservation_index'] = self
+        with app.app_context():
+            try:
+                self.warm()
+            except SQLAlchemyError:
+                # Tables may not exist yet (e.g. before create_db.py runs);
+                # conflict checks fall back to the database until warmed.
+                db.session.rollback()
+                self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._entries.clear()
+            self._synced_at = None
+            self._settled_at = None
+            self._swept_at = None
+            self.warmed = False
+
+    def warm(self):
+        """Rebuild the index from every active reservation."""
+        started = datetime.utcnow()
+        synced_at = db.session.query(func.max(Reservation.updated_at)).scalar()
+        rows = db.session.query(
+            Reservation.id, Reservation.lab_id,
+            Reservation.start_time, Reservation.end_time
+        ).filter(Reservation.status.in_(ACTIVE_STATUSES)).all()
+
+        with self._lock:
+            self.clear()
+            for row in rows:
+                self._insert(row.id, row.lab_id, row.start_time, row.end_time)
+            for buckets in self._buckets.values():
+                for starts in buckets.values():
+                    starts.sort()
+            self._synced_at = synced_at
+            self._settled_at = started - CATCH_UP_SLACK
+            self._swept_at = started
+            self.warmed = True
+
+    def add(self, reservation):
+        """Track a newly inserted (or re-activated) reservation."""
+        if reservation.status not in ACTIVE_STATUSES:
+            self.discard(reservation.id)
+            return
+        with self._lock:
+            self.discard(reservation.id)
+            self._insert(reservation.id, reservation.lab_id,
+                         reservation.start_time, reservation.end_time, keep_sorted=True)
+
+    def discard(self, reservation_id):
+        """Stop tracking a reservation, e.g. after it has been rejected."""
+        with self._lock:
+            entry = self._entries.pop(reservation_id, None)
+            if entry is None:
+                return
+            lab_id, cls, start_time, _ = entry
+            starts = self._buckets[lab_id][cls]
+            pos = bisect_left(starts, (start_time, reservation_id))
+            if pos < len(starts) and starts[pos] == (start_time, reservation_id):
+                del starts[pos]
+            if not starts:
+                del self._buckets[lab_id][cls]
+
+    def overlapping(self, lab_id, start_time, end_time):
+        """Return ids of indexed reservations in ``lab_id`` overlapping the range."""
+        with self._lock:
+            found = []
+            for cls, starts in self._buckets.get(lab_id, {}).items():
+                lo = bisect_left(starts, (start_time - timedelta(minutes=2 ** cls),))
+                hi = bisect_left(starts, (end_time,))
+                found.extend(res_id for _, res_id in starts[lo:hi]
+                             if self._entries[res_id][3] > start_time)
+            return found
+
+    def catch_up(self):
+        """Apply reservations inserted or changed by other worker processes.
+
+        Reads the rows stamped after the newest change applied so far through
+        the ``updated_at`` index; when nothing changed that is one empty
+        range lookup. At most once per ``CATCH_UP_SWEEP_INTERVAL`` the read
+        reaches back ``CATCH_UP_SLACK`` further, for transactions that
+        committed after a newer stamp had been applied, but never before the
+        last such sweep started less ``CATCH_UP_SLACK``. That point only moves
+        once the sweep's rows have been applied, so a thread never skips rows
+        that a concurrent or failed sweep has not read yet.
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            since = self._synced_at
+            sweep = since is None or (now - self._swept_at).total_seconds() >= CATCH_UP_SWEEP_INTERVAL
+            if sweep:
+                if since is not None:
+                    since = min(since, max(since - CATCH_UP_SLACK, self._settled_at))
+                # Other threads skip the look back while this one runs it
+                self._swept_at = now
+        query = db.session.query(
+            Reservation.id, Reservation.lab_id, Reservation.start_time,
+            Reservation.end_time, Reservation.status, Reservation.updated_at
+        )
+        if since is not None:
+            query = query.filter(Reservation.updated_at > since)
+        else:
+            query = query.filter(Reservation.updated_at.isnot(None))
+        rows = query.all()
+        with self._lock:
+            for row in rows:
+                entry = self._entries.get(row.id)
+                if row.status not in ACTIVE_STATUSES:
+                    self.discard(row.id)
+                elif entry is None or entry[0] != row.lab_id or entry[2:] != (row.start_time, row.end_time):
+                    self.discard(row.id)
+                    self._insert(row.id, row.lab_id, row.start_time, row.end_time, keep_sorted=True)
+                if self._synced_at is None or row.updated_at > self._synced_at:
+                    self._synced_at = row.updated_at
+            if sweep and (self._settled_at is None or now - CATCH_UP_SLACK > self._settled_at):
+                self._settled_at = now - CATCH_UP_SLACK
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _insert(self, res_id, lab_id, start_time, end_time, keep_sorted=False):
+        cls = span_class(start_time, end_time)
+        self._entries[res_id] = (lab_id, cls, start_time, end_time)
+        starts = self._buckets.setdefault(lab_id, {}).setdefault(cls, [])
+        if keep_sorted:
+            insort(starts, (start_time, res_id))
+        else:
+            starts.append((start_time, res_id))
+
+
+reservation_index = ReservationIndex()
+
+
+def find_conflicts(lab_id, start_time, end_time, exclude_id=None):
+    """Return every active reservation in ``lab_id`` overlapping the range.
+
+    Candidates come from the in-memory index and are re-verified against the
+    database by primary key, which drops entries another worker has since
+    rejected. If the index has not been warmed, the range query runs directly
+    against the database instead.
+    """
+    query = Reservation.query.filter(
+        Reservation.lab_id == lab_id,
+        Reservation.status.in_(ACTIVE_STATUSES),
+        Reservation.start_time < end_time,
+        Reservation.end_time > start_time
+    )
+    if exclude_id is not None:
+        query = query.filter(Reservation.id != exclude_id)
+
+    if not reservation_index.warmed:
+        return query.order_by(Reservation.start_time).all()
+
+    reservation_index.catch_up()
+    candidate_ids = [res_id for res_id in reservation_index.overlapping(lab_id, start_time, end_time)
+                     if res_id != exclude_id]
+    if not candidate_ids:
+        return []
+
+    conflicts = query.filter(Reservation.id.in_(candidate_ids)).order_by(Reservation.start_time).all()
+    stale_ids = set(candidate_ids) - {res.id for res in conflicts}
+    for res_id in stale_ids:
+        reservation_index.discard(res_id)
+    return conflicts
+
+
+def find_batch_conflicts(lab_id, ranges):
+    """Check many ``(start, end)`` ranges in ``lab_id`` at once.
+
+    Loads the lab's active reservations covering the whole batch with one
+    query, then sweeps ranges and reservations in start order, keeping a heap
+    of reservations that have started, keyed by end time. A longer range may
+    have pushed reservations that begin after a later, shorter range ends, so
+    those are skipped when reporting. Returns a list of
+    ``(range_index, [conflicting reservations])`` for ranges that conflict.
+    """
+    if not ranges:
+        return []
+
+    existing = Reservation.query.filter(
+        Reservation.lab_id == lab_id,
+        Reservation.status.in_(ACTIVE_STATUSES),
+        Reservation.start_time < max(end for _, end in ranges),
+        Reservation.end_time > min(start for start, _ in ranges)
+    ).order_by(Reservation.start_time).all()
+
+    conflicts = []
+    started = []    # heap of (end_time, id, reservation)
+    next_pos = 0
+    for i in sorted(range(len(ranges)), key=lambda i: ranges[i][0]):
+        start, end = ranges[i]
+        while next_pos < len(existing) and existing[next_pos].start_time < end:
+            res = existing[next_pos]
+            heapq.heappush(started, (res.end_time, res.id, res))
+            next_pos += 1
+        # Ranges are visited in start order, so anything ended by now never overlaps again
+        while started and started[0][0] <= start:
+            heapq.heappop(started)
+        overlapping = [res for _, _, res in started if res.start_time < end]
+        if overlapping:
+            conflicts.append((i, sorted(overlapping, key=lambda r: r.start_time)))
+    conflicts.sort(key=lambda item: item[0])
+    return conflicts
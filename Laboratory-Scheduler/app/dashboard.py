@@ -0,0 +1,89 @@
+"""
+Dashboard counters, computed in one statement and cached briefly.
+
+The dashboard is the landing page after every login. Its counters come from
+a single UNION ALL of grouped counts. They are cached per role (and per
+instructor) for ``DASHBOARD_CACHE_TTL`` seconds. A committed write that
+moves a data version (see app.cache) clears this process's entries at once;
+other worker processes catch up when their entries expire.
+
+Each branch of ``dashboard()`` therefore has a fixed query budget, checked
+by ``benchmarks/query_budget.py``.
+"""
+
+from sqlalchemy import select, func, literal, union_all
+from app import db
+from app.cache import ReportCache, on_data_change
+from app.models import Laboratory, Instructor, Reservation
+
+
+class DashboardCache(ReportCache):
+    """Short-lived counters keyed on role; every entry shares version 0"""
+
+    def __init__(self, max_entries=1024, ttl=5):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('DASHBOARD_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('DASHBOARD_CACHE_TTL', self.ttl)
+        app.extensions['dashboard_cache'] = self
+
+    def counters(self, key, compute):
+        if self.ttl <= 0:
+            return compute()
+        value = self.get(key, 0)
+        if value is None:
+            value = compute()
+            self.set(key, 0, value)
+        return value
+
+
+dashboard_cache = DashboardCache()
+
+
+@on_data_change
+def _clear_dashboard_cache(scopes):
+    dashboard_cache.clear()
+
+
+def _count_rows(*selects):
+    """Run ``(name, count)`` selects as one UNION ALL and return a dict"""
+    return {name: count for name, count in db.session.execute(union_all(*selects)).all()}
+
+
+def _active_labs():
+    return select(literal('labs'), func.count()).select_from(Laboratory).where(
+        Laboratory.is_active == True)
+
+
+def admin_counters():
+    """Active labs and instructors plus reservations per status"""
+    def compute():
+        counts = _count_rows(
+            _active_labs(),
+            select(literal('instructors'), func.count()).select_from(Instructor).where(
+                Instructor.is_active == True),
+            select(Reservation.status, func.count()).group_by(Reservation.status)
+        )
+        return {
+            'total_labs': counts.get('labs', 0),
+            'instructors_count': counts.get('instructors', 0),
+            'total_sessions': counts.get('approved', 0),
+            'pending_requests': counts.get('pending', 0),
+        }
+    return dashboard_cache.counters(('admin',), compute)
+
+
+def instructor_counters(instructor_id):
+    """Active labs plus the instructor's reservations per status"""
+    def compute():
+        counts = _count_rows(
+            _active_labs(),
+            select(Reservation.status, func.count()).where(
+                Reservation.instructor_id == instructor_id).group_by(Reservation.status)
+        )
+        return {
+            'available_labs': counts.get('labs', 0),
+            'pending_requests': counts.get('pending', 0),
+        }
+    return dashboard_cache.counters(('instructor', instructor_id), compute)
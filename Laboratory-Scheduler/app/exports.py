@@ -0,0 +1,105 @@
+"""
+Streaming schedule exporters.
+
+Each exporter takes an iterable of schedule rows (see
+``routes.schedule_query``) and yields text chunks as rows arrive, so an
+export never holds more than one batch of rows in memory.
+"""
+
+import csv
+import io
+from datetime import datetime
+
+# Rows written between yields; also used as the query's yield_per size
+EXPORT_BATCH_SIZE = 500
+
+CSV_COLUMNS = ['id', 'course_name', 'section', 'laboratory', 'room_number',
+               'instructor', 'start_time', 'end_time', 'status', 'notes']
+
+# Keeps event UIDs stable across hosts so calendar clients update in place
+ICAL_UID_DOMAIN = 'it-lab-system'
+
+ICAL_STATUS = {
+    'approved': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'pending': 'TENTATIVE',
+    'rejected': 'CANCELLED'
+}
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow([
+            row.id, row.course_name, row.section, row.lab, row.room_number,
+            row.instructor, row.start_time.strftime('%Y-%m-%d %H:%M'),
+            row.end_time.strftime('%Y-%m-%d %H:%M'), row.status, row.notes or ''
+        ])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _ical_escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;') \
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _ical_line(line):
+    """Fold a content line at 75 octets as required by RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def stream_ical(rows):
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    chunk = [
+        _ical_line('BEGIN:VCALENDAR'),
+        _ical_line('VERSION:2.0'),
+        _ical_line('PRODID:-//IT Laboratory Schedule System//EN'),
+        _ical_line('CALSCALE:GREGORIAN'),
+    ]
+
+    for count, row in enumerate(rows, 1):
+        chunk.extend([
+            _ical_line('BEGIN:VEVENT'),
+            _ical_line(f'UID:reservation-{row.id}@{ICAL_UID_DOMAIN}'),
+            _ical_line(f'DTSTAMP:{stamp}'),
+            _ical_line(f"DTSTART:{row.start_time.strftime('%Y%m%dT%H%M%S')}"),
+            _ical_line(f"DTEND:{row.end_time.strftime('%Y%m%dT%H%M%S')}"),
+            _ical_line(f'SUMMARY:{_ical_escape(f"{row.course_name} - {row.section}")}'),
+            _ical_line(f'LOCATION:{_ical_escape(f"{row.lab} ({row.room_number})")}'),
+            _ical_line(f'DESCRIPTION:{_ical_escape(f"Instructor: {row.instructor}")}'),
+            _ical_line(f"STATUS:{ICAL_STATUS.get(row.status, 'TENTATIVE')}"),
+            _ical_line('END:VEVENT'),
+        ])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield ''.join(chunk)
+            chunk = []
+
+    chunk.append(_ical_line('END:VCALENDAR'))
+    yield ''.join(chunk)
+
+
+EXPORTERS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'ics': (stream_ical, 'text/calendar', 'ics'),
+    'ical': (stream_ical, 'text/calendar', 'ics'),
+}
@@ -1,8 +1,9 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SelectField, TextAreaField, DateTimeField, BooleanField, SubmitField, IntegerField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError
-from datetime import datetime, time
+from wtforms import StringField, PasswordField, SelectField, TextAreaField, DateTimeField, DateField, BooleanField, SubmitField, IntegerField
+from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Optional
+from datetime import datetime, time, timedelta
 from app.models import User
+from app.recurrence import parse_skip_dates
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(max=80)])
@@ -27,6 +28,13 @@ class ReservationForm(FlaskForm):
     start_time = DateTimeField('Start Time', format='%Y-%m-%d %H:%M', validators=[DataRequired()])
     end_time = DateTimeField('End Time', format='%Y-%m-%d %H:%M', validators=[DataRequired()])
     notes = TextAreaField('Notes')
+    recurrence = SelectField('Repeat', choices=[
+        ('none', 'Does not repeat'),
+        ('weekly', 'Weekly'),
+        ('biweekly', 'Every 2 weeks')
+    ], default='none')
+    repeat_until = DateField('Repeat Until', format='%Y-%m-%d', validators=[Optional()])
+    skip_dates = TextAreaField('Skip Dates', validators=[Optional(), Length(max=1000)])
     submit = SubmitField('Submit Request')
     reset = SubmitField('Reset')
 
@@ -41,6 +49,23 @@ class ReservationForm(FlaskForm):
             if duration.total_seconds() > 86400:  # 24 hours
                 raise ValidationError('Maximum reservation duration is 24 hours.')
 
+    def validate_repeat_until(self, field):
+        if self.recurrence.data == 'none':
+            return
+        if not field.data:
+            raise ValidationError('Choose the date the reservation repeats until.')
+        if self.start_time.data:
+            if field.data < self.start_time.data.date():
+                raise ValidationError('Repeat until must be on or after the first session.')
+            if field.data > self.start_time.data.date() + timedelta(days=366):
+                raise ValidationError('A recurring reservation can span at most one year.')
+
+    def validate_skip_dates(self, field):
+        try:
+            parse_skip_dates(field.data)
+        except ValueError:
+            raise ValidationError('Skip dates must be YYYY-MM-DD, separated by commas.')
+
 class LaboratoryForm(FlaskForm):
     name = StringField('Laboratory Name', validators=[DataRequired(), Length(max=100)])
     room_number = StringField('Room Number', validators=[DataRequired(), Length(max=20)])
@@ -0,0 +1,81 @@
+"""
+Rendered-fragment cache for markup shared by many requests.
+
+``{% cache 'name', key, ... %}...{% endcache %}`` renders its body once
+per distinct key and then serves the stored markup. The key must name
+everything the body depends on: the navbar and sidebar menus depend only on
+the user type and the bell badge only on the unread count, so every page
+reuses them. Per-user markup such as the username or the notification list
+stays outside the tag.
+
+Entries are kept per worker process and never go stale on their own, so
+the cache is off where templates are edited in place (DevelopmentConfig).
+"""
+
+import threading
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """Bounded LRU of rendered template fragments"""
+
+    def __init__(self, max_entries=256):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> Markup
+        self.max_entries = max_entries
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('TEMPLATE_FRAGMENT_CACHE_MAX_ENTRIES', self.max_entries)
+        self.enabled = app.config.get('TEMPLATE_FRAGMENT_CACHE', self.enabled)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.extensions['fragment_cache'] = self
+
+    def render(self, key, caller):
+        if not self.enabled:
+            return caller()
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return markup
+            self.misses += 1
+        markup = caller()
+        with self._lock:
+            self._entries[key] = markup
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return markup
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the ``{% cache %}`` tag backed by ``fragment_cache``"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        # The template name keeps same-named fragments of different files apart
+        key.insert(0, nodes.Const(parser.name))
+        return nodes.CallBlock(
+            self.call_method('_render_fragment', [nodes.Tuple(key, 'load')]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render_fragment(self, key, caller):
+        return fragment_cache.render(key, caller)
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,127 @@
+"""
+Per-process cache of authenticated users for the Flask-Login user loader.
+
+A miss loads the user together with its instructor or student profile in
+one joined query and keeps a detached copy. Every request gets its own
+session-bound copy through ``Session.merge(load=False)``, which copies the
+cached state without touching the database. Routes can therefore use
+``current_user.instructor_profile`` and the navbar fields without any
+identity queries.
+
+Entries are dropped after the transaction that changed them commits: ORM
+changes to a user or profile are caught by a flush hook, and set-based
+updates (such as the unread counter) call ``mark_user_stale``. Other worker
+processes see such changes once the TTL expires.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload
+from app import db
+from app.models import User, Instructor, Student
+
+
+def mark_user_stale(user_id, session=None):
+    """Drop ``user_id`` from the cache once the current transaction commits"""
+    session = session or db.session()
+    session.info.setdefault('stale_users', set()).add(user_id)
+
+
+class UserCache:
+    """Bounded LRU of detached users with their profiles, expiring after ``ttl``"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # user_id -> (expires_at, detached user)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('USER_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        app.extensions['user_cache'] = self
+
+    def load(self, user_id):
+        """Return a copy of the user bound to the current session, or None"""
+        cached = self._get(user_id)
+        if cached is None:
+            cached = self._fetch(user_id)
+            if cached is None:
+                return None
+            self._set(user_id, cached)
+        return db.session.merge(cached, load=False)
+
+    def _fetch(self, user_id):
+        # A private session keeps the cached copy away from the request's
+        # identity map; closing it leaves the loaded objects detached
+        with Session(db.engine) as session:
+            return session.scalars(
+                select(User).options(
+                    joinedload(User.instructor_profile),
+                    joinedload(User.student_profile)
+                ).where(User.id == user_id)
+            ).first()
+
+    def _get(self, user_id):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def _set(self, user_id, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            if obj.id is not None:
+                mark_user_stale(obj.id, session)
+        elif isinstance(obj, (Instructor, Student)):
+            if obj.user_id is not None:
+                mark_user_stale(obj.user_id, session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('stale_users', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('stale_users', None)
@@ -0,0 +1,363 @@
+"""
+Durable background jobs stored in the application database.
+
+Routes call ``job_queue.enqueue(kind, payload, key=...)`` inside their own
+transaction and return without waiting. A job therefore exists exactly when
+the change that caused it commits. ``python manage.py run-worker`` claims
+due jobs in batches with one UPDATE ... RETURNING, runs their handlers and
+commits the whole batch once. If a batch fails, it is rolled back and run
+again job by job, so one bad job cannot hold up the rest. A failed job is
+retried with exponential backoff and jitter until it has used
+``max_attempts``, then parked as ``dead`` with its last error.
+
+Idempotency keys are unique, and enqueueing a key that is already in the
+table does nothing, so a double-clicked approval queues one notification.
+Database side effects commit together with the job's ``done`` mark and so
+happen once. External ones, such as email, may repeat if a worker dies
+between sending and committing. A worker that dies mid-batch loses its
+lease after ``JOB_LEASE_SECONDS`` and its jobs are claimed again.
+
+Queue depth and lag are read from the table when ``/metrics`` is scraped.
+"""
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, func, case
+from app import db
+from app.models import Job
+
+job_table = Job.__table__
+
+JOB_STATUSES = ('queued', 'running', 'dead')
+
+_handlers = {}   # kind -> (callable, batched)
+
+
+def job_handler(kind, batch=False):
+    """Register the handler of ``kind``.
+
+    A plain handler is called with each job's payload. A ``batch`` handler
+    is called once per claimed batch with the list of payloads.
+    """
+    def decorator(func):
+        _handlers[kind] = (func, batch)
+        return func
+    return decorator
+
+
+def _insert_ignoring_duplicates(dialect):
+    """INSERT that skips rows whose idempotency key exists, or None if unsupported"""
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(job_table).on_conflict_do_nothing(index_elements=['idempotency_key'])
+
+
+class JobQueue:
+    """Enqueues jobs in the caller's transaction and runs them in batches"""
+
+    def __init__(self, batch_size=50, max_attempts=5, retry_base_delay=10, retry_max_delay=3600,
+                 lease_seconds=300, poll_interval=1.0, retention_days=7):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._app = None
+        self._next_prune = 0
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retention_days = retention_days
+
+    def init_app(self, app):
+        self.batch_size = app.config.get('JOB_BATCH_SIZE', self.batch_size)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_base_delay = app.config.get('JOB_RETRY_BASE_DELAY', self.retry_base_delay)
+        self.retry_max_delay = app.config.get('JOB_RETRY_MAX_DELAY', self.retry_max_delay)
+        self.lease_seconds = app.config.get('JOB_LEASE_SECONDS', self.lease_seconds)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+        self.retention_days = app.config.get('JOB_RETENTION_DAYS', self.retention_days)
+        app.extensions['job_queue'] = self
+
+        from app.metrics import request_metrics
+        request_metrics.add_collector('jobs', self.render_metrics)
+        if app.config.get('JOB_EMBEDDED_WORKER'):
+            self._app = app
+            app.before_request(self._start_embedded_worker)
+
+    # Enqueueing
+
+    def enqueue(self, kind, payload=None, key=None, delay=0):
+        """Queue one job in the current transaction; the caller commits"""
+        self.enqueue_many(kind, [(key, payload or {})], delay)
+
+    def enqueue_many(self, kind, items, delay=0):
+        """Queue ``(key, payload)`` pairs with one multi-row INSERT; the caller commits.
+
+        Pairs whose key is already in the table, queued or done, are skipped.
+        """
+        if kind not in _handlers:
+            raise ValueError(f'No handler registered for job kind {kind!r}')
+        if not items:
+            return
+        now = datetime.utcnow()
+        rows = [{
+            'kind': kind,
+            'payload': json.dumps(payload, separators=(',', ':')),
+            'idempotency_key': key,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'run_at': now + timedelta(seconds=delay),
+            'created_at': now
+        } for key, payload in items]
+
+        statement = _insert_ignoring_duplicates(db.session.get_bind().dialect.name)
+        if statement is None:
+            keys = [row['idempotency_key'] for row in rows if row['idempotency_key']]
+            existing = set(db.session.execute(
+                select(job_table.c.idempotency_key).where(job_table.c.idempotency_key.in_(keys))
+            ).scalars()) if keys else set()
+            rows = [row for row in rows if row['idempotency_key'] not in existing]
+            statement = job_table.insert()
+        if rows:
+            db.session.execute(statement, rows)
+
+    # Running
+
+    def claim(self, worker_id, limit):
+        """Mark up to ``limit`` due jobs as running for ``worker_id`` and return them"""
+        now = datetime.utcnow()
+        # Jobs of a worker that died are offered again once their lease runs out
+        db.session.execute(
+            update(job_table)
+            .where(job_table.c.status == 'running',
+                   job_table.c.locked_at < now - timedelta(seconds=self.lease_seconds))
+            .values(status=case((job_table.c.attempts >= job_table.c.max_attempts, 'dead'),
+                                else_='queued'),
+                    locked_by=None, locked_at=None, last_error='Lease expired')
+        )
+        due = select(job_table.c.id).where(
+            job_table.c.status == 'queued',
+            job_table.c.run_at <= now
+        ).order_by(job_table.c.run_at, job_table.c.id).limit(limit)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            due = due.with_for_update(skip_locked=True)
+        jobs = db.session.execute(
+            update(job_table)
+            .where(job_table.c.id.in_(due.scalar_subquery()), job_table.c.status == 'queued')
+            .values(status='running', locked_by=worker_id, locked_at=now,
+                    attempts=job_table.c.attempts + 1)
+            .returning(job_table.c.id, job_table.c.kind, job_table.c.payload,
+                       job_table.c.attempts, job_table.c.max_attempts)
+        ).all()
+        db.session.commit()
+        return sorted(jobs, key=lambda job: job.id)
+
+    def work(self, worker_id, limit=None):
+        """Claim and run one batch; return ``(succeeded, failed)``"""
+        jobs = self.claim(worker_id, limit or self.batch_size)
+        if len(jobs) > 1:
+            try:
+                self._run(jobs)
+                self._finish(worker_id, jobs)
+                db.session.commit()
+                return len(jobs), 0
+            except Exception:
+                db.session.rollback()
+                current_app.logger.warning('Batch of %d jobs failed; running them one by one', len(jobs))
+
+        failed = 0
+        for job in jobs:
+            try:
+                self._run([job])
+                self._finish(worker_id, [job])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self._retry_later(worker_id, job, e)
+                db.session.commit()
+                failed += 1
+        return len(jobs) - failed, failed
+
+    def _run(self, jobs):
+        by_kind = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(json.loads(job.payload))
+        for kind, payloads in by_kind.items():
+            if kind not in _handlers:
+                raise LookupError(f'No handler registered for job kind {kind!r}')
+            handler, batch = _handlers[kind]
+            if batch:
+                handler(payloads)
+            else:
+                for payload in payloads:
+                    handler(payload)
+
+    def _finish(self, worker_id, jobs):
+        ids = [job.id for job in jobs]
+        result = db.session.execute(
+            update(job_table)
+            .where(job_table.c.id.in_(ids), job_table.c.locked_by == worker_id)
+            .values(status='done', finished_at=datetime.utcnow(), locked_by=None,
+                    locked_at=None, last_error=None)
+        )
+        if result.rowcount != len(ids):
+            # Another worker took over after our lease expired; let it finish
+            raise RuntimeError('Lease lost before the batch committed')
+
+    def backoff(self, attempts):
+        """Seconds to wait after the ``attempts``-th failure: doubling, capped, half jittered"""
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _retry_later(self, worker_id, job, error):
+        now = datetime.utcnow()
+        values = {'locked_by': None, 'locked_at': None,
+                  'last_error': f'{type(error).__name__}: {error}'[:2000]}
+        if job.attempts >= job.max_attempts:
+            values.update(status='dead', finished_at=now)
+            current_app.logger.error('Job %d (%s) failed for good after %d attempts: %s',
+                                     job.id, job.kind, job.attempts, values['last_error'])
+        else:
+            values.update(status='queued', run_at=now + timedelta(seconds=self.backoff(job.attempts)))
+            current_app.logger.warning('Job %d (%s) failed on attempt %d of %d: %s',
+                                       job.id, job.kind, job.attempts, job.max_attempts,
+                                       values['last_error'])
+        db.session.execute(
+            update(job_table)
+            .where(job_table.c.id == job.id, job_table.c.locked_by == worker_id)
+            .values(**values)
+        )
+
+    def prune(self):
+        """Delete done jobs older than ``retention_days``; dead jobs are kept"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        result = db.session.execute(
+            delete(job_table).where(job_table.c.status == 'done', job_table.c.finished_at < cutoff)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def run(self, batch_size=None, once=False, stop=None, report=None):
+        """Process batches until ``stop`` is set, or until the queue is drained with ``once``.
+
+        Returns ``(succeeded, failed)`` totals. ``report(succeeded, failed,
+        seconds)`` is called after every non-empty batch.
+        """
+        worker_id = f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        stop = stop or threading.Event()
+        totals = [0, 0]
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                succeeded, failed = self.work(worker_id, batch_size)
+            except Exception:
+                db.session.rollback()
+                if once:
+                    raise
+                # The database was unavailable or locked; try again later
+                current_app.logger.exception('Job worker could not claim a batch')
+                stop.wait(self.poll_interval)
+                continue
+            if succeeded or failed:
+                totals[0] += succeeded
+                totals[1] += failed
+                if report:
+                    report(succeeded, failed, time.perf_counter() - started)
+                continue
+            if once:
+                break
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + 3600
+                self.prune()
+            stop.wait(self.poll_interval)
+        return tuple(totals)
+
+    def _start_embedded_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._embedded_worker, args=(self._app,),
+                                                name='job-worker', daemon=True)
+                self._thread.start()
+
+    def _embedded_worker(self, app):
+        with app.app_context():
+            self.run()
+
+    # Monitoring
+
+    def stats(self):
+        """Jobs per kind and status, and the lag of the oldest due job per kind"""
+        now = datetime.utcnow()
+        rows = db.session.execute(
+            select(job_table.c.kind, job_table.c.status, func.count(), func.min(job_table.c.run_at))
+            .where(job_table.c.status.in_(JOB_STATUSES))
+            .group_by(job_table.c.kind, job_table.c.status)
+        ).all()
+        stats = {kind: {'queued': 0, 'running': 0, 'dead': 0, 'lag_seconds': 0.0}
+                 for kind in _handlers}
+        for kind, status, count, oldest in rows:
+            entry = stats.setdefault(kind, {'queued': 0, 'running': 0, 'dead': 0, 'lag_seconds': 0.0})
+            entry[status] = count
+            if status == 'queued' and oldest is not None and oldest < now:
+                entry['lag_seconds'] = (now - oldest).total_seconds()
+        return stats
+
+    def render_metrics(self, prefix):
+        """Queue gauges for /metrics; every process reports the same table"""
+        try:
+            stats = self.stats()
+        except Exception:
+            current_app.logger.exception('Could not read the job queue for metrics')
+            return []
+        depth, lag = [], []
+        for kind, entry in sorted(stats.items()):
+            for status in JOB_STATUSES:
+                depth.append(f'{prefix}_jobs{{kind="{kind}",status="{status}"}} {entry[status]}')
+            lag.append(f'{prefix}_job_lag_seconds{{kind="{kind}"}} {entry["lag_seconds"]:.3f}')
+        return [
+            f'# HELP {prefix}_jobs Jobs in the queue by kind and status (not per process).',
+            f'# TYPE {prefix}_jobs gauge',
+            *depth,
+            f'# HELP {prefix}_job_lag_seconds How long the oldest due job has been waiting.',
+            f'# TYPE {prefix}_job_lag_seconds gauge',
+            *lag,
+        ]
+
+
+job_queue = JobQueue()
+
+
+# Handlers
+
+@job_handler('notification', batch=True)
+def deliver_notifications(payloads):
+    """Insert the notifications of one batch with a single multi-row INSERT"""
+    from app.notifications import create_notifications
+    create_notifications([{
+        'user_id': payload['user_id'],
+        'reservation_id': payload.get('reservation_id'),
+        'title': payload['title'],
+        'message': payload['message']
+    } for payload in payloads])
+
+
+@job_handler('password_reset')
+def send_password_reset(payload):
+    """Send reset instructions. No mail transport is configured yet, so log them"""
+    current_app.logger.info('Password reset instructions requested for user %s <%s>',
+                            payload['user_id'], payload['email'])
@@ -0,0 +1,193 @@
+"""
+Per-endpoint request metrics in the Prometheus text format.
+
+Request hooks time each request. Cursor listeners on the engine count SQL
+statements and their time against the request being served, and the
+template signals time rendering. Every finished request adds one sample to
+its endpoint's series under a single lock. Rendering happens only when
+``/metrics`` is scraped, so a request pays for a few ``perf_counter`` calls
+and a dict update.
+
+Series are kept per worker process. Each process reports its own ``pid``
+label, so a scraper can sum them. Collectors registered with
+``add_collector`` append gauges computed at scrape time, such as the job
+queue's depth and lag.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from app import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts per bucket, cumulated when rendered"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class EndpointSeries:
+    __slots__ = ('latency', 'queries', 'sql_seconds', 'template_seconds', 'statuses')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statuses = {}
+
+
+class RequestMetrics:
+    """Collects request, SQL and template timings per (endpoint, method)"""
+
+    def __init__(self, prefix='labsched'):
+        self._lock = threading.Lock()
+        self._series = {}   # (endpoint, method) -> EndpointSeries
+        self.prefix = prefix
+        self.enabled = True
+        self.started_at = time.time()
+        self._collectors = {}   # name -> callable(prefix) returning exposition lines
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', self.enabled)
+        app.extensions['request_metrics'] = self
+        if not self.enabled:
+            return
+        # First in line, so time spent in other hooks (CSRF, login) counts too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._start_template, app)
+        template_rendered.connect(self._finish_template, app)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._start_query)
+            event.listen(db.engine, 'after_cursor_execute', self._finish_query)
+            event.listen(db.engine, 'handle_error', self._failed_query)
+
+    def _start_request(self):
+        g._metrics = {'started': time.perf_counter(), 'queries': 0, 'sql': 0.0,
+                      'template': 0.0, 'template_started': []}
+
+    def _finish_request(self, response):
+        sample = g.pop('_metrics', None)
+        if sample is not None:
+            # Unmatched URLs share one series to keep the label set bounded
+            self.observe(request.endpoint or 'unmatched', request.method, response.status_code,
+                         time.perf_counter() - sample['started'], sample['queries'],
+                         sample['sql'], sample['template'])
+        return response
+
+    def _start_query(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and '_metrics' in g:
+            conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    def _finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_query_started')
+        if started and has_request_context() and '_metrics' in g:
+            g._metrics['queries'] += 1
+            g._metrics['sql'] += time.perf_counter() - started.pop()
+
+    def _failed_query(self, exception_context):
+        conn = exception_context.connection
+        started = conn.info.get('metrics_query_started') if conn is not None else None
+        if started:
+            started.pop()
+
+    def _start_template(self, sender, template, context, **extra):
+        if '_metrics' in g:
+            g._metrics['template_started'].append(time.perf_counter())
+
+    def _finish_template(self, sender, template, context, **extra):
+        sample = g.get('_metrics')
+        if sample and sample['template_started']:
+            sample['template'] += time.perf_counter() - sample['template_started'].pop()
+
+    def observe(self, endpoint, method, status, seconds, queries=0, sql_seconds=0.0,
+                template_seconds=0.0):
+        with self._lock:
+            series = self._series.get((endpoint, method))
+            if series is None:
+                series = self._series[(endpoint, method)] = EndpointSeries()
+            series.latency.observe(seconds)
+            series.queries.observe(queries)
+            series.sql_seconds += sql_seconds
+            series.template_seconds += template_seconds
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def add_collector(self, name, collector):
+        """Append ``collector(prefix)``'s lines to every scrape; one per name"""
+        self._collectors[name] = collector
+
+    def render(self):
+        """All series in the Prometheus text exposition format (version 0.0.4)"""
+        p = self.prefix
+        pid = os.getpid()
+        with self._lock:
+            series = sorted(self._series.items())
+            requests_total, latency, queries, sql, templates = [], [], [], [], []
+            for (endpoint, method), stats in series:
+                labels = f'endpoint="{endpoint}",method="{method}",pid="{pid}"'
+                for status, count in sorted(stats.statuses.items()):
+                    requests_total.append(f'{p}_requests_total{{{labels},status="{status}"}} {count}')
+                latency += stats.latency.render(f'{p}_request_duration_seconds', labels)
+                queries += stats.queries.render(f'{p}_request_sql_queries', labels)
+                sql.append(f'{p}_request_sql_seconds_total{{{labels}}} {stats.sql_seconds:.6f}')
+                templates.append(f'{p}_request_template_seconds_total{{{labels}}} '
+                                 f'{stats.template_seconds:.6f}')
+
+        lines = [
+            f'# HELP {p}_process_start_time_seconds Start time of this worker process.',
+            f'# TYPE {p}_process_start_time_seconds gauge',
+            f'{p}_process_start_time_seconds{{pid="{pid}"}} {self.started_at:.3f}',
+            f'# HELP {p}_requests_total Requests served, by endpoint and status.',
+            f'# TYPE {p}_requests_total counter',
+            *requests_total,
+            f'# HELP {p}_request_duration_seconds Time from the first request hook to the response.',
+            f'# TYPE {p}_request_duration_seconds histogram',
+            *latency,
+            f'# HELP {p}_request_sql_queries SQL statements executed per request.',
+            f'# TYPE {p}_request_sql_queries histogram',
+            *queries,
+            f'# HELP {p}_request_sql_seconds_total Time spent executing SQL.',
+            f'# TYPE {p}_request_sql_seconds_total counter',
+            *sql,
+            f'# HELP {p}_request_template_seconds_total Time spent rendering templates.',
+            f'# TYPE {p}_request_template_seconds_total counter',
+            *templates,
+        ]
+        for name, collector in sorted(self._collectors.items()):
+            lines += collector(p)
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
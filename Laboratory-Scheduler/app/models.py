@@ -1,27 +1,41 @@
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-
-db = SQLAlchemy()
+from app import db
+from app.passwords import password_hasher
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(255))
     user_type = db.Column(db.Enum('admin', 'instructor', 'student'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Maintained by app.notifications; rebuilt by `manage.py reconcile-notifications`
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     instructor_profile = db.relationship('Instructor', backref='user', uselist=False)
     student_profile = db.relationship('Student', backref='user', uselist=False)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify ``password``, upgrading a hash made with an older method or cost.
+
+        The upgraded hash is only assigned here; the caller commits it.
+        Raises ``HasherBusy`` when the hashing pool is saturated.
+        """
+        matches, upgraded = password_hasher.verify(self.password_hash, password)
+        if upgraded:
+            self.password_hash = upgraded
+        return matches
+    
+    def latest_notifications(self, limit=5):
+        """Newest notifications without loading the whole history"""
+        return Notification.query.filter_by(user_id=self.id).order_by(
+            Notification.created_at.desc(), Notification.id.desc()
+        ).limit(limit).all()
 
 class Instructor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -54,6 +68,22 @@ class Laboratory(db.Model):
     reservations = db.relationship('Reservation', backref='laboratory', lazy=True)
 
 class Reservation(db.Model):
+    __table_args__ = (
+        # Conflict checks, lab calendars and the admin dashboard
+        db.Index('ix_reservation_lab_status_start', 'lab_id', 'status', 'start_time'),
+        # Student dashboard (today's sessions for a section)
+        db.Index('ix_reservation_section_status_start', 'section', 'status', 'start_time'),
+        # Instructor dashboard (upcoming sessions and pending count)
+        db.Index('ix_reservation_instructor_status_start', 'instructor_id', 'status', 'start_time'),
+        # Pending request queue ordered by submission time
+        db.Index('ix_reservation_status_created', 'status', 'created_at'),
+        db.Index('ix_reservation_created_at', 'created_at'),
+        # Approving or rejecting a recurring series as a unit
+        db.Index('ix_reservation_series_id', 'series_id'),
+        # Changes made by other workers, for the conflict index (app.conflicts)
+        db.Index('ix_reservation_updated_at', 'updated_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     instructor_id = db.Column(db.Integer, db.ForeignKey('instructor.id'), nullable=False)
     lab_id = db.Column(db.Integer, db.ForeignKey('laboratory.id'), nullable=False)
@@ -63,12 +93,22 @@ class Reservation(db.Model):
     end_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.Enum('pending', 'approved', 'rejected', 'completed'), default='pending')
     notes = db.Column(db.Text)
+    # Shared by every occurrence of a recurring request (see app.recurrence)
+    series_id = db.Column(db.String(32))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set-based UPDATEs must set it too
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     notifications = db.relationship('Notification', backref='reservation', lazy=True)
 
 class Notification(db.Model):
+    __table_args__ = (
+        # Unread badge and the newest-first notification list
+        db.Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_at'),
+        db.Index('ix_notification_user_created', 'user_id', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     reservation_id = db.Column(db.Integer, db.ForeignKey('reservation.id'))
@@ -77,4 +117,49 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    user = db.relationship('User', backref='notifications')
\ No newline at end of file
+    user = db.relationship('User', backref=db.backref('notifications', lazy='dynamic'))
+
+class LabHourlyUsage(db.Model):
+    """Approved reservations per lab, day and start hour (see app.rollups)"""
+    __tablename__ = 'lab_hourly_usage'
+    
+    lab_id = db.Column(db.Integer, db.ForeignKey('laboratory.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    hour = db.Column(db.Integer, primary_key=True)
+    reservation_count = db.Column(db.Integer, nullable=False, default=0)
+
+class InstructorMonthlyUsage(db.Model):
+    """Approved reservations per instructor and month (see app.rollups)"""
+    __tablename__ = 'instructor_monthly_usage'
+    
+    instructor_id = db.Column(db.Integer, db.ForeignKey('instructor.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    reservation_count = db.Column(db.Integer, nullable=False, default=0)
+
+class DataVersion(db.Model):
+    """Change counter per data scope, bumped on writes (see app.cache)"""
+    __tablename__ = 'data_version'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    """A queued side effect, run by the background worker (see app.jobs)"""
+    __table_args__ = (
+        # The worker's claim query: due jobs of one status, oldest first
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    idempotency_key = db.Column(db.String(120), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
@@ -0,0 +1,391 @@
+"""
+Notification helpers that keep the per-user unread counter in step, and the
+in-process broker behind the ``/api/notifications/stream`` SSE endpoint.
+
+All notification inserts and read-state changes go through these functions
+so ``User.unread_notifications`` never needs a COUNT over the history.
+
+Most notifications are inserted by the job worker (see app.jobs), in another
+process. Each web process therefore runs a relay thread that polls for rows
+newer than the last one it saw, every ``NOTIFICATION_RELAY_INTERVAL``
+seconds, and for lower ids it skipped that may still be committed. The relay
+publishes those rows to its streams and drops their users from the user
+cache, so the unread badge is refreshed as well.
+"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, func, case, or_, and_, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Notification
+from app.identity import mark_user_stale, user_cache
+
+# Most rows the relay reads per poll
+RELAY_BATCH = 500
+# How long the relay keeps polling for an id it skipped, which an open
+# transaction may still commit, and how many ids of one jump it tracks
+RELAY_GAP_TIMEOUT = 60  # seconds
+RELAY_MAX_GAP = 1000
+
+
+def _adjust_unread(user_id, delta):
+    """Atomically add ``delta`` to a user's unread counter, never below zero"""
+    if not delta:
+        return
+    new_value = User.unread_notifications + delta
+    if delta < 0:
+        new_value = case((new_value < 0, 0), else_=new_value)
+    User.query.filter(User.id == user_id).update(
+        {User.unread_notifications: new_value}, synchronize_session=False
+    )
+    mark_user_stale(user_id)
+
+
+def create_notification(user_id, title, message, reservation_id=None):
+    """Add an unread notification for a user; the caller commits"""
+    notification = Notification(
+        user_id=user_id,
+        reservation_id=reservation_id,
+        title=title,
+        message=message
+    )
+    db.session.add(notification)
+    _adjust_unread(user_id, 1)
+    return notification
+
+
+def create_notifications(rows):
+    """Insert many notifications with one multi-row INSERT; the caller commits.
+
+    ``rows`` are dicts with user_id, title, message and reservation_id.
+    Unread counters get one UPDATE per distinct user, and the new rows are
+    queued for the stream broker exactly like single inserts.
+    """
+    if not rows:
+        return []
+    now = datetime.utcnow()
+    table = Notification.__table__
+    inserted = db.session.execute(
+        table.insert().returning(table.c.id, table.c.user_id, table.c.reservation_id,
+                                 table.c.title, table.c.message),
+        [dict(row, is_read=False, created_at=now) for row in rows]
+    ).all()
+
+    per_user = {}
+    for row in rows:
+        per_user[row['user_id']] = per_user.get(row['user_id'], 0) + 1
+    for user_id, count in per_user.items():
+        _adjust_unread(user_id, count)
+
+    unpublished = db.session.info.setdefault('unpublished_notifications', [])
+    for row in inserted:
+        unpublished.append((row.user_id, {
+            'id': row.id,
+            'title': row.title,
+            'message': row.message,
+            'reservation_id': row.reservation_id,
+            'is_read': False,
+            'created_at': now.isoformat()
+        }))
+    return [row.id for row in inserted]
+
+
+def decision_notification(reservation_id, user_id, lab_name, start_time, status, decided_from):
+    """``(key, payload)`` of the job telling an instructor a request was decided.
+
+    ``decided_from`` is the reservation's ``updated_at`` before the decision,
+    so the same decision submitted twice against the same state queues one
+    job, while a later decision (approved, rejected, approved again) gets
+    its own.
+    """
+    stamp = decided_from.isoformat() if decided_from else ''
+    return f'reservation-decision:{reservation_id}:{status}:{stamp}', {
+        'user_id': user_id,
+        'reservation_id': reservation_id,
+        'title': f'Reservation {status.title()}',
+        'message': f'Your reservation for {lab_name} on {start_time.strftime("%Y-%m-%d %H:%M")} has been {status}.'
+    }
+
+
+def mark_read(notification):
+    """Mark one notification read; the caller commits"""
+    updated = Notification.query.filter_by(
+        id=notification.id,
+        is_read=False
+    ).update({'is_read': True}, synchronize_session=False)
+    notification.is_read = True
+    _adjust_unread(notification.user_id, -updated)
+
+
+def mark_all_read(user_id):
+    """Mark every unread notification of a user read; the caller commits"""
+    updated = Notification.query.filter_by(
+        user_id=user_id,
+        is_read=False
+    ).update({'is_read': True}, synchronize_session=False)
+    _adjust_unread(user_id, -updated)
+    return updated
+
+
+def encode_cursor(notification):
+    return f"{notification.created_at.isoformat()}_{notification.id}"
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, id)`` for a cursor, or None if it is malformed"""
+    try:
+        created_at, notification_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def notification_page(user_id, limit=10, cursor=None, offset=None):
+    """Return one newest-first page of a user's notifications.
+
+    Pages after the first are addressed by a ``(created_at, id)`` cursor, so
+    the query seeks straight into the (user_id, created_at) index no matter
+    how deep the reader has scrolled. ``offset`` is honoured for older
+    clients but costs a scan of the skipped rows.
+    Returns ``(notifications, next_cursor)``; next_cursor is None on the last page.
+    """
+    query = Notification.query.filter(Notification.user_id == user_id)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, notification_id = position
+        query = query.filter(or_(
+            Notification.created_at < created_at,
+            and_(Notification.created_at == created_at, Notification.id < notification_id)
+        ))
+
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+    if offset and not position:
+        query = query.offset(offset)
+
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
+
+
+def reconcile_unread_counts():
+    """Recompute every drifted unread counter in a single UPDATE.
+
+    Returns the number of users whose counter was corrected.
+    """
+    user_table = User.__table__
+    actual = db.select(func.count(Notification.id)).where(
+        Notification.user_id == user_table.c.id,
+        Notification.is_read == False
+    ).scalar_subquery()
+    result = db.session.execute(
+        user_table.update()
+        .where(user_table.c.unread_notifications != actual)
+        .values(unread_notifications=actual)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+class StreamLimitReached(Exception):
+    """Raised when a worker already holds its maximum number of streams"""
+
+
+class NotificationBroker:
+    """Fan-out of new notifications to the SSE streams open in this process.
+
+    Every stream owns a bounded queue registered under its user's channel.
+    Publishing never blocks: a stream that has fallen more than
+    ``queue_size`` messages behind drops the overflow, and the client
+    resynchronises from ``/api/notifications`` when it reconnects.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, max_streams=500, heartbeat=15, queue_size=100, relay_interval=2):
+        self._lock = threading.Lock()
+        self._channels = {}     # user_id -> set of queues
+        self._stream_count = 0
+        self._app = None
+        self._relay_thread = None
+        self.max_streams = max_streams
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.relay_interval = relay_interval
+
+    def init_app(self, app):
+        self.max_streams = app.config.get('NOTIFICATION_STREAM_MAX_CONNECTIONS', self.max_streams)
+        self.heartbeat = app.config.get('NOTIFICATION_STREAM_HEARTBEAT', self.heartbeat)
+        self.relay_interval = app.config.get('NOTIFICATION_RELAY_INTERVAL', self.relay_interval)
+        app.extensions['notification_broker'] = self
+        if self.relay_interval > 0:
+            # Started by the first request, i.e. after a pre-forking server forked
+            self._app = app
+            app.before_request(self._start_relay)
+
+    @property
+    def relaying(self):
+        return self._relay_thread is not None
+
+    @property
+    def stream_count(self):
+        return self._stream_count
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._stream_count >= self.max_streams:
+                raise StreamLimitReached()
+            channel = queue.Queue(maxsize=self.queue_size)
+            self._channels.setdefault(user_id, set()).add(channel)
+            self._stream_count += 1
+        return channel
+
+    def unsubscribe(self, user_id, channel):
+        with self._lock:
+            channels = self._channels.get(user_id)
+            if not channels or channel not in channels:
+                return
+            channels.discard(channel)
+            if not channels:
+                del self._channels[user_id]
+            self._stream_count -= 1
+
+    def publish(self, user_id, message):
+        with self._lock:
+            channels = list(self._channels.get(user_id, ()))
+        for channel in channels:
+            try:
+                channel.put_nowait(message)
+            except queue.Full:
+                pass
+        return len(channels)
+
+    def close_all(self):
+        """Ask every open stream to finish, e.g. on worker shutdown"""
+        with self._lock:
+            channels = [c for group in self._channels.values() for c in group]
+        for channel in channels:
+            try:
+                channel.put_nowait(self._CLOSE)
+            except queue.Full:
+                pass
+
+    def _start_relay(self):
+        if self._relay_thread is not None:
+            return
+        with self._lock:
+            if self._relay_thread is None:
+                # Read the starting point here, so no commit falls between
+                # the local publisher standing down and the relay's first poll
+                last_id = db.session.execute(select(func.max(Notification.id))).scalar() or 0
+                self._relay_thread = threading.Thread(target=self._relay, args=(self._app, last_id),
+                                                      name='notification-relay', daemon=True)
+                self._relay_thread.start()
+
+    def _relay(self, app, last_id):
+        """Publish notifications committed by any process, oldest id first.
+
+        Ids are handed out at INSERT, so a transaction can commit a lower id
+        after a higher one has been published. Ids skipped on the way up are
+        polled again as gaps until they show up or ``RELAY_GAP_TIMEOUT``
+        passes (the insert was rolled back).
+        """
+        table = Notification.__table__
+        gaps = {}   # skipped id -> monotonic time it was skipped
+        while True:
+            now = time.monotonic()
+            for gap_id in [gap_id for gap_id, skipped in gaps.items()
+                           if now - skipped > RELAY_GAP_TIMEOUT]:
+                del gaps[gap_id]
+            condition = table.c.id > last_id
+            if gaps:
+                condition = or_(condition, table.c.id.in_(sorted(gaps)))
+            try:
+                with app.app_context(), db.engine.connect() as conn:
+                    rows = conn.execute(
+                        select(table.c.id, table.c.user_id, table.c.reservation_id, table.c.title,
+                               table.c.message, table.c.is_read, table.c.created_at)
+                        .where(condition).order_by(table.c.id).limit(RELAY_BATCH)
+                    ).all()
+            except Exception:
+                app.logger.exception('Notification relay could not poll the database')
+                rows = []
+            for row in rows:
+                if row.id > last_id:
+                    gaps.update(dict.fromkeys(
+                        range(max(last_id + 1, row.id - RELAY_MAX_GAP), row.id), now))
+                    last_id = row.id
+                else:
+                    gaps.pop(row.id, None)
+                user_cache.invalidate(row.user_id)
+                self.publish(row.user_id, {'type': 'new_notification',
+                                           'notification': notification_payload(row)})
+            if len(rows) < RELAY_BATCH:
+                time.sleep(self.relay_interval)
+
+    def stream(self, user_id, channel):
+        """Yield SSE frames for one subscriber until it disconnects.
+
+        The generator never touches the database. Werkzeug closes it when a
+        write to a disconnected client fails, which at the latest happens on
+        the next heartbeat, and the ``finally`` block releases the slot.
+        """
+        try:
+            yield f"retry: {self.heartbeat * 1000}\n\n"
+            while True:
+                try:
+                    message = channel.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is self._CLOSE:
+                    return
+                yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            self.unsubscribe(user_id, channel)
+
+
+notification_broker = NotificationBroker()
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'reservation_id': notification.reservation_id,
+        'is_read': bool(notification.is_read),
+        'created_at': notification.created_at.isoformat() if notification.created_at else None
+    }
+
+
+# Notifications are published only once the transaction that created them
+# commits, so streams never announce rows that were rolled back. While the
+# relay runs it publishes every committed row, including this process's.
+
+@event.listens_for(Session, 'after_flush')
+def _collect_new_notifications(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            session.info.setdefault('unpublished_notifications', []).append(
+                (obj.user_id, notification_payload(obj))
+            )
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_new_notifications(session):
+    unpublished = session.info.pop('unpublished_notifications', [])
+    if notification_broker.relaying:
+        return
+    for user_id, payload in unpublished:
+        notification_broker.publish(user_id, {'type': 'new_notification', 'notification': payload})
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_new_notifications(session):
+    session.info.pop('unpublished_notifications', None)
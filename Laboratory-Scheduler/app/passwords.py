@@ -0,0 +1,143 @@
+"""
+Password hashing on a bounded process pool.
+
+Key stretching is deliberately CPU-heavy, so running it on request threads
+lets a burst of logins stall every other request. ``password_hasher`` runs
+hashing and verification in a small process pool instead. At most
+``workers + queue_limit`` jobs may be in flight per web process; beyond
+that callers get ``HasherBusy`` straight away, and views turn it into
+503 + Retry-After rather than queueing without bound.
+
+The method and cost come from ``PASSWORD_HASH_METHOD``. A successful
+verification of a hash made with a different method or cost returns an
+upgraded hash from the same worker call, so stored hashes move to the
+current setting on each user's next login.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is saturated or too slow to answer"""
+
+
+def hash_method(pwhash):
+    """Method and cost prefix of a Werkzeug hash, e.g. ``pbkdf2:sha256:600000``"""
+    return (pwhash or '').split('$', 1)[0]
+
+
+def _hash_password(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify_password(pwhash, password, method, salt_length):
+    """Return ``(matches, upgraded_hash_or_None)``"""
+    if not pwhash or not check_password_hash(pwhash, password):
+        return False, None
+    if hash_method(pwhash) != method:
+        return True, generate_password_hash(password, method=method, salt_length=salt_length)
+    return True, None
+
+
+class PasswordHasher:
+    """Runs password hashing off the request thread with back-pressure.
+
+    ``workers = 0`` hashes inline on the calling thread (still bounded by
+    the in-flight limit), which suits tests and scripts.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', salt_length=16, workers=2,
+                 queue_limit=32, timeout=10, retry_after=2):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.rejected = 0
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.salt_length = app.config.get('PASSWORD_HASH_SALT_LENGTH', self.salt_length)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.queue_limit = app.config.get('PASSWORD_HASH_QUEUE_LIMIT', self.queue_limit)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', self.retry_after)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        """Check ``password``; returns ``(matches, upgraded_hash_or_None)``"""
+        return self._run(_verify_password, pwhash, password, self.method, self.salt_length)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            # A forked server worker must not reuse its parent's pool
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, func, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy()
+        if self.workers <= 0:
+            try:
+                return func(*args)
+            finally:
+                slots.release()
+
+        pool = self._executor()
+        try:
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self._discard(pool)
+            raise HasherBusy()
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is held until the task ends, not just while a caller waits:
+        # a hash abandoned on timeout keeps its pool worker busy until then
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy()
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise HasherBusy()
+
+    def _discard(self, pool):
+        """Drop a pool whose worker died (e.g. killed for memory); the next call starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher()
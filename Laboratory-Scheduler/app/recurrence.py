@@ -0,0 +1,94 @@
+"""
+Recurring reservation requests.
+
+A recurrence rule (weekly or biweekly until a term end date, minus skip
+dates) is expanded server-side into concrete occurrences. The whole series
+is checked for conflicts in one sweep over the lab's existing reservations
+(``conflicts.find_batch_conflicts``) and inserted with a single multi-row
+INSERT that tags every occurrence with the same ``series_id``.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import db
+from app.models import Reservation
+from app.cache import bump_reservation_versions
+
+RECURRENCE_INTERVALS = {
+    'weekly': timedelta(weeks=1),
+    'biweekly': timedelta(weeks=2),
+}
+
+# Upper bound on occurrences per request (a long term of weekly sessions)
+MAX_SERIES_OCCURRENCES = 40
+
+
+def parse_skip_dates(value):
+    """Parse comma or newline separated YYYY-MM-DD dates into a set"""
+    dates = set()
+    for item in (value or '').replace('\n', ',').split(','):
+        item = item.strip()
+        if item:
+            dates.add(datetime.strptime(item, '%Y-%m-%d').date())
+    return dates
+
+
+def expand_recurrence(start_time, end_time, recurrence, until, skip_dates=()):
+    """Return ``[(start, end), ...]`` for every occurrence up to ``until``.
+
+    ``until`` is a date and is inclusive; occurrences starting on one of
+    ``skip_dates`` (holidays, exam weeks) are left out.
+    """
+    if recurrence not in RECURRENCE_INTERVALS:
+        return [(start_time, end_time)]
+
+    step = RECURRENCE_INTERVALS[recurrence]
+    occurrences = []
+    start, end = start_time, end_time
+    while start.date() <= until:
+        if start.date() not in skip_dates:
+            occurrences.append((start, end))
+        start, end = start + step, end + step
+    return occurrences
+
+
+def insert_reservations(rows):
+    """Insert pending reservations from dicts with one multi-row INSERT.
+
+    Returns rows carrying the id, lab, times and status of each inserted
+    reservation (enough for the conflict index). The caller commits.
+    """
+    inserted = db.session.execute(
+        insert(Reservation).returning(
+            Reservation.id, Reservation.lab_id, Reservation.start_time,
+            Reservation.end_time, Reservation.status
+        ),
+        [dict(row, status='pending') for row in rows]
+    ).all()
+    # A bulk INSERT skips the flush hooks that normally bump the version
+    bump_reservation_versions(db.session.connection())
+    return inserted
+
+
+def create_series(instructor_id, lab_id, course_name, section, notes, occurrences):
+    """Insert all occurrences as pending requests sharing a new series id.
+
+    Returns ``(series_id, rows)``; see ``insert_reservations``.
+    """
+    series_id = new_series_id()
+    rows = insert_reservations([{
+        'instructor_id': instructor_id,
+        'lab_id': lab_id,
+        'course_name': course_name,
+        'section': section,
+        'start_time': start,
+        'end_time': end,
+        'notes': notes,
+        'series_id': series_id
+    } for start, end in occurrences])
+    return series_id, rows
+
+
+def new_series_id():
+    return uuid.uuid4().hex
@@ -1,12 +1,31 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, flash, redirect, url_for, request, current_app
 from flask_login import login_required, current_user
+import hmac
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import wraps
 from app import db
-from app.models import Reservation, Laboratory, Instructor
-from sqlalchemy import func, extract
+from app.cache import report_cache
+from app.metrics import request_metrics
+from app.responses import conditional
+from app.models import Instructor, LabHourlyUsage, InstructorMonthlyUsage
+from app.occupancy import lab_occupancy_report
+from sqlalchemy import func
 
 reports_bp = Blueprint('reports', __name__)
 
+# Longest range accepted by /api/reports/lab-occupancy, end date included
+OCCUPANCY_MAX_DAYS = 366
+
+def admin_api_required(view):
+    """Reject non-admins before any (cached) report work happens"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user.user_type != 'admin':
+            return jsonify({'error': 'Access denied'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
 @reports_bp.route('/reports')
 @login_required
 def reports():
@@ -14,54 +33,113 @@ def reports():
         flash('Access denied.', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    return render_template('reports/generate.html')
+    return render_template('reports/generate.html', now=datetime.now(), timedelta=timedelta)
 
 @reports_bp.route('/api/reports/monthly-usage')
 @login_required
+@admin_api_required
+@conditional('reservations')
+@report_cache.cached
 def monthly_usage_report():
-    if current_user.user_type != 'admin':
-        return jsonify({'error': 'Access denied'}), 403
-    
     # Get data for the last 6 months
     end_date = datetime.now()
     start_date = end_date - timedelta(days=180)
     
-    monthly_data = db.session.query(
-        func.strftime('%Y-%m', Reservation.start_time).label('month'),
-        func.count(Reservation.id).label('reservation_count')
+    # At most one row per day; months are bucketed here so the SQL stays portable
+    daily_data = db.session.query(
+        LabHourlyUsage.day,
+        func.sum(LabHourlyUsage.reservation_count).label('reservation_count')
     ).filter(
-        Reservation.start_time >= start_date,
-        Reservation.status == 'approved'
-    ).group_by('month').all()
+        LabHourlyUsage.day >= start_date.date()
+    ).group_by(LabHourlyUsage.day).order_by(LabHourlyUsage.day).all()
+    
+    monthly_data = OrderedDict()
+    for data in daily_data:
+        month = data.day.strftime('%Y-%m')
+        monthly_data[month] = monthly_data.get(month, 0) + int(data.reservation_count)
     
-    return jsonify([{'month': data.month, 'count': data.reservation_count} for data in monthly_data])
+    return jsonify([{'month': month, 'count': count} for month, count in monthly_data.items() if count])
 
 @reports_bp.route('/api/reports/instructor-usage')
 @login_required
+@admin_api_required
+@conditional('reservations', 'users')
+@report_cache.cached
 def instructor_usage_report():
-    if current_user.user_type != 'admin':
-        return jsonify({'error': 'Access denied'}), 403
-    
     instructor_data = db.session.query(
         Instructor.full_name,
-        func.count(Reservation.id).label('reservation_count')
-    ).join(Reservation).filter(
-        Reservation.status == 'approved'
-    ).group_by(Instructor.id).all()
+        func.sum(InstructorMonthlyUsage.reservation_count).label('reservation_count')
+    ).join(
+        InstructorMonthlyUsage, InstructorMonthlyUsage.instructor_id == Instructor.id
+    ).group_by(Instructor.id, Instructor.full_name).having(
+        func.sum(InstructorMonthlyUsage.reservation_count) > 0
+    ).all()
     
-    return jsonify([{'instructor': data.full_name, 'count': data.reservation_count} for data in instructor_data])
+    return jsonify([{'instructor': data.full_name, 'count': int(data.reservation_count)} for data in instructor_data])
 
 @reports_bp.route('/api/reports/peak-hours')
 @login_required
+@admin_api_required
+@conditional('reservations')
+@report_cache.cached
 def peak_hours_report():
-    if current_user.user_type != 'admin':
-        return jsonify({'error': 'Access denied'}), 403
-    
     peak_data = db.session.query(
-        extract('hour', Reservation.start_time).label('hour'),
-        func.count(Reservation.id).label('reservation_count')
-    ).filter(
-        Reservation.status == 'approved'
-    ).group_by('hour').all()
+        LabHourlyUsage.hour,
+        func.sum(LabHourlyUsage.reservation_count).label('reservation_count')
+    ).group_by(LabHourlyUsage.hour).having(
+        func.sum(LabHourlyUsage.reservation_count) > 0
+    ).order_by(LabHourlyUsage.hour).all()
+    
+    return jsonify([{'hour': int(data.hour), 'count': int(data.reservation_count)} for data in peak_data])
+
+@reports_bp.route('/api/reports/lab-occupancy')
+@login_required
+@admin_api_required
+@conditional('reservations', 'labs')
+@report_cache.cached
+def lab_occupancy():
+    """Occupied hours per lab per weekday/hour, counting session duration"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d') \
+            if request.args.get('start') else today - timedelta(days=30)
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d') \
+            if request.args.get('end') else today
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+    
+    if end_date < start_date:
+        return jsonify({'error': 'End date must not be before start date'}), 400
+    if (end_date - start_date).days >= OCCUPANCY_MAX_DAYS:
+        return jsonify({'error': f'The range is limited to {OCCUPANCY_MAX_DAYS} days'}), 400
     
-    return jsonify([{'hour': int(data.hour), 'count': data.reservation_count} for data in peak_data])
\ No newline at end of file
+    # The end date is inclusive
+    labs = lab_occupancy_report(start_date, end_date + timedelta(days=1),
+                                lab_id=request.args.get('lab_id', type=int))
+    
+    return jsonify({
+        'start': start_date.strftime('%Y-%m-%d'),
+        'end': end_date.strftime('%Y-%m-%d'),
+        'weekdays': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        'labs': labs
+    })
+
+@reports_bp.route('/api/reports/cache-stats')
+@login_required
+@admin_api_required
+def report_cache_stats():
+    """Hit, miss and eviction counters of this worker's report cache"""
+    return jsonify(report_cache.stats())
+
+@reports_bp.route('/metrics')
+def metrics():
+    """Request metrics of this worker in the Prometheus text format"""
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not (current_user.is_authenticated and current_user.user_type == 'admin'):
+        return jsonify({'error': 'Access denied'}), 403
+    if not request_metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return current_app.response_class(request_metrics.render(),
+                                      mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,114 @@
+"""
+Conditional GET and compression for the JSON APIs.
+
+``@conditional(*scopes)`` gives a view a weak ETag derived from the data
+versions of ``scopes`` (see app.cache), the request path and arguments,
+today's date and, with ``per_user``, the user. Computing it costs one
+primary-key query and no rendering, so a matching ``If-None-Match`` is
+answered with 304 before the view runs. Responses carry
+``Cache-Control: private, no-cache``, which makes browsers revalidate each
+fetch instead of reusing a stale copy.
+
+``response_compressor`` gzips (or brotli-compresses) large JSON bodies for
+clients that accept it.
+"""
+
+import gzip
+import hashlib
+from datetime import date
+from functools import wraps
+from flask import request, current_app
+from flask_login import current_user
+from app.cache import get_data_versions
+
+try:
+    import brotli
+except ImportError:   # gzip only
+    brotli = None
+
+
+def data_etag(scopes, per_user=False):
+    """Weak-ETag value for the current request at the current data versions"""
+    parts = [current_app.config.get('IT_LAB_SYSTEM_VERSION', ''), request.path,
+             repr(sorted(request.args.items(multi=True))), date.today().isoformat(),
+             repr(get_data_versions(scopes))]
+    if per_user:
+        parts.append(str(current_user.get_id()))
+    return hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+def conditional(*scopes, per_user=False):
+    """Answer repeat GETs with 304 while the data versions of ``scopes`` stand still.
+
+    The view's output must depend only on those scopes, the query string,
+    the date and (with ``per_user``) the user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            etag = data_etag(scopes, per_user)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+class ResponseCompressor:
+    """Compresses response bodies of the configured mimetypes above ``min_size``"""
+
+    def __init__(self, min_size=1024, level=6, mimetypes=('application/json',)):
+        self.min_size = min_size
+        self.level = level
+        self.mimetypes = frozenset(mimetypes)
+        self.compressed = 0
+        self.bytes_saved = 0
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.mimetypes = frozenset(app.config.get('COMPRESS_MIMETYPES', self.mimetypes))
+        app.extensions['response_compressor'] = self
+        if app.config.get('COMPRESS_RESPONSES', True):
+            app.after_request(self.compress)
+
+    def compress(self, response):
+        if response.mimetype not in self.mimetypes or response.status_code != 200 or \
+                response.direct_passthrough or response.is_streamed or \
+                'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None and response.content_length < self.min_size:
+            return response
+
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            encoding = 'br'
+        elif accepted['gzip']:
+            encoding = 'gzip'
+        else:
+            return response
+
+        data = response.get_data()
+        if encoding == 'br':
+            # Quality 4 is faster than gzip level 6 at a similar size
+            body = brotli.compress(data, quality=4)
+        else:
+            body = gzip.compress(data, compresslevel=self.level)
+        response.set_data(body)
+        response.content_encoding = encoding
+        self.compressed += 1
+        self.bytes_saved += len(data) - len(body)
+        return response
+
+
+response_compressor = ResponseCompressor()
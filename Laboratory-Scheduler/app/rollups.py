@@ -0,0 +1,163 @@
+"""
+Incrementally maintained utilization rollups for the reports blueprint.
+
+``lab_hourly_usage`` counts approved reservations per (lab, day, start hour)
+and ``instructor_monthly_usage`` per (instructor, month). A session hook
+adjusts both tables in the same transaction whenever a reservation enters or
+leaves the ``approved`` state, so the report endpoints only ever read the
+rollups. Bucketing happens in Python, which keeps the SQL portable between
+SQLite and PostgreSQL.
+"""
+
+from collections import Counter
+from sqlalchemy import event, inspect, select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Reservation, LabHourlyUsage, InstructorMonthlyUsage
+
+lab_usage = LabHourlyUsage.__table__
+instructor_usage = InstructorMonthlyUsage.__table__
+
+
+def lab_key(lab_id, start_time):
+    return (lab_id, start_time.date(), start_time.hour)
+
+
+def instructor_key(instructor_id, start_time):
+    return (instructor_id, start_time.date().replace(day=1))
+
+
+class RollupDelta:
+    """Pending +/- adjustments to both rollup tables"""
+
+    def __init__(self):
+        self.labs = Counter()
+        self.instructors = Counter()
+
+    def add(self, lab_id, instructor_id, start_time, sign):
+        self.labs[lab_key(lab_id, start_time)] += sign
+        self.instructors[instructor_key(instructor_id, start_time)] += sign
+
+    def __bool__(self):
+        return any(self.labs.values()) or any(self.instructors.values())
+
+    def apply(self, conn):
+        """Upsert the non-zero adjustments on ``conn``"""
+        insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+
+        lab_rows = [{'lab_id': k[0], 'day': k[1], 'hour': k[2], 'reservation_count': n}
+                    for k, n in self.labs.items() if n]
+        if lab_rows:
+            stmt = insert(lab_usage)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=['lab_id', 'day', 'hour'],
+                set_={'reservation_count': lab_usage.c.reservation_count + stmt.excluded.reservation_count}
+            ), lab_rows)
+
+        instructor_rows = [{'instructor_id': k[0], 'month': k[1], 'reservation_count': n}
+                           for k, n in self.instructors.items() if n]
+        if instructor_rows:
+            stmt = insert(instructor_usage)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=['instructor_id', 'month'],
+                set_={'reservation_count': instructor_usage.c.reservation_count + stmt.excluded.reservation_count}
+            ), instructor_rows)
+
+        self.labs.clear()
+        self.instructors.clear()
+
+
+def _previous(state, attr):
+    """Value of ``attr`` as currently stored in the database"""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), attr)
+
+
+def reservation_delta(reservations_before, reservations_after):
+    """Build a delta from (lab_id, instructor_id, start_time, status) tuples"""
+    delta = RollupDelta()
+    for lab_id, instructor_id, start_time, status in reservations_before:
+        if status == 'approved':
+            delta.add(lab_id, instructor_id, start_time, -1)
+    for lab_id, instructor_id, start_time, status in reservations_after:
+        if status == 'approved':
+            delta.add(lab_id, instructor_id, start_time, 1)
+    return delta
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_rollup_changes(session, flush_context, instances):
+    before, after = [], []
+    for obj in session.new:
+        if isinstance(obj, Reservation):
+            after.append((obj.lab_id, obj.instructor_id, obj.start_time, obj.status))
+    for obj in session.deleted:
+        if isinstance(obj, Reservation):
+            state = inspect(obj)
+            before.append(tuple(_previous(state, a) for a in
+                                ('lab_id', 'instructor_id', 'start_time', 'status')))
+    for obj in session.dirty:
+        if isinstance(obj, Reservation) and session.is_modified(obj):
+            state = inspect(obj)
+            before.append(tuple(_previous(state, a) for a in
+                                ('lab_id', 'instructor_id', 'start_time', 'status')))
+            after.append((obj.lab_id, obj.instructor_id, obj.start_time, obj.status))
+
+    delta = reservation_delta(before, after)
+    if delta:
+        session.info.setdefault('rollup_deltas', []).append(delta)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_rollup_changes(session, flush_context):
+    deltas = session.info.pop('rollup_deltas', [])
+    if deltas:
+        conn = session.connection()
+        for delta in deltas:
+            delta.apply(conn)
+
+
+def compute_rollups(conn):
+    """Recount approved reservations straight from the reservation table"""
+    delta = RollupDelta()
+    rows = conn.execution_options(yield_per=5000).execute(
+        select(Reservation.lab_id, Reservation.instructor_id, Reservation.start_time)
+        .where(Reservation.status == 'approved')
+    )
+    for lab_id, instructor_id, start_time in rows:
+        delta.add(lab_id, instructor_id, start_time, 1)
+    return delta
+
+
+def rebuild_rollups(conn):
+    """Replace both rollup tables with a fresh count (backfill)"""
+    delta = compute_rollups(conn)
+    conn.execute(delete(lab_usage))
+    conn.execute(delete(instructor_usage))
+    counts = (len(delta.labs), len(delta.instructors))
+    delta.apply(conn)
+    return counts
+
+
+def check_rollups(conn):
+    """Compare the rollups with the raw table; return a list of mismatches"""
+    expected = compute_rollups(conn)
+    mismatches = []
+
+    stored = {(r.lab_id, r.day, r.hour): r.reservation_count
+              for r in conn.execute(select(lab_usage)) if r.reservation_count}
+    for key in set(stored) | set(k for k, n in expected.labs.items() if n):
+        if stored.get(key, 0) != expected.labs.get(key, 0):
+            mismatches.append(('lab', key, stored.get(key, 0), expected.labs.get(key, 0)))
+
+    stored = {(r.instructor_id, r.month): r.reservation_count
+              for r in conn.execute(select(instructor_usage)) if r.reservation_count}
+    for key in set(stored) | set(k for k, n in expected.instructors.items() if n):
+        if stored.get(key, 0) != expected.instructors.get(key, 0):
+            mismatches.append(('instructor', key, stored.get(key, 0), expected.instructors.get(key, 0)))
+
+    return mismatches
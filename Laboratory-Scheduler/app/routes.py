@@ -1,10 +1,26 @@
-from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for
+from flask import (Blueprint, render_template, jsonify, request, flash, redirect, url_for,
+                   Response, stream_with_context, current_app)
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import and_
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import User, Laboratory, Reservation, Instructor, Student, Notification
-from app.forms import ReservationForm, LaboratoryForm, InstructorForm, ReportForm
+from app.models import User, Laboratory, Reservation, Instructor, Notification
+from app.forms import ReservationForm, LaboratoryForm, InstructorForm
+from app.conflicts import reservation_index, find_conflicts, find_batch_conflicts
+from app.recurrence import (expand_recurrence, parse_skip_dates, create_series,
+                            MAX_SERIES_OCCURRENCES)
+from app.timetable import DemandError, parse_demand, build_problem, solve, describe, create_reservations
+from app.exports import EXPORTERS, EXPORT_BATCH_SIZE
+from app.availability import find_free_slots
+from app.rollups import reservation_delta
+from app.cache import bump_reservation_versions
+from app.dashboard import admin_counters, instructor_counters
+from app.responses import conditional
+from app.passwords import password_hasher, HasherBusy
+from app.notifications import (mark_read, mark_all_read, notification_broker, StreamLimitReached,
+                               notification_page, notification_payload, decision_notification)
+from app.jobs import job_queue
 
 main_bp = Blueprint('main', __name__)
 
@@ -13,42 +29,39 @@ main_bp = Blueprint('main', __name__)
 @login_required
 def dashboard():
     if current_user.user_type == 'admin':
-        total_labs = Laboratory.query.filter_by(is_active=True).count()
-        total_sessions = Reservation.query.filter_by(status='approved').count()
-        pending_requests = Reservation.query.filter_by(status='pending').count()
+        counters = admin_counters()
         
         # Recent activities
-        recent_reservations = Reservation.query.order_by(Reservation.created_at.desc()).limit(5).all()
+        recent_reservations = Reservation.query.options(
+            joinedload(Reservation.laboratory), joinedload(Reservation.instructor)
+        ).order_by(Reservation.created_at.desc()).limit(5).all()
         
         return render_template('dashboard/admin.html',
-                             total_labs=total_labs,
-                             total_sessions=total_sessions,
-                             pending_requests=pending_requests,
-                             recent_reservations=recent_reservations)
+                             recent_reservations=recent_reservations,
+                             **counters)
     
     elif current_user.user_type == 'instructor':
-        instructor = Instructor.query.filter_by(user_id=current_user.id).first()
+        instructor = current_user.instructor_profile
         if not instructor:
             flash('Instructor profile not found.', 'danger')
             return redirect(url_for('auth.logout'))
             
-        upcoming_sessions = Reservation.query.filter_by(
+        upcoming_sessions = Reservation.query.options(joinedload(Reservation.laboratory)).filter_by(
             instructor_id=instructor.id,
             status='approved'
         ).filter(Reservation.start_time >= datetime.now()).order_by(Reservation.start_time).limit(5).all()
         
-        pending_requests = Reservation.query.filter_by(
-            instructor_id=instructor.id,
-            status='pending'
-        ).count()
+        today = datetime.now().date()
+        today_sessions = [s for s in upcoming_sessions if s.start_time.date() == today]
         
         return render_template('dashboard/instructor.html',
                              upcoming_sessions=upcoming_sessions,
-                             pending_requests=pending_requests,
-                             instructor=instructor)
+                             today_sessions=today_sessions,
+                             instructor=instructor,
+                             **instructor_counters(instructor.id))
     
     elif current_user.user_type == 'student':
-        student = Student.query.filter_by(user_id=current_user.id).first()
+        student = current_user.student_profile
         if not student:
             flash('Student profile not found.', 'danger')
             return redirect(url_for('auth.logout'))
@@ -57,7 +70,9 @@ def dashboard():
         today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start + timedelta(days=1)
         
-        today_sessions = Reservation.query.filter_by(
+        today_sessions = Reservation.query.options(
+            joinedload(Reservation.laboratory), joinedload(Reservation.instructor)
+        ).filter_by(
             section=student.course_section,
             status='approved'
         ).filter(
@@ -75,12 +90,15 @@ def dashboard():
 @login_required
 def schedule():
     labs = Laboratory.query.filter_by(is_active=True).all()
-    return render_template('schedule/calendar.html', labs=labs)
+    return render_template('schedule/calendar.html', labs=labs, today=datetime.now().date())
 
 @main_bp.route('/api/schedule')
 @login_required
+@conditional('schedule', 'labs', 'users')
 def api_schedule():
     lab_id = request.args.get('lab_id', 'all')
+    status = request.args.get('status')
+    view = request.args.get('view', 'week')
     date_str = request.args.get('date')
     
     try:
@@ -88,34 +106,152 @@ def api_schedule():
     except:
         date = datetime.now()
     
-    start_of_week = date - timedelta(days=date.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    query = Reservation.query.filter(
-        Reservation.start_time >= start_of_week,
-        Reservation.end_time <= end_of_week + timedelta(days=1)
-    )
-    
-    if lab_id and lab_id != 'all':
-        query = query.filter_by(lab_id=lab_id)
-    
-    reservations = query.all()
+    window_start, window_end = schedule_window(date, view)
+    rows = schedule_query(lab_id, window_start, window_end, status).all()
     
     schedule_data = []
-    for res in reservations:
+    for row in rows:
         schedule_data.append({
-            'id': res.id,
-            'title': f"{res.course_name} - {res.section}",
-            'start': res.start_time.isoformat(),
-            'end': res.end_time.isoformat(),
-            'instructor': res.instructor.full_name,
-            'lab': res.laboratory.name,
-            'status': res.status,
-            'color': get_status_color(res.status)
+            'id': row.id,
+            'title': f"{row.course_name} - {row.section}",
+            'start': row.start_time.isoformat(),
+            'end': row.end_time.isoformat(),
+            'instructor': row.instructor,
+            'lab': row.lab,
+            'status': row.status,
+            'color': get_status_color(row.status)
         })
     
     return jsonify(schedule_data)
 
+@main_bp.route('/api/schedule/export')
+@login_required
+def export_schedule():
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORTERS:
+        return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+    
+    lab_id = request.args.get('lab_id', 'all')
+    status = request.args.get('status')
+    range_start = parse_date(request.args.get('start'))
+    range_end = parse_date(request.args.get('end'))
+    
+    # An explicit start/end range (e.g. a whole semester) overrides the view
+    if range_start and range_end:
+        window_start, window_end = range_start, range_end + timedelta(days=1)
+    else:
+        date = parse_date(request.args.get('date')) or datetime.now()
+        window_start, window_end = schedule_window(date, request.args.get('view', 'week'))
+    
+    rows = schedule_query(lab_id, window_start, window_end, status).yield_per(EXPORT_BATCH_SIZE)
+    writer, mimetype, extension = EXPORTERS[export_format]
+    
+    filename = (f"lab-schedule-{window_start.strftime('%Y%m%d')}-"
+                f"{(window_end - timedelta(days=1)).strftime('%Y%m%d')}.{extension}")
+    return Response(stream_with_context(writer(rows)),
+                    mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+# Largest search window and result count accepted by /api/availability
+AVAILABILITY_MAX_DAYS = 92
+AVAILABILITY_MAX_RESULTS = 200
+
+@main_bp.route('/api/availability')
+@login_required
+def api_availability():
+    """Ranked free slots across labs.
+    
+    Query arguments: ``duration`` in minutes (required), ``min_capacity``,
+    ``from``/``to`` as ``YYYY-MM-DD`` or ``YYYY-MM-DDTHH:MM`` (default: now
+    and one week later), optional ``lab_id`` and ``limit``.
+    """
+    duration = request.args.get('duration', type=int)
+    if not duration or not 30 <= duration <= 1440:
+        return jsonify({'error': 'duration must be between 30 and 1440 minutes'}), 400
+    min_capacity = max(request.args.get('min_capacity', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), AVAILABILITY_MAX_RESULTS)
+    
+    try:
+        now = datetime.now().replace(second=0, microsecond=0)
+        range_start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else now
+        range_end = datetime.fromisoformat(request.args['to']) if request.args.get('to') \
+            else range_start + timedelta(days=7)
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD or YYYY-MM-DDTHH:MM'}), 400
+    # Reservations are stored in naive local time
+    if range_start.tzinfo or range_end.tzinfo:
+        return jsonify({'error': 'from and to must be local times without a UTC offset'}), 400
+    # A bare end date means "through that day"
+    if request.args.get('to') and 'T' not in request.args['to']:
+        range_end += timedelta(days=1)
+    range_start = max(range_start, now)
+    if range_end <= range_start:
+        return jsonify({'error': 'to must be after from'}), 400
+    if range_end - range_start > timedelta(days=AVAILABILITY_MAX_DAYS):
+        return jsonify({'error': f'the search window is limited to {AVAILABILITY_MAX_DAYS} days'}), 400
+    
+    slots = find_free_slots(timedelta(minutes=duration), range_start, range_end,
+                            min_capacity=min_capacity,
+                            lab_id=request.args.get('lab_id', type=int), limit=limit)
+    return jsonify({
+        'duration': duration,
+        'from': range_start.isoformat(),
+        'to': range_end.isoformat(),
+        'slots': slots
+    })
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query argument, returning None if absent or invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+def schedule_window(date, view='week'):
+    """Return the [start, end) range shown by a day, week or month calendar view"""
+    day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if view == 'day':
+        return day, day + timedelta(days=1)
+    if view == 'month':
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=7)
+
+def schedule_query(lab_id, window_start, window_end, status=None):
+    """Flat projection of reservations starting inside a window.
+    
+    Instructor and lab names come from joins in the same statement, so rows
+    are plain tuples and no per-reservation lazy loads are issued.
+    """
+    query = db.session.query(
+        Reservation.id,
+        Reservation.lab_id,
+        Reservation.course_name,
+        Reservation.section,
+        Reservation.start_time,
+        Reservation.end_time,
+        Reservation.status,
+        Reservation.notes,
+        Instructor.full_name.label('instructor'),
+        Laboratory.name.label('lab'),
+        Laboratory.room_number.label('room_number')
+    ).join(
+        Instructor, Reservation.instructor_id == Instructor.id
+    ).join(
+        Laboratory, Reservation.lab_id == Laboratory.id
+    ).filter(
+        Reservation.start_time >= window_start,
+        Reservation.start_time < window_end
+    )
+    
+    if lab_id and lab_id != 'all':
+        query = query.filter(Reservation.lab_id == lab_id)
+    if status and status != 'all':
+        query = query.filter(Reservation.status == status)
+    
+    return query.order_by(Reservation.start_time, Reservation.id)
+
 def get_status_color(status):
     colors = {
         'approved': '#28a745',
@@ -132,27 +268,29 @@ def reservation_request():
         flash('Only instructors can make reservations.', 'warning')
         return redirect(url_for('main.dashboard'))
     
-    instructor = Instructor.query.filter_by(user_id=current_user.id).first()
+    instructor = current_user.instructor_profile
     if not instructor:
         flash('Instructor profile not found.', 'danger')
         return redirect(url_for('auth.logout'))
     
     form = ReservationForm()
-    form.lab_id.choices = [(lab.id, f"{lab.name} ({lab.room_number})") 
-                           for lab in Laboratory.query.filter_by(is_active=True).all()]
+    labs = Laboratory.query.filter_by(is_active=True).all()
+    form.lab_id.choices = [(lab.id, f"{lab.name} ({lab.room_number})") for lab in labs]
     
     if form.validate_on_submit():
+        if form.recurrence.data != 'none':
+            return _request_series(form, instructor, labs)
+        
         # Check for conflicts
-        conflict = Reservation.query.filter(
-            Reservation.lab_id == form.lab_id.data,
-            Reservation.status.in_(['pending', 'approved']),
-            Reservation.start_time < form.end_time.data,
-            Reservation.end_time > form.start_time.data
-        ).first()
+        conflicts = find_conflicts(form.lab_id.data, form.start_time.data, form.end_time.data)
         
-        if conflict:
+        if conflicts:
             flash('There is a scheduling conflict with an existing reservation.', 'danger')
-            return render_template('reservation/request.html', form=form)
+            for conflict in conflicts:
+                flash(f'Conflicts with {conflict.course_name} - {conflict.section} '
+                      f'({conflict.start_time.strftime("%Y-%m-%d %H:%M")} to '
+                      f'{conflict.end_time.strftime("%H:%M")}, {conflict.status}).', 'warning')
+            return render_template('reservation/request.html', form=form, labs=labs, today=datetime.now())
         
         reservation = Reservation(
             instructor_id=instructor.id,
@@ -166,11 +304,50 @@ def reservation_request():
         
         db.session.add(reservation)
         db.session.commit()
+        reservation_index.add(reservation)
         
         flash('Reservation request submitted successfully!', 'success')
         return redirect(url_for('main.dashboard'))
     
-    return render_template('reservation/request.html', form=form)
+    return render_template('reservation/request.html', form=form, labs=labs, today=datetime.now())
+
+# Conflicting occurrences listed individually before the rest are summarized
+SERIES_CONFLICTS_SHOWN = 10
+
+def _request_series(form, instructor, labs):
+    """Expand a recurring request, check every occurrence and insert the series"""
+    occurrences = expand_recurrence(form.start_time.data, form.end_time.data,
+                                    form.recurrence.data, form.repeat_until.data,
+                                    parse_skip_dates(form.skip_dates.data))
+    if not occurrences:
+        flash('Every session of this series falls on a skipped date.', 'warning')
+        return render_template('reservation/request.html', form=form, labs=labs, today=datetime.now())
+    if len(occurrences) > MAX_SERIES_OCCURRENCES:
+        flash(f'A recurring reservation can have at most {MAX_SERIES_OCCURRENCES} sessions '
+              f'({len(occurrences)} requested).', 'danger')
+        return render_template('reservation/request.html', form=form, labs=labs, today=datetime.now())
+    
+    conflicts = find_batch_conflicts(form.lab_id.data, occurrences)
+    if conflicts:
+        flash(f'{len(conflicts)} of {len(occurrences)} sessions conflict with existing reservations. '
+              f'Add their dates to the skip list or choose another lab.', 'danger')
+        for i, existing in conflicts[:SERIES_CONFLICTS_SHOWN]:
+            start, _ = occurrences[i]
+            flash(f'{start.strftime("%Y-%m-%d")}: conflicts with ' + ', '.join(
+                f'{res.course_name} - {res.section} ({res.start_time.strftime("%H:%M")} to '
+                f'{res.end_time.strftime("%H:%M")}, {res.status})' for res in existing), 'warning')
+        if len(conflicts) > SERIES_CONFLICTS_SHOWN:
+            flash(f'...and {len(conflicts) - SERIES_CONFLICTS_SHOWN} more conflicting sessions.', 'warning')
+        return render_template('reservation/request.html', form=form, labs=labs, today=datetime.now())
+    
+    _, rows = create_series(instructor.id, form.lab_id.data, form.course_name.data,
+                            form.section.data, form.notes.data, occurrences)
+    db.session.commit()
+    for row in rows:
+        reservation_index.add(row)
+    
+    flash(f'Recurring reservation request for {len(rows)} sessions submitted successfully!', 'success')
+    return redirect(url_for('main.dashboard'))
 
 @main_bp.route('/admin/labs', methods=['GET', 'POST'])
 @login_required
@@ -196,6 +373,37 @@ def manage_labs():
     labs = Laboratory.query.all()
     return render_template('management/labs.html', form=form, labs=labs)
 
+@main_bp.route('/admin/labs/<int:lab_id>/edit', methods=['POST'])
+@login_required
+def edit_lab(lab_id):
+    if current_user.user_type != 'admin':
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    lab = Laboratory.query.get_or_404(lab_id)
+    try:
+        capacity = int(request.form.get('capacity', lab.capacity))
+    except (TypeError, ValueError):
+        capacity = 0
+    if capacity < 1:
+        flash('Capacity must be a positive number.', 'danger')
+        return redirect(url_for('main.manage_labs'))
+    room_number = request.form.get('room_number', '').strip()
+    if room_number and room_number != lab.room_number:
+        if Laboratory.query.filter(Laboratory.room_number == room_number, Laboratory.id != lab.id).first():
+            flash('That room number is already in use.', 'danger')
+            return redirect(url_for('main.manage_labs'))
+        lab.room_number = room_number
+    
+    lab.name = request.form.get('name', lab.name).strip() or lab.name
+    lab.capacity = capacity
+    lab.equipment = request.form.get('equipment', '')
+    lab.is_active = 'is_active' in request.form
+    db.session.commit()
+    
+    flash('Laboratory updated successfully!', 'success')
+    return redirect(url_for('main.manage_labs'))
+
 @main_bp.route('/admin/instructors', methods=['GET', 'POST'])
 @login_required
 def manage_instructors():
@@ -211,7 +419,15 @@ def manage_instructors():
             email=form.email.data,
             user_type='instructor'
         )
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except HasherBusy:
+            flash('The server is busy. Please submit the instructor again in a moment.', 'warning')
+            instructors = Instructor.query.all()
+            return render_template('management/instructors.html', form=form,
+                                   instructors=instructors), 503, {
+                'Retry-After': str(password_hasher.retry_after)
+            }
         db.session.add(user)
         db.session.flush()  # Get the user ID
         
@@ -231,6 +447,30 @@ def manage_instructors():
     instructors = Instructor.query.all()
     return render_template('management/instructors.html', form=form, instructors=instructors)
 
+@main_bp.route('/admin/instructors/<int:instructor_id>/edit', methods=['POST'])
+@login_required
+def edit_instructor(instructor_id):
+    if current_user.user_type != 'admin':
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    instructor = Instructor.query.get_or_404(instructor_id)
+    email = request.form.get('email', '').strip()
+    if email and email != instructor.user.email:
+        if User.query.filter(User.email == email, User.id != instructor.user_id).first():
+            flash('That email is already in use.', 'danger')
+            return redirect(url_for('main.manage_instructors'))
+        instructor.user.email = email
+    
+    instructor.full_name = request.form.get('full_name', instructor.full_name).strip() or instructor.full_name
+    instructor.department = request.form.get('department', '')
+    instructor.phone = request.form.get('phone', '')
+    instructor.is_active = 'is_active' in request.form
+    db.session.commit()
+    
+    flash('Instructor updated successfully!', 'success')
+    return redirect(url_for('main.manage_instructors'))
+
 @main_bp.route('/admin/requests')
 @login_required
 def admin_requests():
@@ -248,18 +488,15 @@ def approve_request(request_id):
         return jsonify({'success': False, 'message': 'Access denied'})
     
     reservation = Reservation.query.get_or_404(request_id)
+    if reservation.status != 'approved':
+        # The worker inserts the instructor's notification (see app.jobs)
+        job_queue.enqueue_many('notification', [decision_notification(
+            reservation.id, reservation.instructor.user_id, reservation.laboratory.name,
+            reservation.start_time, 'approved', reservation.updated_at
+        )])
     reservation.status = 'approved'
-    
-    # Create notification for instructor
-    notification = Notification(
-        user_id=reservation.instructor.user_id,
-        reservation_id=reservation.id,
-        title='Reservation Approved',
-        message=f'Your reservation for {reservation.laboratory.name} on {reservation.start_time.strftime("%Y-%m-%d %H:%M")} has been approved.'
-    )
-    
-    db.session.add(notification)
     db.session.commit()
+    reservation_index.add(reservation)
     
     flash('Reservation approved successfully!', 'success')
     return jsonify({'success': True})
@@ -271,30 +508,208 @@ def reject_request(request_id):
         return jsonify({'success': False, 'message': 'Access denied'})
     
     reservation = Reservation.query.get_or_404(request_id)
+    if reservation.status != 'rejected':
+        # The worker inserts the instructor's notification (see app.jobs)
+        job_queue.enqueue_many('notification', [decision_notification(
+            reservation.id, reservation.instructor.user_id, reservation.laboratory.name,
+            reservation.start_time, 'rejected', reservation.updated_at
+        )])
     reservation.status = 'rejected'
-    
-    # Create notification for instructor
-    notification = Notification(
-        user_id=reservation.instructor.user_id,
-        reservation_id=reservation.id,
-        title='Reservation Rejected',
-        message=f'Your reservation for {reservation.laboratory.name} on {reservation.start_time.strftime("%Y-%m-%d %H:%M")} has been rejected.'
-    )
-    
-    db.session.add(notification)
     db.session.commit()
+    reservation_index.discard(reservation.id)
     
     flash('Reservation rejected!', 'success')
     return jsonify({'success': True})
 
+# Largest batch accepted by the bulk approve/reject endpoint
+BULK_ACTION_LIMIT = 1000
+
+@main_bp.route('/admin/requests/bulk', methods=['POST'])
+@login_required
+def bulk_request_action():
+    """Approve or reject many pending requests in one transaction.
+    
+    Expects JSON ``{"action": "approve"|"reject", "ids": [...]}``, or a
+    ``series_id`` instead of ``ids`` to act on every pending occurrence of a
+    recurring request. The status change is a single UPDATE, the
+    notification jobs are one multi-row INSERT and the whole batch commits
+    once. Every id that could not be processed is reported with a reason.
+    """
+    if current_user.user_type != 'admin':
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    action = payload.get('action')
+    new_status = {'approve': 'approved', 'reject': 'rejected'}.get(action) if isinstance(action, str) else None
+    if new_status is None:
+        return jsonify({'success': False, 'message': 'Action must be "approve" or "reject"'}), 400
+    
+    raw_ids = payload.get('ids') or []
+    if not isinstance(raw_ids, list):
+        return jsonify({'success': False, 'message': 'ids must be a list'}), 400
+    series_id = payload.get('series_id')
+    if series_id:
+        raw_ids = [row.id for row in db.session.query(Reservation.id).filter(
+            Reservation.series_id == str(series_id),
+            Reservation.status == 'pending'
+        ).order_by(Reservation.start_time)]
+        if not raw_ids:
+            return jsonify({'success': False, 'message': 'No pending requests in this series'}), 404
+    
+    requested, failed = [], []
+    for raw_id in raw_ids:
+        try:
+            request_id = int(raw_id)
+        except (TypeError, ValueError):
+            failed.append({'id': raw_id, 'reason': 'invalid id'})
+            continue
+        if request_id not in requested:
+            requested.append(request_id)
+    if not requested and not failed:
+        return jsonify({'success': False, 'message': 'No request ids given'}), 400
+    if len(requested) > BULK_ACTION_LIMIT:
+        return jsonify({'success': False,
+                        'message': f'At most {BULK_ACTION_LIMIT} requests per batch'}), 400
+    
+    rows = {row.id: row for row in db.session.query(
+        Reservation.id, Reservation.status, Reservation.lab_id, Reservation.instructor_id,
+        Reservation.start_time, Reservation.updated_at,
+        Instructor.user_id.label('instructor_user_id'), Laboratory.name.label('lab')
+    ).join(
+        Instructor, Reservation.instructor_id == Instructor.id
+    ).join(
+        Laboratory, Reservation.lab_id == Laboratory.id
+    ).filter(Reservation.id.in_(requested)).all()} if requested else {}
+    
+    candidates = []
+    for request_id in requested:
+        row = rows.get(request_id)
+        if row is None:
+            failed.append({'id': request_id, 'reason': 'not found'})
+        elif row.status != 'pending':
+            failed.append({'id': request_id, 'reason': f'already {row.status}'})
+        else:
+            candidates.append(request_id)
+    
+    updated = []
+    if candidates:
+        # RETURNING tells us exactly which rows were still pending at UPDATE time
+        updated = db.session.execute(
+            Reservation.__table__.update()
+            .where(Reservation.__table__.c.id.in_(candidates),
+                   Reservation.__table__.c.status == 'pending')
+            .values(status=new_status, updated_at=datetime.utcnow())
+            .returning(Reservation.__table__.c.id)
+        ).scalars().all()
+        updated_set = set(updated)
+        failed.extend({'id': request_id, 'reason': 'status changed concurrently'}
+                      for request_id in candidates if request_id not in updated_set)
+        updated = [request_id for request_id in candidates if request_id in updated_set]
+    
+    if updated:
+        # The set-based UPDATE bypasses ORM flush hooks, so mirror them here
+        changes = [rows[request_id] for request_id in updated]
+        reservation_delta(
+            [(r.lab_id, r.instructor_id, r.start_time, 'pending') for r in changes],
+            [(r.lab_id, r.instructor_id, r.start_time, new_status) for r in changes]
+        ).apply(db.session.connection())
+        bump_reservation_versions(db.session.connection())
+        
+        job_queue.enqueue_many('notification', [
+            decision_notification(r.id, r.instructor_user_id, r.lab, r.start_time, new_status,
+                                  r.updated_at)
+            for r in changes
+        ])
+        db.session.commit()
+        
+        if new_status == 'rejected':
+            for request_id in updated:
+                reservation_index.discard(request_id)
+    
+    return jsonify({
+        'success': not failed,
+        'action': action,
+        'updated': updated,
+        'failed': failed
+    })
+
+@main_bp.route('/admin/timetable/solve', methods=['POST'])
+@login_required
+def solve_timetable():
+    """Assign a term's sections to labs and optionally book the result.
+    
+    Expects JSON ``{"term_start": "YYYY-MM-DD", "term_end": "YYYY-MM-DD",
+    "skip_dates": [...], "sections": [...], "commit": false}``; see
+    ``app.timetable.parse_demand`` for the section fields. With ``commit``
+    the assignment is inserted as pending reservations, one series per
+    section, in a single transaction.
+    """
+    if current_user.user_type != 'admin':
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    try:
+        term_start = datetime.strptime(str(payload.get('term_start')), '%Y-%m-%d').date()
+        term_end = datetime.strptime(str(payload.get('term_end')), '%Y-%m-%d').date()
+        skip_dates = parse_skip_dates(','.join(map(str, payload.get('skip_dates') or [])))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+    if term_end < term_start or term_end > term_start + timedelta(days=366):
+        return jsonify({'success': False, 'message': 'term_end must fall within a year after term_start'}), 400
+    
+    try:
+        problem = build_problem(parse_demand(payload.get('sections')), term_start, term_end, skip_dates)
+    except DemandError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    placement = solve(problem, time_limit=current_app.config['TIMETABLE_TIME_LIMIT'])
+    assigned, unassigned = describe(problem, placement)
+    
+    created = 0
+    if payload.get('commit') and assigned:
+        rows = create_reservations(problem, placement)
+        db.session.commit()
+        for row in rows:
+            reservation_index.add(row)
+        created = len(rows)
+    
+    return jsonify({
+        'success': not unassigned,
+        'assigned': assigned,
+        'unassigned': unassigned,
+        'created': created
+    })
+
 @main_bp.route('/notifications')
 @login_required
 def notifications():
-    user_notifications = Notification.query.filter_by(
-        user_id=current_user.id
-    ).order_by(Notification.created_at.desc()).limit(10).all()
+    user_notifications, next_cursor = notification_page(current_user.id, limit=10)
+    
+    return render_template('components/notifications.html',
+                           notifications=user_notifications,
+                           next_cursor=next_cursor)
+
+@main_bp.route('/api/notifications')
+@login_required
+def api_notifications():
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    cursor = request.args.get('cursor')
+    
+    page, next_cursor = notification_page(current_user.id, limit=limit, cursor=cursor, offset=offset)
     
-    return render_template('components/notifications.html', notifications=user_notifications)
+    return jsonify({
+        'notifications': [notification_payload(n) for n in page],
+        # Read fresh: the cached current_user may lag behind other workers
+        'unread_count': db.session.query(User.unread_notifications).filter(
+            User.id == current_user.id).scalar(),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
 
 @main_bp.route('/notifications/mark_read/<int:notification_id>')
 @login_required
@@ -303,7 +718,7 @@ def mark_notification_read(notification_id):
     if notification.user_id != current_user.id:
         return jsonify({'success': False})
     
-    notification.is_read = True
+    mark_read(notification)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -311,15 +726,28 @@ def mark_notification_read(notification_id):
 @main_bp.route('/notifications/mark_all_read')
 @login_required
 def mark_all_notifications_read():
-    Notification.query.filter_by(
-        user_id=current_user.id,
-        is_read=False
-    ).update({'is_read': True})
+    mark_all_read(current_user.id)
     db.session.commit()
     
     flash('All notifications marked as read.', 'success')
     return redirect(request.referrer or url_for('main.dashboard'))
 
+@main_bp.route('/api/notifications/stream')
+@login_required
+def notification_stream():
+    user_id = current_user.id
+    try:
+        channel = notification_broker.subscribe(user_id)
+    except StreamLimitReached:
+        response = jsonify({'error': 'Too many open notification streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(notification_broker.heartbeat)
+        return response
+    
+    return Response(notification_broker.stream(user_id, channel),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # Error handlers
 @main_bp.app_errorhandler(404)
 def not_found_error(error):
@@ -0,0 +1,430 @@
+"""
+Automatic timetable solver: places a term's course sections into labs.
+
+Demand is a list of sections, each needing some hours per week in a lab with
+enough seats, ideally inside preferred time windows. The solver works on a
+weekly grid of one-hour slots within ``LAB_HOURS``. Every pending or approved
+reservation in the term blocks its weekly slot for both the lab and the
+instructor, so the weekly pattern it finds can be repeated in every week of
+the term without conflicts.
+
+The search is a randomized greedy. Sessions are placed most constrained
+first into the cheapest free slot (inside a preferred window, in the
+tightest-fitting lab). A session that does not fit may evict one placed
+session that can move elsewhere. The whole pass restarts with different
+tie-breaking until the time limit, keeping the best result. Restarts are
+independent, so ``workers > 1`` spreads them over processes.
+"""
+
+import math
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from app import db
+from app.models import Reservation, Laboratory, Instructor
+from app.conflicts import ACTIVE_STATUSES
+from app.recurrence import insert_reservations, new_series_id
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Opening hours per weekday (Monday=0) as [open, close) hours; Sunday closed
+LAB_HOURS = {
+    0: (8, 19),
+    1: (8, 19),
+    2: (8, 19),
+    3: (8, 19),
+    4: (8, 19),
+    5: (9, 17),
+}
+
+DEFAULT_SESSION_HOURS = 3
+MAX_SESSION_HOURS = 4
+
+# Cost of a session starting outside the section's preferred windows
+WINDOW_PENALTY = 100
+
+# Evictions tried per session that does not fit
+REPAIR_ATTEMPTS = 40
+
+Section = namedtuple('Section', 'course_name section instructor_id hours_per_week '
+                                'capacity session_hours windows')
+
+
+class DemandError(ValueError):
+    """Raised for malformed timetable demand"""
+
+
+def _hour(value, what):
+    if isinstance(value, int):
+        hour = value
+    else:
+        try:
+            parsed = datetime.strptime(str(value), '%H:%M')
+        except ValueError:
+            raise DemandError(f'{what} must be HH:MM')
+        if parsed.minute:
+            raise DemandError(f'{what} must be on the hour')
+        hour = parsed.hour
+    if not 0 <= hour <= 24:
+        raise DemandError(f'{what} must be between 00:00 and 24:00')
+    return hour
+
+
+def _window_masks(windows, label):
+    """Turn ``[{"day": "mon", "start": "08:00", "end": "12:00"}]`` into hour masks per weekday"""
+    masks = {}
+    for window in windows or []:
+        day = str(window.get('day', '')).lower()[:3]
+        if day not in WEEKDAYS:
+            raise DemandError(f'{label}: window day must be one of {", ".join(WEEKDAYS)}')
+        start = _hour(window.get('start', 0), f'{label}: window start')
+        end = _hour(window.get('end', 24), f'{label}: window end')
+        if end <= start:
+            raise DemandError(f'{label}: window end must be after its start')
+        weekday = WEEKDAYS.index(day)
+        masks[weekday] = masks.get(weekday, 0) | (((1 << (end - start)) - 1) << start)
+    return masks
+
+
+def parse_demand(items):
+    """Validate raw demand dicts and return a list of ``Section``"""
+    if not isinstance(items, list) or not items:
+        raise DemandError('sections must be a non-empty list')
+
+    sections, seen = [], set()
+    for item in items:
+        if not isinstance(item, dict):
+            raise DemandError('each section must be an object')
+        course_name = str(item.get('course_name') or '').strip()
+        section = str(item.get('section') or '').strip()
+        label = f'{course_name} - {section}'
+        if not course_name or not section:
+            raise DemandError('each section needs course_name and section')
+        if (course_name, section) in seen:
+            raise DemandError(f'{label}: listed more than once')
+        seen.add((course_name, section))
+        try:
+            instructor_id = int(item['instructor_id'])
+            hours = int(item['hours_per_week'])
+            capacity = int(item.get('capacity', 0))
+            session_hours = int(item.get('session_hours') or min(hours, DEFAULT_SESSION_HOURS))
+        except (KeyError, TypeError, ValueError):
+            raise DemandError(f'{label}: instructor_id and hours_per_week must be integers')
+        if hours < 1 or not 1 <= session_hours <= MAX_SESSION_HOURS:
+            raise DemandError(f'{label}: sessions must be 1 to {MAX_SESSION_HOURS} hours')
+        if math.ceil(hours / session_hours) > len(LAB_HOURS):
+            raise DemandError(f'{label}: more sessions than open days per week')
+        sections.append(Section(course_name, section, instructor_id, hours, capacity,
+                                session_hours, _window_masks(item.get('windows'), label)))
+    return sections
+
+
+def term_weeks(term_start, term_end, skip_dates=()):
+    """Dates of each weekday in the term, minus skipped dates"""
+    dates = {weekday: [] for weekday in LAB_HOURS}
+    day = term_start
+    while day <= term_end:
+        if day.weekday() in dates and day not in skip_dates:
+            dates[day.weekday()].append(day)
+        day += timedelta(days=1)
+    return dates
+
+
+def _blocked_masks(term_start, term_end, lab_ids, instructor_ids):
+    """Weekly hour masks blocked by active reservations anywhere in the term"""
+    lab_blocked = {lab_id: [0] * 7 for lab_id in lab_ids}
+    instructor_blocked = {instructor_id: [0] * 7 for instructor_id in instructor_ids}
+    range_start = datetime.combine(term_start, datetime.min.time())
+    range_end = datetime.combine(term_end + timedelta(days=1), datetime.min.time())
+
+    rows = db.session.query(
+        Reservation.lab_id, Reservation.instructor_id,
+        Reservation.start_time, Reservation.end_time
+    ).filter(
+        Reservation.status.in_(ACTIVE_STATUSES),
+        Reservation.start_time < range_end,
+        Reservation.end_time > range_start
+    )
+    for lab_id, instructor_id, start, end in rows:
+        # Split at midnights; partial hours block the whole hour
+        day_start = datetime.combine(start.date(), datetime.min.time())
+        while day_start < end:
+            next_day = day_start + timedelta(days=1)
+            first = max(start, day_start)
+            last = min(end, next_day)
+            if last > first:
+                first_hour = first.hour
+                last_hour = math.ceil((last - day_start).total_seconds() / 3600)
+                mask = ((1 << (last_hour - first_hour)) - 1) << first_hour
+                weekday = day_start.weekday()
+                if lab_id in lab_blocked:
+                    lab_blocked[lab_id][weekday] |= mask
+                if instructor_id in instructor_blocked:
+                    instructor_blocked[instructor_id][weekday] |= mask
+            day_start = next_day
+    return lab_blocked, instructor_blocked
+
+
+def build_problem(sections, term_start, term_end, skip_dates=()):
+    """Load labs and blocking reservations and enumerate placement candidates.
+
+    The result is a plain dict so it can be shipped to worker processes.
+    Labs without a capacity on record cannot be shown to fit a section and
+    are left out.
+    """
+    labs = [(lab.id, lab.name, lab.capacity) for lab in Laboratory.query.filter(
+        Laboratory.is_active == True, Laboratory.capacity.isnot(None)
+    ).order_by(Laboratory.capacity, Laboratory.id)]
+    instructor_ids = {section.instructor_id for section in sections}
+    known = {row.id for row in db.session.query(Instructor.id).filter(
+        Instructor.id.in_(instructor_ids))}
+    missing = instructor_ids - known
+    if missing:
+        raise DemandError(f'unknown instructor id(s): {", ".join(map(str, sorted(missing)))}')
+
+    weeks = term_weeks(term_start, term_end, set(skip_dates))
+    lab_blocked, instructor_blocked = _blocked_masks(
+        term_start, term_end, [lab[0] for lab in labs], instructor_ids)
+    max_capacity = max((lab[2] for lab in labs), default=0)
+
+    sessions, candidates = [], []
+    for section_idx, section in enumerate(sections):
+        lengths = [section.session_hours] * (section.hours_per_week // section.session_hours)
+        if section.hours_per_week % section.session_hours:
+            lengths.append(section.hours_per_week % section.session_hours)
+        for length in lengths:
+            options = []
+            for lab_pos, (_, _, capacity) in enumerate(labs):
+                if capacity < section.capacity:
+                    continue
+                # Prefer the smallest lab that fits so large labs stay free
+                fit_cost = (capacity - section.capacity) * 10 // max(max_capacity, 1)
+                for weekday, (opens, closes) in LAB_HOURS.items():
+                    if not weeks[weekday]:
+                        continue
+                    window = section.windows.get(weekday, 0)
+                    for start in range(opens, closes - length + 1):
+                        mask = ((1 << length) - 1) << start
+                        if lab_blocked[labs[lab_pos][0]][weekday] & mask:
+                            continue
+                        if instructor_blocked[section.instructor_id][weekday] & mask:
+                            continue
+                        in_window = not section.windows or (window & mask) == mask
+                        cost = fit_cost + (0 if in_window else WINDOW_PENALTY)
+                        options.append((cost, lab_pos, weekday, start))
+            options.sort()
+            sessions.append((section_idx, length))
+            candidates.append(options)
+
+    return {
+        'labs': labs,
+        'sections': sections,
+        'sessions': sessions,
+        'candidates': candidates,
+        'instructors': [section.instructor_id for section in sections],
+        'weeks': weeks,
+    }
+
+
+class _Grid:
+    """Occupancy of one search pass: which session holds each lab/instructor hour"""
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.lab_busy = [[0] * 7 for _ in problem['labs']]
+        self.instructor_busy = {i: [0] * 7 for i in set(problem['instructors'])}
+        self.section_days = [0] * len(problem['sections'])
+        self.owners = {}    # ('lab', pos, day, hour) / ('instructor', id, day, hour) / ('section', idx, day) -> session
+        self.placement = [None] * len(problem['sessions'])
+
+    def _keys(self, session, option):
+        section_idx, length = self.problem['sessions'][session]
+        _, lab_pos, weekday, start = option
+        instructor = self.problem['instructors'][section_idx]
+        keys = [('section', section_idx, weekday)]
+        for hour in range(start, start + length):
+            keys.append(('lab', lab_pos, weekday, hour))
+            keys.append(('instructor', instructor, weekday, hour))
+        return keys
+
+    def is_free(self, session, option):
+        section_idx, length = self.problem['sessions'][session]
+        _, lab_pos, weekday, start = option
+        mask = ((1 << length) - 1) << start
+        return not (self.lab_busy[lab_pos][weekday] & mask
+                    or self.instructor_busy[self.problem['instructors'][section_idx]][weekday] & mask
+                    or self.section_days[section_idx] >> weekday & 1)
+
+    def place(self, session, option):
+        section_idx, length = self.problem['sessions'][session]
+        _, lab_pos, weekday, start = option
+        mask = ((1 << length) - 1) << start
+        self.lab_busy[lab_pos][weekday] |= mask
+        self.instructor_busy[self.problem['instructors'][section_idx]][weekday] |= mask
+        self.section_days[section_idx] |= 1 << weekday
+        for key in self._keys(session, option):
+            self.owners[key] = session
+        self.placement[session] = option
+
+    def remove(self, session):
+        section_idx, length = self.problem['sessions'][session]
+        option = self.placement[session]
+        _, lab_pos, weekday, start = option
+        mask = ((1 << length) - 1) << start
+        self.lab_busy[lab_pos][weekday] &= ~mask
+        self.instructor_busy[self.problem['instructors'][section_idx]][weekday] &= ~mask
+        self.section_days[section_idx] &= ~(1 << weekday)
+        for key in self._keys(session, option):
+            del self.owners[key]
+        self.placement[session] = None
+
+    def blockers(self, session, option):
+        """Placed sessions that stop ``session`` from taking ``option``"""
+        return {self.owners[key] for key in self._keys(session, option) if key in self.owners}
+
+
+def _pick(grid, session, rng):
+    """Cheapest free option for ``session``, random among equal-cost ties"""
+    best_cost, ties = None, []
+    for option in grid.problem['candidates'][session]:
+        if best_cost is not None and option[0] > best_cost:
+            break
+        if grid.is_free(session, option):
+            best_cost = option[0]
+            ties.append(option)
+            if len(ties) >= 8:
+                break
+    return rng.choice(ties) if ties else None
+
+
+def _repair(grid, session, rng):
+    """Make room for ``session`` by moving exactly one placed session"""
+    attempts = 0
+    for option in grid.problem['candidates'][session]:
+        blockers = grid.blockers(session, option)
+        if len(blockers) != 1:
+            continue
+        other = blockers.pop()
+        previous = grid.placement[other]
+        grid.remove(other)
+        grid.place(session, option)
+        moved = _pick(grid, other, rng)
+        if moved is not None:
+            grid.place(other, moved)
+            return True
+        grid.remove(session)
+        grid.place(other, previous)
+        attempts += 1
+        if attempts >= REPAIR_ATTEMPTS:
+            break
+    return False
+
+
+def _search_pass(problem, seed):
+    rng = random.Random(seed)
+    grid = _Grid(problem)
+    order = sorted(range(len(problem['sessions'])), key=lambda s: (
+        len(problem['candidates'][s]), -problem['sessions'][s][1], rng.random()))
+    for session in order:
+        option = _pick(grid, session, rng)
+        if option is not None:
+            grid.place(session, option)
+        else:
+            _repair(grid, session, rng)
+    unplaced = sum(1 for option in grid.placement if option is None)
+    cost = sum(option[0] for option in grid.placement if option is not None)
+    return (unplaced, cost), grid.placement
+
+
+def _search(problem, seeds, deadline):
+    best = None
+    for seed in seeds:
+        result = _search_pass(problem, seed)
+        if best is None or result[0] < best[0]:
+            best = result
+        if time.monotonic() >= deadline:
+            break
+    return best
+
+
+def solve(problem, restarts=8, time_limit=10.0, workers=1, seed=0):
+    """Run the randomized greedy search and return the best placement.
+
+    Stops after ``restarts`` passes (per worker) or ``time_limit`` seconds,
+    whichever comes first; the first pass always completes.
+    """
+    deadline = time.monotonic() + time_limit
+    if workers <= 1:
+        return _search(problem, [seed + i for i in range(restarts)], deadline)[1]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_search, problem,
+                               [seed + w * restarts + i for i in range(restarts)], deadline)
+                   for w in range(workers)]
+        results = [future.result() for future in futures]
+    return min(results, key=lambda result: result[0])[1]
+
+
+def describe(problem, placement):
+    """Split a placement into JSON-friendly assignments and unassigned sessions"""
+    labs, sections = problem['labs'], problem['sections']
+    assigned, unassigned = [], []
+    for session, option in enumerate(placement):
+        section_idx, length = problem['sessions'][session]
+        section = sections[section_idx]
+        entry = {
+            'course_name': section.course_name,
+            'section': section.section,
+            'instructor_id': section.instructor_id,
+            'hours': length,
+        }
+        if option is None:
+            reason = 'no free slot in a large enough lab' if problem['candidates'][session] \
+                else f'no active lab with capacity >= {section.capacity} has a free slot'
+            unassigned.append(dict(entry, reason=reason))
+            continue
+        cost, lab_pos, weekday, start = option
+        assigned.append(dict(
+            entry,
+            lab_id=labs[lab_pos][0],
+            lab=labs[lab_pos][1],
+            day=WEEKDAYS[weekday],
+            start=f'{start:02d}:00',
+            end=f'{start + length:02d}:00',
+            preferred=cost < WINDOW_PENALTY,
+            weeks=len(problem['weeks'][weekday])
+        ))
+    return assigned, unassigned
+
+
+def create_reservations(problem, placement, notes='Scheduled by the timetable solver'):
+    """Insert every placed session for every week as pending reservations.
+
+    Sessions of one section share a series id so the section can be approved
+    or rejected as a unit. Returns the inserted rows; the caller commits.
+    """
+    labs, sections = problem['labs'], problem['sections']
+    series_ids = {}
+    rows = []
+    for session, option in enumerate(placement):
+        if option is None:
+            continue
+        section_idx, length = problem['sessions'][session]
+        section = sections[section_idx]
+        series_id = series_ids.setdefault(section_idx, new_series_id())
+        _, lab_pos, weekday, start = option
+        for day in problem['weeks'][weekday]:
+            start_time = datetime.combine(day, datetime.min.time()) + timedelta(hours=start)
+            rows.append({
+                'instructor_id': section.instructor_id,
+                'lab_id': labs[lab_pos][0],
+                'course_name': section.course_name,
+                'section': section.section,
+                'start_time': start_time,
+                'end_time': start_time + timedelta(hours=length),
+                'notes': notes,
+                'series_id': series_id
+            })
+    return insert_reservations(rows) if rows else []
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: free-slot search over a month across every lab.
+
+Fills a throwaway SQLite database with a busy month of reservations, then
+times ``find_free_slots`` (query + sweep + ranking) for a one-month window
+over all labs. Exits non-zero if the median run takes 50 ms or more.
+
+Usage:
+    python benchmarks/availability_bench.py [--labs 12] [--per-day 8] [--runs 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--labs', type=int, default=12)
+    parser.add_argument('--per-day', type=int, default=8, help='reservations per lab per day')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+    from app import create_app, db
+    from app.models import User, Instructor, Laboratory, Reservation
+    from app.availability import find_free_slots
+
+    app = create_app('development')
+    rng = random.Random(args.seed)
+    range_start = datetime(2030, 3, 1)
+    range_end = range_start + timedelta(days=31)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@test', user_type='instructor', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        instructor = Instructor(user_id=user.id, full_name='Benchmark Instructor')
+        db.session.add(instructor)
+        db.session.add_all([Laboratory(name=f'Lab {i}', room_number=f'B-{i}', capacity=(25, 30, 40)[i % 3])
+                            for i in range(args.labs)])
+        db.session.commit()
+        lab_ids = [lab.id for lab in Laboratory.query.order_by(Laboratory.id)]
+
+        rows = []
+        for day in range(31):
+            for lab_id in lab_ids:
+                for _ in range(args.per_day):
+                    start = range_start + timedelta(days=day, hours=rng.randint(7, 18),
+                                                    minutes=rng.choice((0, 30)))
+                    rows.append({
+                        'instructor_id': instructor.id, 'lab_id': lab_id,
+                        'course_name': 'Benchmark', 'section': 'B-1',
+                        'start_time': start,
+                        'end_time': start + timedelta(minutes=rng.choice((60, 90, 120, 180))),
+                        'status': rng.choice(('approved', 'approved', 'pending', 'rejected'))
+                    })
+        db.session.execute(Reservation.__table__.insert(), rows)
+        db.session.commit()
+        print(f"📊 {len(rows):,} reservations across {args.labs} labs over 31 days")
+
+        for duration in (60, 120, 180):
+            samples = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                slots = find_free_slots(timedelta(minutes=duration), range_start, range_end, limit=20)
+                samples.append(time.perf_counter() - started)
+            median = statistics.median(samples)
+            print(f"   {duration:3d} min slots: {len(slots)} returned, "
+                  f"best {min(samples) * 1000:.1f} ms, median {median * 1000:.1f} ms")
+
+    os.unlink(db_file)
+    if median >= 0.05:
+        print("❌ Free-slot search is slower than 50 ms.")
+        sys.exit(1)
+    print("✅ A month across every lab is searched in milliseconds.")
+
+
+if __name__ == '__main__':
+    main()
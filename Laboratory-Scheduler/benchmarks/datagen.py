@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator: labs, instructors, students, reservations.
+
+Fills an empty database with a seeded, realistic dataset for benchmarks and
+manual testing. The same seed and options always produce the same rows.
+
+- Instructor activity and lab demand follow a long-tailed distribution:
+  a few instructors and labs account for most bookings.
+- Each lab day is packed with back-to-back sessions between 07:00 and
+  19:00, with fewer on Saturdays and none on Sundays.
+- About 90% of the window lies in the past. Past sessions are mostly
+  approved or completed; future ones are still partly pending.
+- Students are spread over the instructors' sections, and notifications
+  go to the instructors.
+
+Rows are written with multi-row Core inserts in large batches. On an empty
+table the secondary indexes are dropped for the load and rebuilt afterwards.
+The report rollups and unread counters are recomputed once at the end.
+
+Every generated account uses the password "password"; the admin is "admin".
+
+Usage:
+    python benchmarks/datagen.py --database-url sqlite:////tmp/lab-1m.db \\
+        [--labs 100] [--instructors 2000] [--students 20000] \\
+        [--reservations 1000000] [--seed 42]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import func, select
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+BATCH_SIZE = 20000
+
+COURSES = ('Programming 1', 'Programming 2', 'Data Structures', 'Databases', 'Networking',
+           'Web Development', 'Operating Systems', 'Systems Analysis', 'Computer Graphics',
+           'Information Security', 'Mobile Development', 'Capstone Project')
+DEPARTMENTS = ('Information Technology', 'Computer Science', 'Information Systems',
+               'Computer Engineering')
+EQUIPMENT = ('30 PCs, Projector', '25 PCs, Smart Board', 'Cisco Routers, Switches',
+             'Electronic Components, Oscilloscopes', '40 PCs, Projector, Document Camera')
+CAPACITIES = (20, 25, 30, 35, 40, 45)
+
+# Minutes, weighted towards the usual 1.5-3 hour lab blocks
+DURATIONS = (60, 90, 120, 180, 240)
+DURATION_WEIGHTS = (2, 3, 4, 3, 1)
+# Gap before the next session in the same lab
+GAPS = (0, 30, 60, 90)
+GAP_WEIGHTS = (5, 3, 2, 1)
+
+PAST_STATUSES = ('approved', 'completed', 'rejected', 'pending')
+PAST_STATUS_WEIGHTS = (78, 12, 8, 2)
+FUTURE_STATUSES = ('approved', 'pending', 'rejected')
+FUTURE_STATUS_WEIGHTS = (60, 32, 8)
+
+
+def long_tail(count, exponent=0.8):
+    """Cumulative Zipf-like weights for ``rng.choices(cum_weights=...)``"""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def pick(rng, items, cum_weights):
+    return items[bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_rows(conn, table, rows):
+    count = 0
+    for batch in batched(rows):
+        conn.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def next_id(conn, table):
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def session_days(rng, range_start, labs, total):
+    """Yield ``(lab_index, start, end)`` lab sessions until ``total`` is reached.
+
+    Lab popularity skews how full each lab's days are.
+    """
+    produced = 0
+    day = range_start
+    while True:
+        weekday = day.weekday()
+        if weekday != 6:
+            close = day.replace(hour=19 if weekday < 5 else 16)
+            for lab_index, fill in enumerate(labs):
+                if rng.random() > fill:
+                    continue
+                cursor = day.replace(hour=7 if weekday < 5 else 8) + \
+                    timedelta(minutes=30 * rng.randint(0, 4))
+                while True:
+                    minutes = rng.choices(DURATIONS, DURATION_WEIGHTS)[0]
+                    end = cursor + timedelta(minutes=minutes)
+                    if end > close:
+                        break
+                    yield lab_index, cursor, end
+                    produced += 1
+                    if produced == total:
+                        return
+                    cursor = end + timedelta(minutes=rng.choices(GAPS, GAP_WEIGHTS)[0])
+        day += timedelta(days=1)
+
+
+def generate(conn, labs=100, instructors=2000, students=20000, reservations=1000000,
+             notifications_per_instructor=50, seed=42, anchor=None, password_hash=None,
+             progress=print):
+    """Write the dataset on ``conn`` and return a summary dict"""
+    from app.models import User, Instructor, Student, Laboratory, Reservation, Notification
+    from app.rollups import rebuild_rollups
+    from app.cache import bump_reservation_versions
+
+    rng = random.Random(seed)
+    anchor = (anchor or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    user_table, instructor_table = User.__table__, Instructor.__table__
+    student_table, lab_table = Student.__table__, Laboratory.__table__
+    reservation_table, notification_table = Reservation.__table__, Notification.__table__
+
+    if conn.execute(select(func.count()).select_from(user_table)).scalar():
+        raise ValueError('the database already has users; generate into an empty database')
+
+    # Users: one admin, then instructors, then students
+    user_id = next_id(conn, user_table)
+    created = datetime(anchor.year - 4, 6, 1)
+    users = [{'id': user_id, 'username': 'admin', 'email': 'admin@university.edu',
+              'password_hash': password_hash, 'user_type': 'admin', 'created_at': created}]
+    instructor_user_ids = range(user_id + 1, user_id + 1 + instructors)
+    student_user_ids = range(instructor_user_ids.stop, instructor_user_ids.stop + students)
+    users += [{'id': uid, 'username': f'inst{n + 1}', 'email': f'inst{n + 1}@university.edu',
+               'password_hash': password_hash, 'user_type': 'instructor', 'created_at': created}
+              for n, uid in enumerate(instructor_user_ids)]
+    users += [{'id': uid, 'username': f'student{n + 1}', 'email': f'student{n + 1}@university.edu',
+               'password_hash': password_hash, 'user_type': 'student', 'created_at': created}
+              for n, uid in enumerate(student_user_ids)]
+    insert_rows(conn, user_table, users)
+
+    instructor_id = next_id(conn, instructor_table)
+    instructor_ids = list(range(instructor_id, instructor_id + instructors))
+    insert_rows(conn, instructor_table, ({
+        'id': iid, 'user_id': uid, 'full_name': f'Instructor {n + 1}',
+        'department': rng.choice(DEPARTMENTS), 'phone': f'+1-555-{n % 10000:04d}',
+        'is_active': rng.random() > 0.02
+    } for n, (iid, uid) in enumerate(zip(instructor_ids, instructor_user_ids))))
+
+    # Each instructor teaches one to four sections of their courses
+    teaching = {}
+    for n, iid in enumerate(instructor_ids):
+        courses = rng.sample(COURSES, rng.randint(1, 3))
+        teaching[iid] = [(course, f'IT{n + 1}-{chr(65 + k)}') for k, course in
+                         enumerate(rng.choice(courses) for _ in range(rng.randint(1, 4)))]
+    sections = [section for classes in teaching.values() for _, section in classes]
+    insert_rows(conn, student_table, ({
+        'user_id': uid, 'full_name': f'Student {n + 1}',
+        'student_id': f'{anchor.year - rng.randint(0, 4)}{n + 1:07d}',
+        'course_section': rng.choice(sections)
+    } for n, uid in enumerate(student_user_ids)))
+
+    lab_id = next_id(conn, lab_table)
+    lab_ids = list(range(lab_id, lab_id + labs))
+    insert_rows(conn, lab_table, ({
+        'id': lid, 'name': f'Computer Lab {n + 1}', 'room_number': f'CL-{n + 1:03d}',
+        'capacity': rng.choice(CAPACITIES), 'equipment': rng.choice(EQUIPMENT),
+        'is_active': rng.random() > 0.03, 'created_at': created
+    } for n, lid in enumerate(lab_ids)))
+    progress(f"👥 {len(users):,} users, {labs} labs, {len(sections):,} sections")
+
+    # Fill ratio per lab day (popular labs are booked almost every day) sizes
+    # the window so that about 90% of it lies before the anchor
+    lab_fill = [0.35 + 0.6 / (rank + 1) ** 0.3 for rank in range(labs)]
+    rng.shuffle(lab_fill)
+    per_day = sum(lab_fill) * 5.5   # ~5.5 sessions per booked weekday
+    days = max(int(reservations / per_day * 7 / 6), 7)
+    range_start = anchor - timedelta(days=int(days * 0.9))
+
+    instructor_weights = long_tail(instructors)
+    shuffled_instructors = instructor_ids[:]
+    rng.shuffle(shuffled_instructors)
+
+    def reservation_rows():
+        reservation_id = next_id(conn, reservation_table)
+        for lab_index, start, end in session_days(rng, range_start, lab_fill, reservations):
+            iid = pick(rng, shuffled_instructors, instructor_weights)
+            course, section = rng.choice(teaching[iid])
+            if start < anchor:
+                status = rng.choices(PAST_STATUSES, PAST_STATUS_WEIGHTS)[0]
+            else:
+                status = rng.choices(FUTURE_STATUSES, FUTURE_STATUS_WEIGHTS)[0]
+            yield {
+                'id': reservation_id, 'instructor_id': iid, 'lab_id': lab_ids[lab_index],
+                'course_name': course, 'section': section,
+                'start_time': start, 'end_time': end, 'status': status,
+                'notes': None, 'series_id': None,
+                'created_at': start - timedelta(days=rng.randint(1, 28), minutes=rng.randint(0, 1439))
+            }
+            reservation_id += 1
+
+    started = time.perf_counter()
+    with without_secondary_indexes(conn, reservation_table):
+        written = insert_rows(conn, reservation_table, reservation_rows())
+    progress(f"📅 {written:,} reservations from {range_start:%Y-%m-%d} "
+             f"({time.perf_counter() - started:.0f} s)")
+
+    # Decision notifications for instructors, newest weeks most likely unread
+    user_of = dict(zip(instructor_ids, instructor_user_ids))
+    notification_total = notifications_per_instructor * instructors
+    first_reservation = conn.execute(select(func.min(reservation_table.c.id))).scalar()
+
+    def notification_rows():
+        for _ in range(notification_total):
+            iid = pick(rng, shuffled_instructors, instructor_weights)
+            created_at = anchor - timedelta(minutes=int(rng.expovariate(1 / 20000)))
+            approved = rng.random() < 0.85
+            yield {
+                'user_id': user_of[iid],
+                'reservation_id': first_reservation + rng.randrange(written),
+                'title': 'Reservation Approved' if approved else 'Reservation Rejected',
+                'message': f"Your reservation has been {'approved' if approved else 'rejected'}.",
+                'is_read': anchor - created_at > timedelta(days=7) or rng.random() < 0.5,
+                'created_at': created_at
+            }
+
+    started = time.perf_counter()
+    with without_secondary_indexes(conn, notification_table):
+        insert_rows(conn, notification_table, notification_rows())
+    progress(f"🔔 {notification_total:,} notifications ({time.perf_counter() - started:.0f} s)")
+
+    started = time.perf_counter()
+    actual = select(func.count(notification_table.c.id)).where(
+        notification_table.c.user_id == user_table.c.id,
+        notification_table.c.is_read == False
+    ).scalar_subquery()
+    conn.execute(user_table.update().values(unread_notifications=actual))
+    lab_rows, instructor_rows = rebuild_rollups(conn)
+    bump_reservation_versions(conn)
+    progress(f"📊 Rollups: {lab_rows:,} lab/hour and {instructor_rows:,} instructor/month rows "
+             f"({time.perf_counter() - started:.0f} s)")
+
+    return {
+        'seed': seed, 'anchor': anchor.isoformat(), 'range_start': range_start.isoformat(),
+        'labs': labs, 'instructors': instructors, 'students': students,
+        'reservations': written, 'notifications': notification_total
+    }
+
+
+@contextmanager
+def without_secondary_indexes(conn, table):
+    """Drop a table's non-unique indexes while bulk loading into it when empty"""
+    empty = not conn.execute(select(func.count()).select_from(table)).scalar()
+    indexes = [index for index in table.indexes if not index.unique] if empty else []
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    yield
+    for index in indexes:
+        index.create(conn, checkfirst=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--database-url', required=True,
+                        help='target database, e.g. sqlite:////tmp/lab-1m.db (created if missing)')
+    parser.add_argument('--labs', type=int, default=100)
+    parser.add_argument('--instructors', type=int, default=2000)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--reservations', type=int, default=1000000)
+    parser.add_argument('--notifications-per-instructor', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app, db
+    from app.passwords import password_hasher
+    from migrate_db import stamp
+
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        stamp()
+        started = time.perf_counter()
+        try:
+            with db.engine.begin() as conn:
+                summary = generate(
+                    conn, labs=args.labs, instructors=args.instructors,
+                    students=args.students, reservations=args.reservations,
+                    notifications_per_instructor=args.notifications_per_instructor,
+                    seed=args.seed, password_hash=password_hasher.hash('password')
+                )
+        except ValueError as exc:
+            print(f"❌ {exc}")
+            sys.exit(1)
+        password_hasher.shutdown()
+
+    print(f"✅ Generated {summary['reservations']:,} reservations in "
+          f"{time.perf_counter() - started:.0f} s (seed {args.seed}).")
+
+
+if __name__ == '__main__':
+    main()
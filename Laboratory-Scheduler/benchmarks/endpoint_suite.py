@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: latency and SQL query count for every route.
+
+Drives each endpoint through the Flask test client as the role that uses it,
+against a synthetic dataset (see datagen.py). Records latency percentiles
+and the number of SQL statements per request, and writes the results to a
+JSON file. ``--compare`` checks a run against an earlier file and exits
+non-zero on regressions.
+
+Without ``--dataset`` a fresh dataset is generated into a temporary SQLite
+database. ``--dataset`` takes a SQLite file built by datagen.py; the suite
+runs on a temporary copy because some endpoints write (approve/reject,
+bulk actions, new requests, labs and instructors, mark read). Report caches
+are cleared before every request unless ``--warm-cache`` is given. The SSE
+stream is left to sse_load.py.
+
+Usage:
+    python benchmarks/endpoint_suite.py [--reservations 200000] [--runs 20]
+        [--dataset lab-1m.db] [--only dashboard] [--output results.json]
+        [--compare previous.json] [--threshold 1.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+PERCENTILES = (50, 90, 95, 99)
+# Latency below this is treated as noise when comparing runs
+NOISE_FLOOR_MS = 2.0
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pick_context(db):
+    """Accounts and ids the endpoint cases need, chosen from the dataset"""
+    from sqlalchemy import func
+    from app.models import User, Instructor, Student, Laboratory, Reservation, Notification
+
+    now = datetime.now()
+    busiest = db.session.query(Reservation.instructor_id).group_by(
+        Reservation.instructor_id).order_by(func.count().desc()).limit(1).scalar()
+    instructor = db.session.get(Instructor, busiest)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    section = db.session.query(Reservation.section).filter(
+        Reservation.status == 'approved',
+        Reservation.start_time >= today,
+        Reservation.start_time < today + timedelta(days=1)
+    ).limit(1).scalar()
+    student = (Student.query.filter_by(course_section=section).first() if section else None) \
+        or Student.query.first()
+    pending = [row.id for row in db.session.query(Reservation.id).filter(
+        Reservation.status == 'pending', Reservation.start_time > now
+    ).order_by(Reservation.start_time).limit(5000)]
+    notifications = [row.id for row in db.session.query(Notification.id).filter(
+        Notification.user_id == instructor.user_id, Notification.is_read == False
+    ).limit(500)]
+    return {
+        'admin': User.query.filter_by(user_type='admin').first().username,
+        'instructor': instructor.user.username,
+        'instructor_id': instructor.id,
+        'student': student.user.username,
+        'lab_id': Laboratory.query.filter_by(is_active=True).first().id,
+        'pending': pending,
+        'notifications': notifications or [0],
+        'today': today,
+    }
+
+
+def build_cases(ctx):
+    """(name, role, method, path, payload) per case; path and payload may
+    be callables taking the iteration number so writes use fresh rows."""
+    today = ctx['today']
+    monday = today - timedelta(days=today.weekday())
+    pending = iter(ctx['pending'])
+    notifications = ctx['notifications']
+    stamp = int(time.time())
+
+    def next_pending(n=1):
+        return [next(pending) for _ in range(n)]
+
+    reservation_start = today + timedelta(days=400)
+
+    return [
+        ('login page', 'anonymous', 'GET', '/login', None),
+        ('login', 'anonymous', 'POST', '/login',
+         {'form': {'username': ctx['instructor'], 'password': 'password'}}),
+        ('logout', 'logout', 'GET', '/logout', None),
+        ('forgot password page', 'anonymous', 'GET', '/forgot-password', None),
+        ('forgot password', 'anonymous', 'POST', '/forgot-password',
+         {'form': {'email': 'inst1@university.edu'}}),
+        ('reset password page', 'anonymous', 'GET', '/reset-password/token', None),
+        ('reset password', 'anonymous', 'POST', '/reset-password/token',
+         {'form': {'password': 'secret1', 'confirm_password': 'secret1'}}),
+        ('check auth', 'instructor', 'GET', '/api/check-auth', None),
+        ('user info', 'instructor', 'GET', '/api/user-info', None),
+
+        ('dashboard admin', 'admin', 'GET', '/dashboard', None),
+        ('dashboard instructor', 'instructor', 'GET', '/dashboard', None),
+        ('dashboard student', 'student', 'GET', '/dashboard', None),
+        ('schedule page', 'instructor', 'GET', '/schedule', None),
+        ('api schedule week', 'instructor', 'GET',
+         f'/api/schedule?view=week&date={today:%Y-%m-%d}', None),
+        ('api schedule month', 'admin', 'GET',
+         f'/api/schedule?view=month&date={today:%Y-%m-%d}', None),
+        ('api schedule month revalidated', 'admin', 'GET',
+         f'/api/schedule?view=month&date={today:%Y-%m-%d}', {'revalidate': True}),
+        ('api schedule lab month', 'instructor', 'GET',
+         f"/api/schedule?view=month&lab_id={ctx['lab_id']}&date={today:%Y-%m-%d}", None),
+        ('schedule export csv', 'admin', 'GET',
+         f'/api/schedule/export?format=csv&view=month&date={today:%Y-%m-%d}', None),
+        ('availability', 'instructor', 'GET', '/api/availability?duration=120&min_capacity=30', None),
+
+        ('reservation form', 'instructor', 'GET', '/reservation/request', None),
+        ('reservation request', 'instructor', 'POST', '/reservation/request',
+         lambda i: {'form': {
+             'lab_id': ctx['lab_id'], 'course_name': 'Benchmark', 'section': 'BENCH-1',
+             'start_time': f'{reservation_start + timedelta(days=i):%Y-%m-%d} 09:00',
+             'end_time': f'{reservation_start + timedelta(days=i):%Y-%m-%d} 11:00',
+             'recurrence': 'none'}}),
+        ('recurring reservation request', 'instructor', 'POST', '/reservation/request',
+         lambda i: {'form': {
+             'lab_id': ctx['lab_id'], 'course_name': 'Benchmark', 'section': 'BENCH-2',
+             'start_time': f'{reservation_start + timedelta(days=i):%Y-%m-%d} 14:00',
+             'end_time': f'{reservation_start + timedelta(days=i):%Y-%m-%d} 16:00',
+             'recurrence': 'weekly',
+             'repeat_until': f'{reservation_start + timedelta(days=i + 105):%Y-%m-%d}'}}),
+
+        ('manage labs', 'admin', 'GET', '/admin/labs', None),
+        ('add lab', 'admin', 'POST', '/admin/labs',
+         lambda i: {'form': {'name': f'Bench Lab {stamp}-{i}', 'room_number': f'BL-{stamp % 10000}-{i}',
+                             'capacity': 30, 'equipment': 'PCs', 'is_active': 'y'}}),
+        ('edit lab', 'admin', 'POST', f"/admin/labs/{ctx['lab_id']}/edit",
+         {'form': {'name': 'Bench Lab', 'room_number': 'BL-1', 'capacity': 40,
+                   'equipment': 'PCs', 'is_active': 'on'}}),
+        ('manage instructors', 'admin', 'GET', '/admin/instructors', None),
+        ('add instructor', 'admin', 'POST', '/admin/instructors',
+         lambda i: {'form': {'full_name': f'Bench Instructor {i}', 'email': f'bench{stamp}-{i}@university.edu',
+                             'department': 'IT', 'phone': '555', 'username': f'bench{stamp}-{i}',
+                             'password': 'password'}}),
+        ('edit instructor', 'admin', 'POST', f"/admin/instructors/{ctx['instructor_id']}/edit",
+         {'form': {'full_name': 'Bench Instructor', 'department': 'IT', 'phone': '555',
+                   'is_active': 'on'}}),
+        ('admin requests', 'admin', 'GET', '/admin/requests', None),
+        ('approve request', 'admin', 'GET', lambda i: f'/admin/approve_request/{next_pending()[0]}', None),
+        ('reject request', 'admin', 'GET', lambda i: f'/admin/reject_request/{next_pending()[0]}', None),
+        ('bulk approve 50', 'admin', 'POST', '/admin/requests/bulk',
+         lambda i: {'json': {'action': 'approve', 'ids': next_pending(50)}}),
+        ('timetable solve dry run', 'admin', 'POST', '/admin/timetable/solve',
+         {'json': {'term_start': f'{monday + timedelta(days=420):%Y-%m-%d}',
+                   'term_end': f'{monday + timedelta(days=520):%Y-%m-%d}', 'commit': False,
+                   'sections': [{'course_name': 'Benchmark', 'section': f'TT-{n}',
+                                 'instructor_id': ctx['instructor_id'], 'hours_per_week': 3}
+                                for n in range(10)]}}),
+
+        ('notifications page', 'instructor', 'GET', '/notifications', None),
+        ('api notifications', 'instructor', 'GET', '/api/notifications?limit=20', None),
+        ('mark notification read', 'instructor', 'GET',
+         lambda i: f'/notifications/mark_read/{notifications[i % len(notifications)]}', None),
+        ('mark all read', 'instructor', 'GET', '/notifications/mark_all_read', None),
+
+        ('reports page', 'admin', 'GET', '/reports', None),
+        ('report monthly usage', 'admin', 'GET', '/api/reports/monthly-usage', None),
+        ('report instructor usage', 'admin', 'GET', '/api/reports/instructor-usage', None),
+        ('report peak hours', 'admin', 'GET', '/api/reports/peak-hours', None),
+        ('report lab occupancy', 'admin', 'GET', '/api/reports/lab-occupancy', None),
+        ('report lab occupancy revalidated', 'admin', 'GET', '/api/reports/lab-occupancy',
+         {'revalidate': True}),
+        ('report lab occupancy year', 'admin', 'GET',
+         f'/api/reports/lab-occupancy?start={today - timedelta(days=365):%Y-%m-%d}&end={today:%Y-%m-%d}',
+         None),
+        ('report cache stats', 'admin', 'GET', '/api/reports/cache-stats', None),
+    ]
+
+
+def login(app, username):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': 'password'})
+    if response.status_code != 302:
+        raise RuntimeError(f'could not log in as {username}')
+    return client
+
+
+def run_case(app, clients, ctx, case, runs, warmup, counter, warm_cache):
+    from app.cache import report_cache
+
+    name, role, method, path, payload = case
+    samples, queries, sizes, statuses = [], [], [], {}
+    for i in range(warmup + runs):
+        if role == 'logout':
+            client = login(app, ctx['instructor'])
+        else:
+            client = clients[role]
+        url = path(i) if callable(path) else path
+        body = (payload(i) if callable(payload) else payload) or {}
+        if not warm_cache:
+            report_cache.clear()
+
+        headers = {'Accept-Encoding': 'gzip, br'}   # as a browser would
+        if body.get('revalidate'):
+            # A repeat poll: the client presents the ETag of its cached copy
+            headers['If-None-Match'] = client.get(url).headers.get('ETag', '')
+
+        counter[0] = 0
+        started = time.perf_counter()
+        response = client.open(url, method=method, data=body.get('form'), json=body.get('json'),
+                               headers=headers)
+        size = len(response.get_data())   # drain streamed responses inside the timing
+        elapsed = time.perf_counter() - started
+        response.close()
+
+        if role == 'anonymous':
+            clients['anonymous'] = app.test_client()
+        if i >= warmup:
+            samples.append(elapsed * 1000)
+            queries.append(counter[0])
+            sizes.append(size)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    ordered = sorted(samples)
+    result = {
+        'role': role if role != 'logout' else 'instructor',
+        'method': method,
+        'path': path if isinstance(path, str) else None,
+        'runs': runs,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'min_ms': round(ordered[0], 3),
+        'max_ms': round(ordered[-1], 3),
+        'queries': int(statistics.median(queries)),
+        'queries_max': max(queries),
+        'bytes': int(statistics.median(sizes)),
+    }
+    for pct in PERCENTILES:
+        result[f'p{pct}_ms'] = round(percentile(ordered, pct), 3)
+    return result
+
+
+def compare(previous, current, threshold):
+    """Print changes against an earlier run; return the number of regressions"""
+    regressions = 0
+    print(f"\n📈 Compared with {previous['meta'].get('revision') or 'previous run'} "
+          f"({previous['meta'].get('created_at')}):")
+    for name, result in current['endpoints'].items():
+        before = previous['endpoints'].get(name)
+        if not before:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1
+        slower = ratio > threshold and result['p50_ms'] - before['p50_ms'] > NOISE_FLOOR_MS
+        more_queries = result['queries'] > before['queries']
+        if slower or more_queries:
+            regressions += 1
+            print(f"   ❌ {name}: p50 {before['p50_ms']:.1f} → {result['p50_ms']:.1f} ms, "
+                  f"queries {before['queries']} → {result['queries']}")
+        elif ratio < 1 / threshold or result['queries'] < before['queries']:
+            print(f"   ✅ {name}: p50 {before['p50_ms']:.1f} → {result['p50_ms']:.1f} ms, "
+                  f"queries {before['queries']} → {result['queries']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--dataset', help='SQLite file produced by datagen.py (used on a copy)')
+    parser.add_argument('--labs', type=int, default=40)
+    parser.add_argument('--instructors', type=int, default=800)
+    parser.add_argument('--students', type=int, default=8000)
+    parser.add_argument('--reservations', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', help='run only cases whose name contains this text')
+    parser.add_argument('--warm-cache', action='store_true', help='keep report caches between requests')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/endpoints-<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='p50 ratio above which an endpoint counts as a regression')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    db_file = os.path.join(work_dir, 'suite.db')
+    if args.dataset:
+        shutil.copy(args.dataset, db_file)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+    from flask import has_request_context
+    from sqlalchemy import event
+    from config import config, DevelopmentConfig
+    from app import create_app, db
+    from app.conflicts import reservation_index
+    from app.passwords import password_hasher
+    from migrate_db import stamp
+    from datagen import generate
+
+    # No background threads: the job worker and notification relay would
+    # compete with the timed requests
+    config['suite'] = type('suite', (DevelopmentConfig,), {
+        'WTF_CSRF_ENABLED': False,
+        'PROPAGATE_EXCEPTIONS': False,   # record a 500 instead of aborting the run
+        'PASSWORD_HASH_WORKERS': 0,
+        'JOB_EMBEDDED_WORKER': False,
+        'NOTIFICATION_RELAY_INTERVAL': 0,
+    })
+    app = create_app('suite')
+
+    with app.app_context():
+        if args.dataset:
+            dataset = {'file': os.path.basename(args.dataset)}
+        else:
+            db.create_all()
+            stamp()
+            started = time.perf_counter()
+            with db.engine.begin() as conn:
+                dataset = generate(conn, labs=args.labs, instructors=args.instructors,
+                                   students=args.students, reservations=args.reservations,
+                                   seed=args.seed, password_hash=password_hasher.hash('password'),
+                                   progress=lambda line: print(f"   {line}"))
+            print(f"🏗️  Dataset generated in {time.perf_counter() - started:.0f} s")
+        reservation_index.warm()
+        ctx = pick_context(db)
+
+        counter = [0]
+
+        def count_statement(*_):
+            # Only statements issued while serving the timed request count
+            if has_request_context():
+                counter[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    clients = {'anonymous': app.test_client()}
+    for role in ('admin', 'instructor', 'student'):
+        clients[role] = login(app, ctx[role])
+
+    cases = [case for case in build_cases(ctx) if not args.only or args.only in case[0]]
+    print(f"⏱️  {len(cases)} endpoint(s), {args.runs} runs each after {args.warmup} warm-up run(s)\n")
+    print(f"   {'endpoint':32} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'bytes':>9}  status")
+
+    endpoints = {}
+    for case in cases:
+        result = run_case(app, clients, ctx, case, args.runs, args.warmup, counter, args.warm_cache)
+        endpoints[case[0]] = result
+        print(f"   {case[0]:32} {result['p50_ms']:7.1f}ms {result['p95_ms']:7.1f}ms "
+              f"{result['p99_ms']:7.1f}ms {result['queries']:8d} {result['bytes']:9,d}  "
+              f"{','.join(result['statuses'])}")
+
+    results = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': 'sqlite',
+            'warm_cache': args.warm_cache,
+            'runs': args.runs,
+            'dataset': dataset,
+        },
+        'endpoints': endpoints,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"endpoints-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    errors = [name for name, result in endpoints.items()
+              if any(code.startswith('5') for code in result['statuses'])]
+    if errors:
+        print(f"❌ Server errors from: {', '.join(errors)}")
+        sys.exit(1)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n❌ {regressions} endpoint(s) regressed.")
+            sys.exit(1)
+        print("\n✅ No regressions.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark: the background job queue.
+
+Generates a small synthetic dataset (see datagen.py) and checks that:
+  - approving, rejecting and bulk-deciding requests queue notification
+    jobs instead of inserting notifications, a repeated approval or a
+    repeated password reset request queues nothing new, and a request
+    rejected and then approved again notifies each decision;
+  - one worker pass delivers the queued notifications in batches;
+  - a failing job is retried with backoff while the rest of its batch
+    completes, and is parked as dead after its last attempt;
+  - /metrics reports queue depth and lag.
+
+Then times the worker draining --jobs notification jobs with batches of 1
+and of JOB_BATCH_SIZE. Exits non-zero when a check fails.
+
+Usage:
+    python benchmarks/job_queue.py [--jobs 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'jobs.db')}"
+
+    from datetime import datetime
+    from config import config, DevelopmentConfig
+    from app import create_app, db
+    from app.jobs import job_queue, job_handler
+    from app.models import Job, Notification, User
+    from app.passwords import password_hasher
+    from migrate_db import stamp
+    from datagen import generate
+    from endpoint_suite import pick_context, login
+
+    # This script is the worker; the relay is not under test
+    config['bench'] = type('bench', (DevelopmentConfig,), {
+        'WTF_CSRF_ENABLED': False,
+        'PASSWORD_HASH_WORKERS': 0,
+        'JOB_EMBEDDED_WORKER': False,
+        'NOTIFICATION_RELAY_INTERVAL': 0,
+    })
+    app = create_app('bench')
+
+    with app.app_context():
+        db.create_all()
+        stamp()
+        with db.engine.begin() as conn:
+            generate(conn, labs=10, instructors=50, students=300, reservations=3000,
+                     seed=args.seed, password_hash=password_hasher.hash('password'),
+                     progress=lambda line: None)
+        ctx = pick_context(db)
+
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} {label}")
+
+    def counts():
+        with app.app_context():
+            return Job.query.filter_by(status='queued').count(), Notification.query.count()
+
+    print("📬 Routes enqueue instead of running side effects")
+    admin = login(app, ctx['admin'])
+    first, second, third = ctx['pending'][:3]
+    jobs_before, notifications_before = counts()
+    admin.get(f'/admin/approve_request/{first}')
+    admin.get(f'/admin/approve_request/{first}')
+    admin.get(f'/admin/reject_request/{second}')
+    admin.post('/admin/requests/bulk', json={'action': 'approve', 'ids': [third]})
+    jobs_after, notifications_after = counts()
+    check(jobs_after - jobs_before == 3 and notifications_after == notifications_before,
+          f"3 decisions, one repeated: {jobs_after - jobs_before} job(s) queued, "
+          f"{notifications_after - notifications_before} notification(s) inserted inline")
+    admin.get(f'/admin/reject_request/{first}')
+    admin.get(f'/admin/approve_request/{first}')
+    redecided, _ = counts()
+    check(redecided - jobs_after == 2,
+          f"rejected, then approved again: {redecided - jobs_after} more job(s) queued")
+
+    with app.app_context():
+        email = User.query.filter_by(username=ctx['student']).one().email
+        admin_id = User.query.filter_by(username=ctx['admin']).one().id
+    anonymous = app.test_client()
+    for _ in range(2):
+        anonymous.post('/forgot-password', data={'email': email})
+    with app.app_context():
+        resets = Job.query.filter_by(kind='password_reset').count()
+    check(resets == 1, f"2 reset requests within the window: {resets} job(s) queued")
+
+    print("\n👷 Worker")
+    with app.app_context():
+        succeeded, failed = job_queue.run(once=True)
+        delivered = Notification.query.count() - notifications_before
+    check(succeeded == 6 and failed == 0 and delivered == 5,
+          f"one pass: {succeeded} done, {failed} failed, {delivered} notification(s) delivered")
+
+    @job_handler('flaky')
+    def flaky(payload):
+        if payload['n'] == 2:
+            raise RuntimeError('boom')
+
+    with app.app_context():
+        job_queue.max_attempts = 2
+        job_queue.enqueue_many('flaky', [(None, {'n': n}) for n in range(5)])
+        db.session.commit()
+        succeeded, failed = job_queue.run(once=True)
+        retry = Job.query.filter_by(kind='flaky', status='queued').one()
+        delay = (retry.run_at - datetime.utcnow()).total_seconds()
+        check(succeeded == 4 and failed == 1 and retry.attempts == 1 and
+              job_queue.retry_base_delay / 2 - 1 <= delay <= job_queue.retry_base_delay,
+              f"batch with one failing job: {succeeded} done, {failed} failed, "
+              f"retry in {delay:.1f}s")
+        Job.query.filter_by(id=retry.id).update({'run_at': datetime.utcnow()})
+        db.session.commit()
+        job_queue.run(once=True)
+        dead = db.session.get(Job, retry.id)
+        check(dead.status == 'dead' and dead.attempts == 2 and 'boom' in (dead.last_error or ''),
+              f"after the last attempt: {dead.status}, {dead.attempts} attempts, {dead.last_error!r}")
+        job_queue.max_attempts = app.config['JOB_MAX_ATTEMPTS']
+
+        job_queue.enqueue('notification', {'user_id': admin_id, 'title': 't', 'message': 'm'},
+                          delay=-30)
+        db.session.commit()
+    scrape = admin.get('/metrics').get_data(as_text=True)
+    depth = next((line for line in scrape.splitlines()
+                  if line.startswith('labsched_jobs{kind="notification",status="queued"}')), '')
+    lag = next((line for line in scrape.splitlines()
+                if line.startswith('labsched_job_lag_seconds{kind="notification"}')), '')
+    check(depth.endswith(' 1') and lag and float(lag.split()[-1]) >= 29,
+          f"/metrics: {depth or 'no depth gauge'}; {lag or 'no lag gauge'}")
+
+    print(f"\n⏱  Draining {args.jobs:,} notification jobs")
+    results = {}
+    with app.app_context():
+        job_queue.run(once=True)
+        users = [row[0] for row in db.session.query(User.id).limit(200)]
+        for batch_size in (1, app.config['JOB_BATCH_SIZE']):
+            job_queue.enqueue_many('notification', [
+                (f'bench:{batch_size}:{n}', {'user_id': users[n % len(users)], 'title': 'Bench',
+                                             'message': f'Job {n}'})
+                for n in range(args.jobs)])
+            db.session.commit()
+            started = time.perf_counter()
+            succeeded, failed = job_queue.run(batch_size=batch_size, once=True)
+            seconds = time.perf_counter() - started
+            results[batch_size] = seconds
+            print(f"   batches of {batch_size:3d}: {succeeded:,} done in {seconds:6.2f}s "
+                  f"({succeeded / seconds:8,.0f} jobs/s)")
+            failures += succeeded != args.jobs or failed != 0
+
+    if failures:
+        print(f"❌ {failures} check(s) failed.")
+        sys.exit(1)
+    batched = results[app.config['JOB_BATCH_SIZE']]
+    print(f"✅ Job queue checks passed; batching drains {results[1] / batched:.1f}x faster.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Load test: login throughput with password hashing inline vs on the pool.
+
+Starts the app on a threaded Werkzeug server against a throwaway SQLite
+database and fires N concurrent logins at /login, first with hashing on the
+request threads (PASSWORD_HASH_WORKERS = 0, unbounded) and then on the
+process pool with its in-flight limit. Meanwhile a probe keeps fetching the
+login page to show how a cheap request fares during the burst. Reports
+logins/s, latency percentiles and how many attempts were turned away with
+503 + Retry-After. Exits non-zero if a login fails for any other reason, or
+if the pool run saw no 503s although more clients than its in-flight limit
+(workers + queue limit) were logging in at once.
+
+Usage:
+    python benchmarks/login_load.py [--logins 64] [--concurrency 32] [--workers 2]
+"""
+
+import argparse
+import http.client
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def http_post_login(port, username, password):
+    """Return (status, seconds) for one login over a fresh connection"""
+    body = urlencode({'username': username, 'password': password})
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    conn.request('POST', '/login', body=body,
+                 headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    status = conn.getresponse().status
+    conn.close()
+    return status, time.perf_counter() - started
+
+
+def http_get(port, path):
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    conn.request('GET', path)
+    conn.getresponse().read()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def run_burst(port, users, logins, concurrency):
+    results = []
+    probes = []
+    lock = threading.Lock()
+    remaining = iter(range(logins))
+    done = threading.Event()
+
+    def client():
+        while True:
+            with lock:
+                n = next(remaining, None)
+            if n is None:
+                return
+            outcome = http_post_login(port, users[n % len(users)], 'loadtest')
+            with lock:
+                results.append(outcome)
+
+    def probe():
+        while not done.is_set():
+            probes.append(http_get(port, '/login'))
+            time.sleep(0.05)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+    return results, probes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=2, help='hashing pool size')
+    parser.add_argument('--queue-limit', type=int, default=8)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--users', type=int, default=16)
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+    from werkzeug.serving import make_server
+    from werkzeug.security import generate_password_hash
+    from app import create_app, db
+    from app.models import User
+    from app.passwords import password_hasher
+
+    app = create_app('development')
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['PASSWORD_HASH_METHOD'] = args.method
+    with app.app_context():
+        db.create_all()
+        pwhash = generate_password_hash('loadtest', method=args.method)
+        users = [f'load{i}' for i in range(args.users)]
+        db.session.add_all([User(username=name, email=f'{name}@test', user_type='instructor',
+                                 password_hash=pwhash) for name in users])
+        db.session.commit()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🔐 {args.logins} logins, {args.concurrency} concurrent clients, "
+          f"{args.method}, {os.cpu_count()} CPU(s)")
+
+    failures = 0
+    for label, workers, queue_limit in (
+        ('inline', 0, args.logins),
+        (f'pool x{args.workers}', args.workers, args.queue_limit),
+    ):
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        app.config['PASSWORD_HASH_QUEUE_LIMIT'] = queue_limit
+        password_hasher.init_app(app)
+        if workers:
+            password_hasher.verify(pwhash, 'warm-up')   # start the pool outside the timing
+
+        results, probes, elapsed = run_burst(port, users, args.logins, args.concurrency)
+        ok = [seconds for status, seconds in results if status == 302]
+        busy = sum(1 for status, _ in results if status == 503)
+        other = len(results) - len(ok) - busy
+        failures += other
+        if workers and args.concurrency > workers + queue_limit and not busy:
+            print(f"   ❌ {args.concurrency} concurrent clients over an in-flight limit of "
+                  f"{workers + queue_limit}, but no login was refused with 503")
+            failures += 1
+        print(f"   {label:8s} {len(ok) / elapsed:6.1f} logins/s  "
+              f"p50 {percentile(ok, 0.5) * 1000:6.0f} ms  p95 {percentile(ok, 0.95) * 1000:6.0f} ms  "
+              f"503s {busy:3d}  errors {other}  "
+              f"login page p95 {percentile(probes, 0.95) * 1000:5.0f} ms "
+              f"(median {statistics.median(probes or [0]) * 1000:.0f} ms)")
+        password_hasher.shutdown()
+
+    server.shutdown()
+    os.unlink(db_file)
+    if failures:
+        print(f"❌ {failures} check(s) failed.")
+        sys.exit(1)
+    if busy:
+        print("✅ Logins beyond the in-flight limit are refused with 503 instead of queueing.")
+    else:
+        print("✅ Every login succeeded; the in-flight limit was not reached.")
+
+
+if __name__ == '__main__':
+    main()
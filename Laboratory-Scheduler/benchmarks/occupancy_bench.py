@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lab occupancy heatmap over a year of reservations.
+
+Generates a year of reservations across every lab into a throwaway SQLite
+database, then times the NumPy computation alone and the full report
+(query + array conversion + computation). Exits non-zero if the full
+report takes a second or more.
+
+Usage:
+    python benchmarks/occupancy_bench.py [--labs 12] [--per-day 10] [--runs 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def timed(func, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return min(samples), statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--labs', type=int, default=12)
+    parser.add_argument('--per-day', type=int, default=10, help='reservations per lab per day')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+    from app import create_app, db
+    from app.models import User, Instructor, Laboratory, Reservation
+    from app.occupancy import lab_occupancy_report, load_reservation_arrays, occupancy_matrix
+
+    app = create_app('development')
+    rng = random.Random(args.seed)
+    range_start = datetime(2025, 1, 6)
+    range_end = range_start + timedelta(days=365)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@test', user_type='instructor', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        instructor = Instructor(user_id=user.id, full_name='Benchmark Instructor')
+        db.session.add(instructor)
+        db.session.add_all([Laboratory(name=f'Lab {i}', room_number=f'B-{i}', capacity=30)
+                            for i in range(args.labs)])
+        db.session.commit()
+        lab_ids = [lab.id for lab in Laboratory.query.order_by(Laboratory.id)]
+
+        rows = []
+        for day in range(365):
+            for lab_id in lab_ids:
+                for _ in range(args.per_day):
+                    start = range_start + timedelta(days=day, hours=rng.randint(7, 19),
+                                                    minutes=rng.choice((0, 30)))
+                    rows.append({
+                        'instructor_id': instructor.id, 'lab_id': lab_id,
+                        'course_name': 'Benchmark', 'section': 'B-1',
+                        'start_time': start,
+                        'end_time': start + timedelta(minutes=rng.choice((60, 90, 120, 180, 240))),
+                        'status': rng.choice(('approved', 'approved', 'completed', 'pending'))
+                    })
+        db.session.execute(Reservation.__table__.insert(), rows)
+        db.session.commit()
+        print(f"📊 {len(rows):,} reservations across {args.labs} labs over 365 days")
+
+        lab_idx, starts, ends = load_reservation_arrays(range_start, range_end, lab_ids)
+        n_hours = 365 * 24
+        best, median = timed(lambda: occupancy_matrix(lab_idx, starts, ends, len(lab_ids),
+                                                      n_hours, range_start.weekday()), args.runs)
+        print(f"   NumPy computation ({len(starts):,} intervals): "
+              f"best {best * 1000:.1f} ms, median {median * 1000:.1f} ms")
+
+        best, median = timed(lambda: lab_occupancy_report(range_start, range_end), args.runs)
+        print(f"   Full report incl. query:            "
+              f"best {best * 1000:.1f} ms, median {median * 1000:.1f} ms")
+
+    os.unlink(db_file)
+    if median >= 1.0:
+        print("❌ Report is slower than one second.")
+        sys.exit(1)
+    print("✅ Report completes in well under a second.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Check: SQL query budget of the dashboard, per role.
+
+Generates a small synthetic dataset (see datagen.py), logs in as an admin,
+an instructor and a student, and counts the SQL statements each dashboard
+render issues. Each role is checked with its counters cache cold and then
+warm. The script also checks that approving a request refreshes the admin's
+pending counter at once. Exits non-zero when a render exceeds its budget or
+shows a stale counter, so it can run unattended next to
+`python migrate_db.py check-plans`.
+
+Usage:
+    python benchmarks/query_budget.py [--reservations 5000]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Statements per dashboard render, counters cache cold / warm. The identity
+# comes from the user cache; the navbar and the page bodies load the rest.
+DASHBOARD_BUDGETS = {
+    'admin': (3, 2),         # counters, recent reservations, navbar notifications
+    'instructor': (3, 2),    # counters, upcoming sessions, navbar notifications
+    'student': (3, 3),       # today's sessions, navbar and page notifications
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--reservations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'budget.db')}"
+
+    from flask import has_request_context
+    from sqlalchemy import event
+    from config import config, DevelopmentConfig
+    from app import create_app, db
+    from app.dashboard import dashboard_cache
+    from app.models import Reservation
+    from app.passwords import password_hasher
+    from migrate_db import stamp
+    from datagen import generate
+    from endpoint_suite import pick_context, login
+
+    # No background threads; only statements issued by a request are counted
+    config['budget'] = type('budget', (DevelopmentConfig,), {
+        'WTF_CSRF_ENABLED': False,
+        'PASSWORD_HASH_WORKERS': 0,
+        'JOB_EMBEDDED_WORKER': False,
+        'NOTIFICATION_RELAY_INTERVAL': 0,
+    })
+    app = create_app('budget')
+
+    with app.app_context():
+        db.create_all()
+        stamp()
+        with db.engine.begin() as conn:
+            generate(conn, labs=10, instructors=50, students=300, reservations=args.reservations,
+                     seed=args.seed, password_hash=password_hasher.hash('password'),
+                     progress=lambda line: None)
+        ctx = pick_context(db)
+
+        counter = [0]
+
+        def count_statement(*_):
+            if has_request_context():
+                counter[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    failures = 0
+    print(f"🧮 Dashboard query budget ({args.reservations:,} reservations)")
+    for role, budgets in DASHBOARD_BUDGETS.items():
+        client = login(app, ctx[role])
+        client.get('/api/check-auth')   # the identity is cached from here on
+        dashboard_cache.clear()
+        for label, budget in zip(('cold', 'warm'), budgets):
+            counter[0] = 0
+            status = client.get('/dashboard').status_code
+            ok = status == 200 and counter[0] <= budget
+            failures += not ok
+            print(f"   {'✅' if ok else '❌'} {role:10s} {label}  {counter[0]} queries "
+                  f"(budget {budget}){'' if status == 200 else f', status {status}'}")
+
+    # A write in this process must not leave the cached counters behind
+    admin = login(app, ctx['admin'])
+    admin.get('/dashboard')
+    with app.app_context():
+        pending = Reservation.query.filter_by(status='pending').count()
+    admin.get(f"/admin/approve_request/{ctx['pending'][0]}")
+    page = admin.get('/dashboard').get_data(as_text=True)
+    shown = re.search(r'Pending Requests\s*</div>\s*<div[^>]*>(\d+)</div>', page)
+    fresh = shown is not None and int(shown.group(1)) == pending - 1
+    failures += not fresh
+    print(f"   {'✅' if fresh else '❌'} pending counter after an approval: "
+          f"{shown.group(1) if shown else '?'} (expected {pending - 1})")
+
+    if failures:
+        print(f"❌ {failures} check(s) failed.")
+        sys.exit(1)
+    print("✅ Every dashboard render stays within its query budget.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite read/write concurrency with and without the engine profile.
+
+Runs the same mixed workload twice against fresh on-disk SQLite databases,
+first with SQLite's defaults (rollback journal, synchronous=FULL) and then
+with Config.SQLITE_PRAGMAS (WAL, synchronous=NORMAL, busy_timeout, mmap,
+cache). Writer threads book approved reservations through the ORM (so the
+rollup and data-version hooks run) while reader threads list and count
+reservations. Reports throughput, latency percentiles and "database is
+locked" failures. Exits non-zero if the tuned profile fails any operation.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py [--writers 8] [--readers 16] [--seconds 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_profile(name, pragmas, args):
+    from sqlalchemy.exc import OperationalError
+    from config import config, DevelopmentConfig
+    from app import create_app, db
+    from app.models import User, Instructor, Laboratory, Reservation
+
+    db_dir = tempfile.mkdtemp()
+    config[name] = type(name, (DevelopmentConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(db_dir, "bench.db")}',
+        'SQLITE_PRAGMAS': pragmas,
+    })
+    app = create_app(name)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@test', user_type='instructor', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        instructor = Instructor(user_id=user.id, full_name='Benchmark Instructor')
+        db.session.add(instructor)
+        db.session.add_all([Laboratory(name=f'Lab {i}', room_number=f'B-{i}', capacity=30)
+                            for i in range(8)])
+        db.session.commit()
+        instructor_id = instructor.id
+        lab_ids = [lab.id for lab in Laboratory.query]
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    writes, reads, errors = [], [], []
+
+    def writer(n):
+        start = datetime(2030, 1, 7, 8) + timedelta(days=n * 400)
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    for _ in range(args.batch):
+                        db.session.add(Reservation(
+                            instructor_id=instructor_id, lab_id=lab_ids[len(writes) % len(lab_ids)],
+                            course_name='Benchmark', section='B-1', status='approved',
+                            start_time=start, end_time=start + timedelta(hours=2)
+                        ))
+                        start += timedelta(hours=3)
+                    db.session.commit()
+                    with lock:
+                        writes.append(time.perf_counter() - started)
+                except OperationalError as exc:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(str(exc.orig))
+
+    def reader():
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    Reservation.query.filter_by(status='approved').count()
+                    Reservation.query.order_by(Reservation.created_at.desc()).limit(20).all()
+                    db.session.rollback()   # end the read transaction, as a request would
+                    with lock:
+                        reads.append(time.perf_counter() - started)
+                except OperationalError as exc:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(str(exc.orig))
+
+    threads = ([threading.Thread(target=writer, args=(n,)) for n in range(args.writers)] +
+               [threading.Thread(target=reader) for _ in range(args.readers)])
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+    for filename in os.listdir(db_dir):
+        os.unlink(os.path.join(db_dir, filename))
+    os.rmdir(db_dir)
+
+    locked = sum(1 for message in errors if 'locked' in message)
+    print(f"   {name:8s} writes {len(writes) / args.seconds:6.1f}/s "
+          f"(p50 {percentile(writes, 0.5) * 1000:5.0f} ms, p95 {percentile(writes, 0.95) * 1000:5.0f} ms)  "
+          f"reads {len(reads) / args.seconds:6.1f}/s "
+          f"(p50 {percentile(reads, 0.5) * 1000:5.1f} ms, p95 {percentile(reads, 0.95) * 1000:5.0f} ms)  "
+          f"errors {len(errors)} ({locked} locked)")
+    return len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--batch', type=int, default=20, help='reservations per write transaction')
+    parser.add_argument('--seconds', type=float, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from config import Config
+
+    print(f"🗄️  {args.writers} writers x {args.batch} reservations/commit, "
+          f"{args.readers} readers, {args.seconds:g} s per profile")
+    run_profile('defaults', {}, args)
+    failures = run_profile('tuned', Config.SQLITE_PRAGMAS, args)
+
+    if failures:
+        print(f"❌ {failures} operation(s) failed with the tuned profile.")
+        sys.exit(1)
+    print("✅ Readers and writers share the tuned SQLite database without lock errors.")
+
+
+if __name__ == '__main__':
+    main()
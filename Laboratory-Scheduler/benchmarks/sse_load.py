@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Load test: how many idle notification streams one worker process can hold.
+
+Starts the app on a threaded Werkzeug server against a throwaway SQLite
+database, opens N concurrent /api/notifications/stream connections, then
+publishes one notification and measures how long the fan-out takes to reach
+every stream. Finally closes the sockets and checks the broker releases
+every slot.
+
+Usage:
+    python benchmarks/sse_load.py [--connections 1000] [--max-streams 2000]
+"""
+
+import argparse
+import logging
+import os
+import resource
+import selectors
+import socket
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+USER_AGENT = 'sse-load-test'
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def http_login(port, username, password):
+    """Log in over real HTTP and return the session cookie"""
+    body = urlencode({'username': username, 'password': password})
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall((
+        f"POST /login HTTP/1.1\r\nHost: localhost\r\nUser-Agent: {USER_AGENT}\r\n"
+        f"Content-Type: application/x-www-form-urlencoded\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}"
+    ).encode())
+    response = b''
+    while chunk := sock.recv(4096):
+        response += chunk
+    sock.close()
+    for line in response.decode(errors='replace').split('\r\n'):
+        if line.lower().startswith('set-cookie: session='):
+            return line.split(': ', 1)[1].split(';', 1)[0]
+    raise RuntimeError('login failed')
+
+
+def open_stream(port, cookie):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall((
+        f"GET /api/notifications/stream HTTP/1.1\r\nHost: localhost\r\n"
+        f"User-Agent: {USER_AGENT}\r\nCookie: {cookie}\r\nAccept: text/event-stream\r\n\r\n"
+    ).encode())
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--max-streams', type=int, default=2000)
+    parser.add_argument('--heartbeat', type=int, default=2)
+    args = parser.parse_args()
+
+    fd_limit = raise_fd_limit()
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    os.environ['NOTIFICATION_STREAM_MAX_CONNECTIONS'] = str(args.max_streams)
+    os.environ['NOTIFICATION_RELAY_INTERVAL'] = '0'   # time the broker, not the relay's poll
+
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.models import User
+    from app.notifications import notification_broker, create_notification
+
+    app = create_app('development')
+    app.config['WTF_CSRF_ENABLED'] = False
+    notification_broker.heartbeat = args.heartbeat
+    with app.app_context():
+        db.create_all()
+        user = User(username='loadtest', email='load@test', user_type='instructor')
+        user.set_password('loadtest')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cookie = http_login(port, 'loadtest', 'loadtest')
+    print(f"🔌 Opening {args.connections} streams (fd limit {fd_limit}, cap {args.max_streams})...")
+    base_threads = threading.active_count()
+    base_rss = rss_mb()
+
+    selector = selectors.DefaultSelector()
+    sockets = []
+    started = time.perf_counter()
+    for _ in range(args.connections):
+        sock = open_stream(port, cookie)
+        sockets.append(sock)
+        selector.register(sock, selectors.EVENT_READ)
+
+    # Wait until every connection has either been accepted or refused
+    status = {}
+    deadline = time.time() + 60
+    while len(status) < len(sockets) and time.time() < deadline:
+        for key, _ in selector.select(timeout=1):
+            data = key.fileobj.recv(4096)
+            if key.fileobj not in status:
+                status[key.fileobj] = data.split(b' ', 2)[1] if data else b'closed'
+    open_time = time.perf_counter() - started
+
+    accepted = [s for s, code in status.items() if code == b'200']
+    refused = sum(1 for code in status.values() if code == b'503')
+    print(f"✅ {len(accepted)} streams accepted, {refused} refused with 503 in {open_time:.2f}s")
+    print(f"   broker streams:   {notification_broker.stream_count}")
+    print(f"   server threads:   {threading.active_count() - base_threads}")
+    print(f"   peak RSS:         {rss_mb():.1f} MB (+{rss_mb() - base_rss:.1f} MB)")
+
+    # Idle period: only heartbeats flow, no database work
+    time.sleep(args.heartbeat * 2)
+    for sock in accepted:
+        try:
+            while sock.recv(65536, socket.MSG_DONTWAIT):
+                pass
+        except BlockingIOError:
+            pass
+
+    # Fan-out latency for one new notification
+    with app.app_context():
+        create_notification(user_id, 'Load test', 'Fan-out latency probe')
+        published = time.perf_counter()
+        db.session.commit()
+    pending = set(accepted)
+    while pending and time.perf_counter() - published < 30:
+        for key, _ in selector.select(timeout=1):
+            if key.fileobj in pending and b'new_notification' in key.fileobj.recv(65536):
+                pending.discard(key.fileobj)
+    fan_out = time.perf_counter() - published
+    print(f"📣 Notification reached {len(accepted) - len(pending)}/{len(accepted)} streams in {fan_out * 1000:.1f} ms")
+
+    # Clean disconnect: every slot must be released after the next heartbeat
+    for sock in sockets:
+        selector.unregister(sock)
+        sock.close()
+    deadline = time.time() + args.heartbeat * 3 + 5
+    while notification_broker.stream_count and time.time() < deadline:
+        time.sleep(0.2)
+    print(f"🔚 Streams still registered after disconnect: {notification_broker.stream_count}")
+
+    server.shutdown()
+    os.unlink(db_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark: template compilation and rendering costs.
+
+First request of a new worker: starts fresh Python processes that build the
+app and time their first GET /login and, after logging in, their first GET
+/dashboard as admin. Runs without the bytecode cache, with an empty cache
+directory (the worker compiles and writes it) and with a warm one (the
+worker loads compiled code instead of compiling).
+
+Steady state: renders dashboard/admin.html repeatedly in one process with
+the fragment cache off and on, using the same context the route passes.
+
+Exits non-zero if the warm bytecode cache does not beat compiling.
+
+Usage:
+    python benchmarks/template_render.py [--runs 5] [--renders 2000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+
+def make_app(**overrides):
+    from config import config, DevelopmentConfig
+    from app import create_app
+    config['bench'] = type('bench', (DevelopmentConfig,), {
+        'DEBUG': False,
+        'WTF_CSRF_ENABLED': False,
+        'PASSWORD_HASH_WORKERS': 0,
+        'TEMPLATE_FRAGMENT_CACHE': True,
+        **overrides
+    })
+    return create_app('bench')
+
+
+def seed(app):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import User, Instructor, Laboratory, Reservation
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@university.edu', user_type='admin',
+                     password_hash=generate_password_hash('admin123', 'pbkdf2:sha256:1000'))
+        user = User(username='inst1', email='inst1@university.edu', user_type='instructor',
+                    password_hash='x')
+        db.session.add_all([admin, user])
+        db.session.flush()
+        instructor = Instructor(user_id=user.id, full_name='Bench Instructor')
+        lab = Laboratory(name='Lab 1', room_number='A-1', capacity=30)
+        db.session.add_all([instructor, lab])
+        db.session.flush()
+        start = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        db.session.add_all([Reservation(instructor_id=instructor.id, lab_id=lab.id,
+                                        course_name=f'Course {n}', section='S-1',
+                                        status='approved' if n % 2 else 'pending',
+                                        start_time=start + timedelta(days=n),
+                                        end_time=start + timedelta(days=n, hours=2))
+                            for n in range(20)])
+        db.session.commit()
+
+
+def first_request():
+    """Child process: time this worker's first requests and print them as JSON"""
+    started = time.perf_counter()
+    cache_dir = os.environ.get('BENCH_BYTECODE_DIR')
+    app = make_app(TEMPLATE_BYTECODE_CACHE=bool(cache_dir), TEMPLATE_BYTECODE_CACHE_DIR=cache_dir)
+    client = app.test_client()
+    booted = time.perf_counter()
+    assert client.get('/login').status_code == 200
+    login_page = time.perf_counter()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    logged_in = time.perf_counter()
+    assert client.get('/dashboard').status_code == 200
+    dashboard = time.perf_counter()
+    print(json.dumps({'boot': booted - started, 'login_page': login_page - booted,
+                      'dashboard': dashboard - logged_in}))
+
+
+def run_children(label, runs, cache_dir=None, fresh=False):
+    samples = {'boot': [], 'login_page': [], 'dashboard': []}
+    for _ in range(runs):
+        env = dict(os.environ)
+        if cache_dir:
+            if fresh:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            env['BENCH_BYTECODE_DIR'] = cache_dir
+        else:
+            env.pop('BENCH_BYTECODE_DIR', None)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--first-request'],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples[key].append(value)
+    result = {key: statistics.median(values) * 1000 for key, values in samples.items()}
+    print(f"   {label:22s} app boot {result['boot']:6.1f} ms   first /login {result['login_page']:6.1f} ms"
+          f"   first /dashboard {result['dashboard']:6.1f} ms")
+    return result
+
+
+def steady_state(renders):
+    from flask import render_template
+    from flask_login import login_user
+    from app.models import User, Laboratory, Reservation
+    from app.fragments import fragment_cache
+
+    app = make_app(TEMPLATE_BYTECODE_CACHE=False)
+    with app.test_request_context('/dashboard'):
+        login_user(User.query.filter_by(username='admin').first())
+        context = {
+            'total_labs': Laboratory.query.filter_by(is_active=True).count(),
+            'total_sessions': Reservation.query.filter_by(status='approved').count(),
+            'pending_requests': Reservation.query.filter_by(status='pending').count(),
+            'recent_reservations': Reservation.query.order_by(
+                Reservation.created_at.desc()).limit(5).all(),
+        }
+        for enabled in (False, True):
+            fragment_cache.enabled = enabled
+            fragment_cache.clear()
+            for _ in range(50):
+                render_template('dashboard/admin.html', **context)
+            timings = []
+            for _ in range(renders):
+                started = time.perf_counter()
+                render_template('dashboard/admin.html', **context)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f"   fragment cache {'on ' if enabled else 'off'}     "
+                  f"p50 {timings[len(timings) // 2] * 1000:6.3f} ms   "
+                  f"p95 {timings[int(len(timings) * 0.95)] * 1000:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per mode')
+    parser.add_argument('--renders', type=int, default=2000)
+    parser.add_argument('--first-request', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.first_request:
+        first_request()
+        return
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    seed(make_app(TEMPLATE_BYTECODE_CACHE=False))
+    cache_dir = os.path.join(workdir, 'jinja_cache')
+
+    print(f"🧩 First request of a new worker (median of {args.runs} processes)")
+    compiled = run_children('no bytecode cache', args.runs)
+    run_children('empty bytecode cache', args.runs, cache_dir, fresh=True)
+    warm = run_children('warm bytecode cache', args.runs, cache_dir)
+
+    print(f"\n🖼️  Steady-state render of dashboard/admin.html ({args.renders} renders)")
+    steady_state(args.renders)
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    first = compiled['login_page'] + compiled['dashboard']
+    cached = warm['login_page'] + warm['dashboard']
+    if cached >= first:
+        print("❌ The warm bytecode cache did not speed up the first requests.")
+        sys.exit(1)
+    print(f"✅ Warm bytecode cache: first requests {first:.1f} → {cached:.1f} ms.")
+
+
+if __name__ == '__main__':
+    main()
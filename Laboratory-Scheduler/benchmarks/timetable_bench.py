@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark: timetable solver on a realistic term.
+
+Seeds a throwaway SQLite database with labs of mixed capacity, instructors
+and some approved reservations, generates a term's demand, then times the
+solver in-process and (optionally) with several worker processes. Every
+result is checked for lab, instructor and existing-reservation conflicts.
+Exits non-zero on a conflict or if the single-process run misses its budget.
+
+Usage:
+    python benchmarks/timetable_bench.py [--sections 160] [--labs 12] [--workers 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def make_demand(rng, n_sections, instructor_ids):
+    demand = []
+    for i in range(n_sections):
+        hours = rng.choice((2, 3, 3, 4, 6))
+        windows = []
+        if rng.random() < 0.7:
+            for day in rng.sample(('mon', 'tue', 'wed', 'thu', 'fri'), 3):
+                start = rng.choice((8, 10, 13))
+                windows.append({'day': day, 'start': f'{start:02d}:00', 'end': f'{start + 5:02d}:00'})
+        demand.append({
+            'course_name': f'Course {i // 3}',
+            'section': f'S-{i}',
+            'instructor_id': rng.choice(instructor_ids),
+            'hours_per_week': hours,
+            'session_hours': 3 if hours in (3, 6) else 2,
+            'capacity': rng.choice((20, 25, 30, 30, 35, 40)),
+            'windows': windows,
+        })
+    return demand
+
+
+def verify(problem, placement, existing):
+    """Return a list of violated constraints in ``placement``"""
+    errors = []
+    lab_hours, instructor_hours, section_days = {}, {}, set()
+    for session, option in enumerate(placement):
+        if option is None:
+            continue
+        section_idx, length = problem['sessions'][session]
+        section = problem['sections'][section_idx]
+        _, lab_pos, weekday, start = option
+        lab_id, _, capacity = problem['labs'][lab_pos]
+        if capacity < section.capacity:
+            errors.append(f'{section.section}: lab too small')
+        if (section_idx, weekday) in section_days:
+            errors.append(f'{section.section}: two sessions on one day')
+        section_days.add((section_idx, weekday))
+        for hour in range(start, start + length):
+            for key, table in (((lab_id, weekday, hour), lab_hours),
+                               ((section.instructor_id, weekday, hour), instructor_hours)):
+                if key in table:
+                    errors.append(f'{section.section}: double booked at {key}')
+                table[key] = session
+        for day in problem['weeks'][weekday]:
+            begins = datetime.combine(day, datetime.min.time()) + timedelta(hours=start)
+            ends = begins + timedelta(hours=length)
+            for other_lab, other_instructor, other_start, other_end in existing:
+                if (other_lab == lab_id or other_instructor == section.instructor_id) \
+                        and other_start < ends and other_end > begins:
+                    errors.append(f'{section.section}: conflicts with an approved reservation')
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sections', type=int, default=160)
+    parser.add_argument('--labs', type=int, default=12)
+    parser.add_argument('--instructors', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=4, help='0 skips the multi-process run')
+    parser.add_argument('--time-limit', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+
+    from app import create_app, db
+    from app.models import User, Instructor, Laboratory, Reservation
+    from app.timetable import LAB_HOURS, parse_demand, build_problem, solve, describe
+
+    app = create_app('development')
+    rng = random.Random(args.seed)
+    term_start, term_end = date(2025, 8, 11), date(2025, 12, 12)
+
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'bench{i}', email=f'bench{i}@test', user_type='instructor',
+                      password_hash='x') for i in range(args.instructors)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all([Instructor(user_id=user.id, full_name=f'Instructor {i}')
+                            for i, user in enumerate(users)])
+        db.session.add_all([Laboratory(name=f'Lab {i}', room_number=f'B-{i}',
+                                       capacity=(30, 35, 40, 45)[i % 4])
+                            for i in range(args.labs)])
+        db.session.commit()
+        instructor_ids = [row.id for row in Instructor.query]
+        lab_ids = [lab.id for lab in Laboratory.query]
+
+        # Some weekly approved bookings that the solver must work around
+        existing = []
+        for _ in range(args.labs * 3):
+            day = term_start + timedelta(days=rng.randint(0, 4))
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(8, 15))
+            lab_id, instructor_id = rng.choice(lab_ids), rng.choice(instructor_ids)
+            while start.date() <= term_end:
+                existing.append((lab_id, instructor_id, start, start + timedelta(hours=2)))
+                start += timedelta(weeks=1)
+        db.session.execute(Reservation.__table__.insert(), [{
+            'instructor_id': instructor_id, 'lab_id': lab_id, 'course_name': 'Existing',
+            'section': 'E-1', 'start_time': start, 'end_time': end, 'status': 'approved'
+        } for lab_id, instructor_id, start, end in existing])
+        db.session.commit()
+
+        sections = parse_demand(make_demand(rng, args.sections, instructor_ids))
+        started = time.perf_counter()
+        problem = build_problem(sections, term_start, term_end)
+        setup = time.perf_counter() - started
+        hours = sum(section.hours_per_week for section in sections)
+        blocked = {(lab_id, start.weekday(), hour) for lab_id, _, start, end in existing
+                   for hour in range(start.hour, end.hour)}
+        open_hours = len(problem['labs']) * sum(close - open_ for open_, close in LAB_HOURS.values())
+        print(f"🧩 {len(sections)} sections / {len(problem['sessions'])} weekly sessions "
+              f"in {len(problem['labs'])} labs: {hours} h requested, "
+              f"{open_hours - len(blocked)} of {open_hours} weekly lab-hours free")
+        print(f"   Problem setup: {setup * 1000:.0f} ms")
+
+        failed = False
+        runs = [('1 process', 1)] + ([(f'{args.workers} processes', args.workers)] if args.workers > 1 else [])
+        for label, workers in runs:
+            started = time.perf_counter()
+            placement = solve(problem, time_limit=args.time_limit, workers=workers)
+            elapsed = time.perf_counter() - started
+            assigned, unassigned = describe(problem, placement)
+            errors = verify(problem, placement, existing)
+            outside = sum(1 for entry in assigned if not entry['preferred'])
+            print(f"   {label:12} {elapsed:6.2f} s  placed {len(assigned)}/{len(placement)}, "
+                  f"{outside} outside preferred windows, {len(errors)} violation(s)")
+            failed = failed or bool(errors)
+            if workers == 1 and elapsed > args.time_limit + 2:
+                print("❌ Single-process solve overran its time limit.")
+                failed = True
+
+    os.unlink(db_file)
+    if failed:
+        print("❌ Solver produced an invalid timetable.")
+        sys.exit(1)
+    print("✅ Every assignment is conflict-free.")
+
+
+if __name__ == '__main__':
+    main()
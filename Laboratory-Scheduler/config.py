@@ -6,6 +6,27 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///it_lab_system.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Database engine profiles, picked in create_app by the URL scheme.
+    # SQLite: WAL lets readers carry on while a write commits, and
+    # busy_timeout makes writers queue for the lock instead of failing
+    # with "database is locked". Set to {} to keep SQLite's defaults.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # durable at checkpoints; safe with WAL
+        'busy_timeout': 10000,  # ms
+        'mmap_size': 256 * 1024 * 1024,  # bytes
+        'cache_size': -64000,  # negative = KiB, i.e. 64 MB per connection
+    }
+    # Server databases (PostgreSQL): connection pool per worker process.
+    # Keys set in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    SERVER_DB_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,  # seconds to wait for a free connection
+        'pool_pre_ping': True,  # drop connections the server closed
+        'pool_recycle': 1800,  # seconds, below typical proxy idle limits
+    }
+    
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
@@ -17,6 +38,76 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # Notification stream (Server-Sent Events) settings, per worker process
+    NOTIFICATION_STREAM_MAX_CONNECTIONS = int(os.environ.get('NOTIFICATION_STREAM_MAX_CONNECTIONS', 500))
+    NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds
+    # Each process polls for notifications committed elsewhere (by the job
+    # worker) at this interval, 0 disables; see app.notifications
+    NOTIFICATION_RELAY_INTERVAL = float(os.environ.get('NOTIFICATION_RELAY_INTERVAL', 2))  # seconds
+    
+    # Report cache (per worker process; invalidated through the data_version table)
+    REPORT_CACHE_TTL = 300  # seconds, 0 disables the cache
+    REPORT_CACHE_MAX_ENTRIES = 256
+    
+    # Dashboard counters (per worker process; cleared by local writes, other
+    # workers see a change once their entry expires)
+    DASHBOARD_CACHE_TTL = 5  # seconds, 0 disables the cache
+    DASHBOARD_CACHE_MAX_ENTRIES = 1024
+    
+    # Authenticated user cache for the login user loader (per worker process)
+    USER_CACHE_TTL = 300  # seconds, 0 disables the cache
+    USER_CACHE_MAX_ENTRIES = 1024
+    
+    # Password hashing (app.passwords). Hashes made with another method or
+    # cost are upgraded on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline
+    PASSWORD_HASH_QUEUE_LIMIT = 32  # waiting hashes per worker process before 503
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+    PASSWORD_HASH_RETRY_AFTER = 2  # seconds
+    
+    # Templates. Compiled templates are kept on disk (default:
+    # <instance>/jinja_cache) so new worker processes skip compilation; a
+    # changed template is recompiled because entries carry its checksum.
+    # The fragment cache ({% cache %} in templates) holds shared markup
+    # such as the navbar and sidebar menus per worker process.
+    TEMPLATE_BYTECODE_CACHE = True
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    TEMPLATE_FRAGMENT_CACHE = True
+    TEMPLATE_FRAGMENT_CACHE_MAX_ENTRIES = 256
+    
+    # Serve the fingerprinted, precompressed assets written by
+    # "python manage.py build-assets" when static/dist/manifest.json exists
+    STATIC_ASSET_MANIFEST = True
+    
+    # Compression of JSON responses for clients that accept gzip or br
+    COMPRESS_RESPONSES = True
+    COMPRESS_MIN_SIZE = 1024  # bytes
+    COMPRESS_LEVEL = 6  # gzip
+    COMPRESS_MIMETYPES = ('application/json',)
+    
+    # Request metrics served on /metrics (per worker process). Scrapers
+    # authenticate with "Authorization: Bearer <METRICS_TOKEN>"; admins
+    # can open the page from a logged-in session.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Background jobs (app.jobs), run by "python manage.py run-worker". The
+    # embedded worker is a thread in each web process instead, for
+    # development without a separate worker.
+    JOB_EMBEDDED_WORKER = os.environ.get('JOB_EMBEDDED_WORKER', 'False').lower() == 'true'
+    JOB_BATCH_SIZE = 50  # jobs claimed and committed together
+    JOB_POLL_INTERVAL = 1.0  # seconds between polls of an empty queue
+    JOB_MAX_ATTEMPTS = 5  # then the job is parked as dead
+    JOB_RETRY_BASE_DELAY = 10  # seconds, doubled after every failed attempt
+    JOB_RETRY_MAX_DELAY = 3600  # seconds
+    JOB_LEASE_SECONDS = 300  # a running job is offered again after this long
+    JOB_RETENTION_DAYS = 7  # done jobs, and so their idempotency keys, are kept this long
+    
+    # Timetable solver run from the admin endpoint (always in-process)
+    TIMETABLE_TIME_LIMIT = 10  # seconds
+    
     # Application settings
     IT_LAB_SYSTEM_NAME = "IT Laboratory Utilization Schedule System"
     IT_LAB_SYSTEM_VERSION = "1.0.0"
@@ -25,6 +116,9 @@ class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
     SQLALCHEMY_ECHO = False  # Set to True for SQL query logging
+    TEMPLATE_FRAGMENT_CACHE = False  # show template edits without a restart
+    STATIC_ASSET_MANIFEST = False  # serve static/ as edited
+    JOB_EMBEDDED_WORKER = True  # no separate worker process needed
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -34,12 +128,34 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SECURE = True
     REMEMBER_COOKIE_SECURE = True
     REMEMBER_COOKIE_HTTPONLY = True
+    
+    # Pre-fork server for `FLASK_ENV=production python run.py` (gunicorn).
+    # Bind address comes from FLASK_HOST / FLASK_PORT as in development.
+    SERVER_WORKERS = int(os.environ.get('WEB_CONCURRENCY', (os.cpu_count() or 1) * 2 + 1))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))  # per worker
+    SERVER_TIMEOUT = 60  # seconds before a silent worker is restarted
+    SERVER_GRACEFUL_TIMEOUT = 30  # seconds to finish requests on reload/stop
+    SERVER_KEEPALIVE = 5  # seconds
+    SERVER_MAX_REQUESTS = 5000  # recycle workers to bound memory growth, 0 disables
+    # Preloading shares the app's memory between workers, but then SIGHUP
+    # can no longer pick up new code
+    SERVER_PRELOAD = os.environ.get('SERVER_PRELOAD', 'False').lower() == 'true'
+    
+    # Static files are served ahead of the app with this browser cache lifetime
+    SEND_FILE_MAX_AGE_DEFAULT = 3600  # seconds
+    
+    # Every open notification stream holds a worker thread; keep half of them
+    # for ordinary requests (clients fall back to polling when refused)
+    NOTIFICATION_STREAM_MAX_CONNECTIONS = max(1, min(Config.NOTIFICATION_STREAM_MAX_CONNECTIONS,
+                                                     SERVER_THREADS // 2))
 
 class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_WORKERS = 0
+    NOTIFICATION_RELAY_INTERVAL = 0  # each connection has its own in-memory database
 
 # Configuration dictionary
 config = {
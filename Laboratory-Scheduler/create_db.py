@@ -7,6 +7,7 @@ import os
 import sys
 from app import create_app, db
 from app.models import User, Instructor, Student, Laboratory, Reservation, Notification
+from migrate_db import stamp
 
 def create_database():
     """Create database tables and sample data"""
@@ -21,6 +22,7 @@ def create_database():
             # Create all tables
             print("📁 Creating database tables...")
             db.create_all()
+            stamp()
             print("✅ Tables created successfully!")
             
             # Create sample data
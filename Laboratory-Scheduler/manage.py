@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for IT Laboratory Utilization Schedule System
+
+Usage:
+    python manage.py reconcile-notifications   Rebuild drifted unread counters
+    python manage.py rebuild-rollups           Backfill the report rollup tables
+    python manage.py check-rollups             Compare rollups with the reservation table
+    python manage.py solve-timetable DEMAND.json [--workers N] [--time-limit S] [--commit]
+                                               Assign a term's sections to labs
+    python manage.py build-assets              Minify, fingerprint and compress static files
+    python manage.py run-worker [--batch-size N] [--once]
+                                               Run queued background jobs
+    python manage.py job-status                Show queue depth, lag and dead jobs
+"""
+
+import os
+import sys
+import time
+from app import create_app
+
+
+def reconcile_notifications(args):
+    from app.notifications import reconcile_unread_counts
+
+    print("🔄 Reconciling unread notification counters...")
+    fixed = reconcile_unread_counts()
+    print(f"✅ Corrected {fixed} user(s).")
+
+
+def rebuild_rollups(args):
+    from app import db
+    from app.rollups import rebuild_rollups as rebuild
+
+    print("🔄 Rebuilding utilization rollups...")
+    with db.engine.begin() as conn:
+        lab_rows, instructor_rows = rebuild(conn)
+    print(f"✅ Wrote {lab_rows} lab/hour and {instructor_rows} instructor/month rows.")
+
+
+def check_rollups(args):
+    from app import db
+    from app.rollups import check_rollups as check
+
+    with db.engine.connect() as conn:
+        mismatches = check(conn)
+    for table, key, stored, expected in mismatches[:20]:
+        print(f"❌ {table} {key}: rollup={stored} actual={expected}")
+    if mismatches:
+        print(f"\n❌ {len(mismatches)} rollup row(s) disagree with the reservation table.")
+        print("   Run 'python manage.py rebuild-rollups' to repair them.")
+        sys.exit(1)
+    print("✅ Rollups match the reservation table.")
+
+
+def solve_timetable(args):
+    import argparse
+    import json
+    from datetime import datetime
+    from app import db
+    from app.conflicts import reservation_index
+    from app.recurrence import parse_skip_dates
+    from app.timetable import parse_demand, build_problem, solve, describe, create_reservations
+
+    parser = argparse.ArgumentParser(prog='manage.py solve-timetable')
+    parser.add_argument('demand', help='JSON file shaped like the /admin/timetable/solve payload')
+    parser.add_argument('--workers', type=int, default=1, help='search processes (default 1)')
+    parser.add_argument('--time-limit', type=float, default=30, help='seconds (default 30)')
+    parser.add_argument('--restarts', type=int, default=8, help='search passes per worker')
+    parser.add_argument('--commit', action='store_true', help='insert the result as pending reservations')
+    options = parser.parse_args(args)
+
+    with open(options.demand) as f:
+        payload = json.load(f)
+    try:
+        term_start = datetime.strptime(payload['term_start'], '%Y-%m-%d').date()
+        term_end = datetime.strptime(payload['term_end'], '%Y-%m-%d').date()
+        skip_dates = parse_skip_dates(','.join(payload.get('skip_dates') or []))
+        problem = build_problem(parse_demand(payload.get('sections')), term_start, term_end, skip_dates)
+    except (KeyError, ValueError) as e:
+        print(f"❌ Invalid demand: {e}")
+        sys.exit(2)
+
+    print(f"🧩 Placing {len(problem['sessions'])} weekly sessions of {len(problem['sections'])} "
+          f"sections into {len(problem['labs'])} labs ({options.workers} worker(s))...")
+    started = time.perf_counter()
+    placement = solve(problem, restarts=options.restarts, time_limit=options.time_limit,
+                      workers=options.workers)
+    assigned, unassigned = describe(problem, placement)
+    print(f"⏱  Solved in {time.perf_counter() - started:.2f}s: {len(assigned)} placed, "
+          f"{sum(1 for a in assigned if not a['preferred'])} outside preferred windows.")
+    for entry in unassigned:
+        print(f"❌ {entry['course_name']} - {entry['section']} ({entry['hours']}h): {entry['reason']}")
+
+    if options.commit and assigned:
+        rows = create_reservations(problem, placement)
+        db.session.commit()
+        for row in rows:
+            reservation_index.add(row)
+        print(f"✅ Created {len(rows)} pending reservation(s).")
+    elif assigned:
+        print("ℹ️  Dry run; pass --commit to create the reservations.")
+    if unassigned:
+        sys.exit(1)
+
+
+def build_assets(args):
+    from flask import current_app
+    from app.assets import build_assets as build, brotli, MINIFIERS
+
+    static_folder = current_app.static_folder
+    print(f"📦 Building static assets from {os.path.normpath(static_folder)}...")
+    manifest = build(static_folder)
+    for source, built in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(static_folder, source))
+        variants = [os.path.getsize(os.path.join(static_folder, built + suffix))
+                    for suffix in ('', '.gz', '.br') if os.path.exists(os.path.join(static_folder, built + suffix))]
+        print(f"   {source:28s} {size:7,d} B -> " + ' / '.join(f'{n:,d}' for n in variants) + ' B')
+    if not MINIFIERS:
+        print("⚠️  rcssmin/rjsmin not installed: assets were not minified.")
+    if brotli is None:
+        print("⚠️  brotli not installed: no .br variants were written.")
+    print(f"✅ Wrote {len(manifest)} asset(s) and static/dist/manifest.json. "
+          "Reload the server to pick them up.")
+
+
+def run_worker(args):
+    import argparse
+    import signal
+    import threading
+    from app.jobs import job_queue
+
+    parser = argparse.ArgumentParser(prog='manage.py run-worker')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f'jobs per batch (default JOB_BATCH_SIZE, {job_queue.batch_size})')
+    parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+    options = parser.parse_args(args)
+
+    # Finish the batch in hand, then exit
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    def report(succeeded, failed, seconds):
+        print(f"{'✅' if not failed else '⚠️ '} {succeeded} job(s) done, {failed} failed "
+              f"in {seconds * 1000:.1f} ms", flush=True)
+
+    print(f"👷 Job worker started (batches of {options.batch_size or job_queue.batch_size}, "
+          f"pid {os.getpid()}).", flush=True)
+    succeeded, failed = job_queue.run(batch_size=options.batch_size, once=options.once,
+                                      stop=stop, report=report)
+    print(f"👋 Job worker stopped: {succeeded} done, {failed} failed.")
+
+
+def job_status(args):
+    from app.models import Job
+    from app.jobs import job_queue
+
+    stats = job_queue.stats()
+    print(f"{'kind':20s} {'queued':>8s} {'running':>8s} {'dead':>8s} {'lag':>10s}")
+    for kind, entry in sorted(stats.items()):
+        print(f"{kind:20s} {entry['queued']:8d} {entry['running']:8d} {entry['dead']:8d} "
+              f"{entry['lag_seconds']:9.1f}s")
+    dead = Job.query.filter_by(status='dead').order_by(Job.finished_at.desc()).limit(10).all()
+    for job in dead:
+        print(f"❌ job {job.id} ({job.kind}, {job.attempts} attempts): {job.last_error}")
+    if any(entry['dead'] for entry in stats.values()):
+        sys.exit(1)
+
+
+COMMANDS = {
+    'reconcile-notifications': reconcile_notifications,
+    'rebuild-rollups': rebuild_rollups,
+    'check-rollups': check_rollups,
+    'solve-timetable': solve_timetable,
+    'build-assets': build_assets,
+    'run-worker': run_worker,
+    'job-status': job_status,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit(2)
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == '__main__':
+    main()
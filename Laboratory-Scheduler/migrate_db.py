@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for IT Laboratory Utilization Schedule System
+
+Brings an existing SQLite or PostgreSQL database up to date without
+recreating it. Applied versions are recorded in the schema_version table.
+
+Usage:
+    python migrate_db.py               Apply pending migrations
+    python migrate_db.py status        Show applied and pending migrations
+    python migrate_db.py stamp         Mark every migration as applied
+    python migrate_db.py check-plans   Fail if a hot query does a full table scan
+"""
+
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import create_app, db
+from app.models import Reservation, Notification, Job
+from app.rollups import rebuild_rollups
+
+def widen_password_hash(conn):
+    # scrypt hashes are longer than 128 characters; SQLite ignores lengths
+    if conn.dialect.name != 'sqlite':
+        conn.execute(text('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(255)'))
+
+
+def create_job_table(conn):
+    # The id column differs between SQLite and PostgreSQL, so let the
+    # model's DDL pick it
+    Job.__table__.create(conn, checkfirst=True)
+
+
+# (version, description, statements). Statements must run on both SQLite and
+# PostgreSQL; a callable statement is invoked with the migration's connection
+# (used for data backfills). Append new migrations, never edit applied ones.
+MIGRATIONS = [
+    (1, 'Composite indexes for reservation and notification hot queries', [
+        'CREATE INDEX IF NOT EXISTS ix_reservation_lab_status_start '
+        'ON reservation (lab_id, status, start_time)',
+        'CREATE INDEX IF NOT EXISTS ix_reservation_section_status_start '
+        'ON reservation (section, status, start_time)',
+        'CREATE INDEX IF NOT EXISTS ix_reservation_instructor_status_start '
+        'ON reservation (instructor_id, status, start_time)',
+        'CREATE INDEX IF NOT EXISTS ix_reservation_status_created '
+        'ON reservation (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_reservation_created_at '
+        'ON reservation (created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_notification_user_read_created '
+        'ON notification (user_id, is_read, created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_notification_user_created '
+        'ON notification (user_id, created_at)',
+    ]),
+    (2, 'Denormalized unread notification counter on user', [
+        'ALTER TABLE "user" ADD COLUMN unread_notifications INTEGER NOT NULL DEFAULT 0',
+        'UPDATE "user" SET unread_notifications = ('
+        'SELECT COUNT(*) FROM notification '
+        'WHERE notification.user_id = "user".id AND notification.is_read = false)',
+    ]),
+    (3, 'Utilization rollup tables for reports', [
+        'CREATE TABLE IF NOT EXISTS lab_hourly_usage ('
+        'lab_id INTEGER NOT NULL REFERENCES laboratory (id), '
+        'day DATE NOT NULL, '
+        'hour INTEGER NOT NULL, '
+        'reservation_count INTEGER NOT NULL DEFAULT 0, '
+        'PRIMARY KEY (lab_id, day, hour))',
+        'CREATE INDEX IF NOT EXISTS ix_lab_hourly_usage_day ON lab_hourly_usage (day)',
+        'CREATE TABLE IF NOT EXISTS instructor_monthly_usage ('
+        'instructor_id INTEGER NOT NULL REFERENCES instructor (id), '
+        'month DATE NOT NULL, '
+        'reservation_count INTEGER NOT NULL DEFAULT 0, '
+        'PRIMARY KEY (instructor_id, month))',
+        rebuild_rollups,
+    ]),
+    (4, 'Data version counters for cache invalidation', [
+        'CREATE TABLE IF NOT EXISTS data_version ('
+        'name VARCHAR(50) PRIMARY KEY, '
+        'version INTEGER NOT NULL DEFAULT 0)',
+    ]),
+    (5, 'Series id for recurring reservations', [
+        'ALTER TABLE reservation ADD COLUMN series_id VARCHAR(32)',
+        'CREATE INDEX IF NOT EXISTS ix_reservation_series_id '
+        'ON reservation (series_id)',
+    ]),
+    (6, 'Room for longer password hashes', [
+        widen_password_hash,
+    ]),
+    (7, 'Background job queue', [
+        create_job_table,
+    ]),
+    (8, 'Change stamp on reservations for the conflict index', [
+        'ALTER TABLE reservation ADD COLUMN updated_at TIMESTAMP',
+        'UPDATE reservation SET updated_at = created_at',
+        'CREATE INDEX IF NOT EXISTS ix_reservation_updated_at '
+        'ON reservation (updated_at)',
+    ]),
+]
+
+# Tables whose hot queries must never be answered by a full table scan
+HOT_TABLES = ('reservation', 'notification')
+
+
+def ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200) NOT NULL, '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text('SELECT version FROM schema_version'))}
+
+
+def record_version(conn, version, description):
+    conn.execute(
+        text('INSERT INTO schema_version (version, description, applied_at) '
+             'VALUES (:version, :description, :applied_at)'),
+        {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+    )
+
+
+def upgrade():
+    """Apply every pending migration, each in its own transaction"""
+    with db.engine.begin() as conn:
+        done = applied_versions(conn)
+
+    pending = [m for m in MIGRATIONS if m[0] not in done]
+    if not pending:
+        print("✅ Database schema is up to date.")
+        return
+
+    for version, description, statements in pending:
+        print(f"📁 Applying migration {version}: {description}")
+        with db.engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            record_version(conn, version, description)
+    print(f"✅ Applied {len(pending)} migration(s).")
+
+
+def stamp():
+    """Mark all migrations as applied (for databases built with db.create_all)"""
+    with db.engine.begin() as conn:
+        done = applied_versions(conn)
+        for version, description, _ in MIGRATIONS:
+            if version not in done:
+                record_version(conn, version, description)
+
+
+def status():
+    with db.engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, description, _ in MIGRATIONS:
+        mark = '✅' if version in done else '⏳'
+        print(f"   {mark} {version:3} {description}")
+
+
+def hot_queries():
+    """The filters used by the conflict check, dashboards and request queue"""
+    now = datetime.now()
+    return [
+        ('conflict check', Reservation.query.filter(
+            Reservation.lab_id == 1,
+            Reservation.status.in_(['pending', 'approved']),
+            Reservation.start_time < now + timedelta(hours=2),
+            Reservation.end_time > now
+        )),
+        ('lab calendar', Reservation.query.filter(
+            Reservation.lab_id == 1,
+            Reservation.status == 'approved',
+            Reservation.start_time >= now,
+            Reservation.start_time < now + timedelta(days=7)
+        )),
+        ('instructor dashboard', Reservation.query.filter_by(
+            instructor_id=1, status='approved'
+        ).filter(Reservation.start_time >= now).order_by(Reservation.start_time).limit(5)),
+        ('student dashboard', Reservation.query.filter_by(
+            section='CS-101-A', status='approved'
+        ).filter(
+            Reservation.start_time >= now,
+            Reservation.start_time < now + timedelta(days=1)
+        ).order_by(Reservation.start_time)),
+        ('admin request queue', Reservation.query.filter_by(
+            status='pending'
+        ).order_by(Reservation.created_at.desc())),
+        ('recent reservations', Reservation.query.order_by(
+            Reservation.created_at.desc()
+        ).limit(5)),
+        ('unread notifications', Notification.query.filter_by(
+            user_id=1, is_read=False
+        )),
+        ('notification list', Notification.query.filter_by(
+            user_id=1
+        ).order_by(Notification.created_at.desc()).limit(10)),
+    ]
+
+
+def explain(statement):
+    """Return the plan lines for a compiled statement on the current engine"""
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    with db.engine.begin() as conn:
+        if dialect.name == 'sqlite':
+            return [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+        # Small tables make the planner prefer sequential scans regardless of
+        # indexes, so ask whether an index path exists at all.
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        return [row[0] for row in conn.execute(text(f'EXPLAIN {sql}'))]
+
+
+def is_full_scan(plan_line):
+    tables = '|'.join(HOT_TABLES)
+    if re.search(rf'\bSeq Scan on ({tables})\b', plan_line):
+        return True
+    # SQLite: "SCAN reservation" is a table scan, "SEARCH ... USING INDEX" is not
+    match = re.match(rf'\s*SCAN ({tables})\b(.*)', plan_line)
+    return bool(match) and 'INDEX' not in match.group(2)
+
+
+def check_plans():
+    """Exit non-zero if any hot query falls back to a full table scan"""
+    failures = 0
+    for name, query in hot_queries():
+        plan = explain(query.statement)
+        scans = [line for line in plan if is_full_scan(line)]
+        if scans:
+            failures += 1
+            print(f"❌ {name}: full table scan")
+            for line in plan:
+                print(f"      {line}")
+        else:
+            print(f"✅ {name}")
+    return failures
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        if command == 'upgrade':
+            upgrade()
+        elif command == 'status':
+            status()
+        elif command == 'stamp':
+            stamp()
+            print("✅ All migrations marked as applied.")
+        elif command == 'check-plans':
+            failures = check_plans()
+            if failures:
+                print(f"\n❌ {failures} hot query(s) fall back to a full table scan.")
+                sys.exit(1)
+            print("\n🎉 All hot queries use an index.")
+        else:
+            print(__doc__)
+            sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,88 @@
 #!/usr/bin/env python3
 """
 IT Laboratory Utilization Schedule System - Simplified Runner
+
+Development (default): Werkzeug's reloading development server.
+Production (FLASK_ENV=production): pre-forked gunicorn workers with threads.
+    kill -HUP <master pid>    reload the app code, replacing workers gracefully
+    kill -TERM <master pid>   stop after in-flight requests finish
+    kill -TTIN / -TTOU        add / remove a worker
 """
 
 import os
 import sys
-from app import create_app, db
 
-def main():
-    """Main application entry point"""
-    
-    # Set default configuration
-    config_name = os.getenv('FLASK_ENV', 'development')
+
+def post_fork(server, worker):
+    """Give each worker its own database connections.
+
+    With SERVER_PRELOAD the app (and its engine) was created in the master;
+    pooled connections must not be shared across processes, so the copies
+    inherited through fork are dropped without closing the parent's.
+    """
+    app = server.app.callable
+    if app is None:
+        return
+    from app import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def serve_production():
+    """Serve with gunicorn using the SERVER_* settings of ProductionConfig"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ Production mode needs gunicorn (Unix only): pip install -r requirements.txt")
+        sys.exit(1)
+    from config import config
+
+    settings = config['production']
+    host = os.getenv('FLASK_HOST', '127.0.0.1')
+    port = int(os.getenv('FLASK_PORT', 5000))
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported here so that, without preloading, a SIGHUP reload
+            # starts workers on the current code
+            from app import create_app
+            # Static files are sent by Flask (app.assets): built assets as
+            # precompressed immutable variants, via sendfile where possible
+            return create_app('production')
+
+    options = {
+        'bind': f'{host}:{port}',
+        'worker_class': 'gthread',
+        'workers': settings.SERVER_WORKERS,
+        'threads': settings.SERVER_THREADS,
+        'timeout': settings.SERVER_TIMEOUT,
+        'graceful_timeout': settings.SERVER_GRACEFUL_TIMEOUT,
+        'keepalive': settings.SERVER_KEEPALIVE,
+        'max_requests': settings.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': settings.SERVER_MAX_REQUESTS // 10,
+        'preload_app': settings.SERVER_PRELOAD,
+        'post_fork': post_fork,
+        'accesslog': '-',
+    }
+
+    print("🚀 Starting IT Laboratory Schedule System in production mode...")
+    print(f"🌐 Serving on http://{host}:{port} with {settings.SERVER_WORKERS} worker(s) "
+          f"x {settings.SERVER_THREADS} thread(s)")
+    print("🔁 kill -HUP <master pid> to reload gracefully, -TERM to stop")
+    ProductionServer(options).run()
+
+
+def run_development(config_name):
+    from app import create_app
     
     print(f"🚀 Starting IT Laboratory Schedule System in {config_name} mode...")
     
@@ -54,5 +125,16 @@ def main():
         print(f"❌ Failed to start application: {str(e)}")
         sys.exit(1)
 
+def main():
+    """Main application entry point"""
+    
+    # Set default configuration
+    config_name = os.getenv('FLASK_ENV', 'development')
+    
+    if config_name == 'production':
+        serve_production()
+    else:
+        run_development(config_name)
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -4,6 +4,7 @@ class LabCalendar {
         this.container = document.getElementById(containerId);
         this.currentDate = new Date();
         this.selectedLab = 'all';
+        this.view = 'week';
         this.events = [];
         this.timeSlots = this.generateTimeSlots();
         
@@ -347,7 +348,8 @@ class LabCalendar {
         
         const params = new URLSearchParams({
             lab_id: this.selectedLab,
-            date: this.currentDate.toISOString().split('T')[0]
+            date: this.currentDate.toISOString().split('T')[0],
+            view: this.view
         });
 
         fetch(`/api/schedule?${params}`)
@@ -457,10 +459,11 @@ class LabCalendar {
     }
 
     // Export functionality
-    exportSchedule(format = 'pdf') {
+    exportSchedule(format = 'csv') {
         const params = new URLSearchParams({
             lab_id: this.selectedLab,
             date: this.currentDate.toISOString().split('T')[0],
+            view: this.view,
             format: format
         });
 
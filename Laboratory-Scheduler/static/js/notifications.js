@@ -7,9 +7,9 @@ class NotificationSystem {
     }
 
     init() {
+        this.refreshTimer = null;
         this.loadNotifications();
         this.setupEventListeners();
-        this.startAutoRefresh();
     }
 
     setupEventListeners() {
@@ -41,36 +41,59 @@ class NotificationSystem {
     }
 
     setupRealTimeUpdates() {
-        if (typeof EventSource !== 'undefined') {
-            const eventSource = new EventSource('/api/notifications/stream');
-            
-            eventSource.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                if (data.type === 'new_notification') {
-                    this.showNewNotification(data.notification);
-                    this.updateUnreadCount(1);
-                }
-            };
+        // Polling is only the fallback; an open stream costs the server no queries
+        if (typeof EventSource === 'undefined') {
+            this.startAutoRefresh();
+            return;
+        }
+
+        const eventSource = new EventSource('/api/notifications/stream');
+
+        eventSource.onopen = () => {
+            this.stopAutoRefresh();
+        };
+
+        eventSource.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            if (data.type === 'new_notification') {
+                this.showNewNotification(data.notification);
+                this.updateUnreadCount(1);
+            }
+        };
 
-            eventSource.onerror = (error) => {
+        eventSource.onerror = (error) => {
+            // The browser reconnects on its own; poll until it succeeds, and
+            // give up on the stream entirely if the server refused it.
+            if (eventSource.readyState === EventSource.CLOSED) {
                 console.error('EventSource failed:', error);
-                eventSource.close();
-            };
-        }
+            }
+            this.startAutoRefresh();
+        };
+
+        window.addEventListener('beforeunload', () => eventSource.close());
     }
 
     startAutoRefresh() {
-        setInterval(() => {
+        if (this.refreshTimer) return;
+        this.refreshTimer = setInterval(() => {
             this.loadNotifications();
         }, this.notificationCheckInterval);
     }
 
+    stopAutoRefresh() {
+        if (this.refreshTimer) {
+            clearInterval(this.refreshTimer);
+            this.refreshTimer = null;
+        }
+    }
+
     loadNotifications() {
         fetch('/api/notifications')
             .then(response => response.json())
             .then(data => {
                 this.renderNotifications(data.notifications);
-                this.updateUnreadCount(data.unread_count);
+                this.unreadCount = data.unread_count;
+                this.updateUnreadBadge();
             })
             .catch(error => {
                 console.error('Error loading notifications:', error);